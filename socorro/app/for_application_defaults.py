@@ -59,7 +59,10 @@ class ApplicationDefaultsProxy(object):
             'copy_raw_and_processed':
                 'socorro.collector.crashmover_app.RawAndProcessedCopierApp',
             'reprocess_crashlist':
-                'socorro.external.rabbitmq.reprocess_crashlist.ReprocessCrashlistApp'
+                'socorro.external.rabbitmq.reprocess_crashlist.ReprocessCrashlistApp',
+            'reprocessing_engine':
+                'socorro.external.rabbitmq.reprocessing_engine.'
+                'ReprocessingEngineApp',
         }
 
 
@@ -31,6 +31,7 @@ import signal
 import os
 import sys
 import re
+import tempfile
 import threading
 
 import socorro.app.for_application_defaults
@@ -48,6 +49,8 @@ from configman import (
 )
 from configman.converters import py_obj_to_str
 
+from socorro.lib.sampling_profiler import SamplingProfiler
+
 #------------------------------------------------------------------------------
 # every socorro app has a class method called 'get_application_defaults' from
 # which configman extracts the preferred configuration default values.
@@ -101,6 +104,34 @@ def respond_to_SIGHUP(signal_number, frame, logger=None):
     raise KeyboardInterrupt
 
 
+#------------------------------------------------------------------------------
+def setup_sampling_profiler(config, app_name):
+    """create the sampling profiler for an app that has the 'profiler'
+    options and install the signal handler that starts and stops it.  Returns
+    None for apps without them."""
+    if 'profiler' not in config:
+        return None
+    profiler_config = config.profiler
+    profiler = SamplingProfiler(
+        interval=profiler_config.sampling_interval,
+        pathname_template=profiler_config.output_pathname.replace(
+            '{app_name}',
+            app_name
+        ),
+        logger=config.get('logger'),
+    )
+    if profiler_config.toggle_signal:
+        def respond_to_toggle_signal(signal_number, frame):
+            profiler.toggle()
+        signal.signal(
+            getattr(signal, profiler_config.toggle_signal),
+            respond_to_toggle_signal
+        )
+    if profiler_config.start_enabled:
+        profiler.start()
+    return profiler
+
+
 #--------------------------------------------------------------------------
 def klass_to_pypath(klass):
     """when a class is defined within the module that is being executed as
@@ -268,13 +299,18 @@ class SocorroApp(RequiredConfig):
                 # install the signal handler without logging
                 signal.signal(signal.SIGHUP, respond_to_SIGHUP)
 
-            # we finally know what app to actually run, instantiate it
-            app_to_run = klass(config)
-            app_to_run.config_manager = config_manager
-            # whew, finally run the app that we wanted
+            profiler = setup_sampling_profiler(config, klass.app_name)
+            try:
+                # we finally know what app to actually run, instantiate it
+                app_to_run = klass(config)
+                app_to_run.config_manager = config_manager
+                # whew, finally run the app that we wanted
 
-            return_code = fix_exit_code(app_to_run.main())
-            return return_code
+                return_code = fix_exit_code(app_to_run.main())
+                return return_code
+            finally:
+                if profiler is not None and profiler.running:
+                    profiler.toggle()
 
 
 #==============================================================================
@@ -428,6 +464,34 @@ class App(SocorroApp):
         setup_logger
     )
 
+    required_config.namespace('profiler')
+    required_config.profiler.add_option(
+        'toggle_signal',
+        doc='the name of the signal that starts and stops the sampling '
+            'profiler, stopping it writes the stacks to output_pathname '
+            '(empty to disable)',
+        default='SIGUSR2',
+    )
+    required_config.profiler.add_option(
+        'sampling_interval',
+        doc='seconds between two samples of the stacks of all threads',
+        default=0.01,
+    )
+    required_config.profiler.add_option(
+        'output_pathname',
+        doc='where the profiler writes flamegraph compatible collapsed '
+            'stacks, {app_name}, {pid} and {time} are substituted',
+        default=os.path.join(
+            tempfile.gettempdir(),
+            '{app_name}.{pid}.{time}.collapsed'
+        ),
+    )
+    required_config.profiler.add_option(
+        'start_enabled',
+        doc='profile from the start rather than waiting for the signal',
+        default=False,
+    )
+
 
 #==============================================================================
 class SocorroWelcomeApp(SocorroApp):
@@ -11,6 +11,7 @@
 # set both socorro and configman in your PYTHONPATH
 
 from socorro.app.generic_app import App, main
+from socorro.collector.duplicates import DuplicateIndex
 from socorro.webapi.class_partial import class_with_partial_init
 from socorro.lib.converters import web_services_from_str
 
@@ -45,6 +46,19 @@ class BaseCollectorApp(App):
         from_string_converter=class_converter
     )
 
+    #--------------------------------------------------------------------------
+    def _create_duplicate_index(self, config):
+        """web.py makes a collector for every request, so the index of
+        recently accepted crashes is made once here and shared by them all"""
+        if not config.duplicate_window:
+            return None
+        return DuplicateIndex(
+            config.duplicate_window,
+            config.duplicate_max_entries,
+            config.duplicate_digest_bytes,
+            self.config.logger
+        )
+
 
 #==============================================================================
 class CollectorApp(BaseCollectorApp):
@@ -107,6 +121,9 @@ class CollectorApp(BaseCollectorApp):
         self.config.throttler = self.config.throttler.throttler_class(
             self.config.throttler
         )
+        self.config.duplicate_index = self._create_duplicate_index(
+            self.config.collector
+        )
         self.web_server = self.config.web_server.wsgi_server_class(
             self.config,  # needs the whole config not the local namespace
             services_list
@@ -165,6 +182,10 @@ class Collector2015App(BaseCollectorApp):
         for namespace, uri, service_class in (
             self.config.services.services_controller.service_list
         ):
+            service_config = self.config.services[namespace]
+            if 'duplicate_window' in service_config:
+                service_config.duplicate_index = \
+                    self._create_duplicate_index(service_config)
             services_list.append(
                 # a tuple associating a URI with a service class
                 (
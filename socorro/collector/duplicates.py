@@ -0,0 +1,83 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""clients resubmit crashes they believe failed, usually after a timeout.
+The DuplicateIndex remembers a short digest of every crash accepted recently
+together with its crash_id, so a resubmission can be answered with the
+original crash_id instead of being throttled, stored and processed again."""
+
+import threading
+import time
+
+
+#==============================================================================
+class DuplicateIndex(object):
+    """a bounded, time windowed map of crash digests to crash_ids shared by
+    all the threads of a collector.
+
+    Entries live in two generations.  New entries go into the current one and
+    lookups consult both.  Once the current generation is a 'window' seconds
+    old, or holds half of 'max_entries', the previous generation is dropped
+    and the current one takes its place, so a crash is remembered for at
+    least 'window' seconds unless the collector is busier than 'max_entries'
+    crashes per window, and never more than 'max_entries' are held.
+
+    A map rather than a Bloom filter is used because a duplicate has to be
+    answered with the crash_id of its original.  Digests are truncated to
+    'digest_bytes' to save memory.  The chance that a distinct crash is
+    mistaken for a duplicate is about max_entries / 2 ** (8 * digest_bytes),
+    one in two trillion for a million entries of eight bytes."""
+
+    #--------------------------------------------------------------------------
+    def __init__(self, window, max_entries, digest_bytes, logger):
+        self.window = window
+        self.max_entries = max_entries
+        self.digest_bytes = digest_bytes
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._current = {}
+        self._previous = {}
+        self._rotated_at = time.time()
+        self.submissions = 0
+        self.duplicates = 0
+
+    #--------------------------------------------------------------------------
+    def _rotate_if_due(self):
+        now = time.time()
+        if (
+            now - self._rotated_at < self.window
+            and len(self._current) < self.max_entries // 2
+        ):
+            return
+        self.logger.info(
+            'duplicate index: %d of %d submissions were duplicates, '
+            '%d crashes remembered',
+            self.duplicates,
+            self.submissions,
+            len(self._current) + len(self._previous)
+        )
+        self._previous = self._current
+        self._current = {}
+        self._rotated_at = now
+        self.submissions = self.duplicates = 0
+
+    #--------------------------------------------------------------------------
+    def original_crash_id(self, digest):
+        """return the crash_id of the crash that 'digest' was first seen with
+        or None if it is new.  Each call is counted as a submission."""
+        key = digest[:self.digest_bytes]
+        with self._lock:
+            self._rotate_if_due()
+            self.submissions += 1
+            crash_id = self._current.get(key) or self._previous.get(key)
+            if crash_id is not None:
+                self.duplicates += 1
+            return crash_id
+
+    #--------------------------------------------------------------------------
+    def add(self, digest, crash_id):
+        key = digest[:self.digest_bytes]
+        with self._lock:
+            self._rotate_if_due()
+            self._current[key] = crash_id
@@ -33,6 +33,31 @@ class BreakpadCollectorBase(GenericCollectorBase):
             'flag submitted with the crash',
         default=False
     )
+    required_config.add_option(
+        'duplicate_window',
+        doc='the number of seconds an accepted crash is remembered so that '
+            'resubmissions of it are answered with its crash_id instead of '
+            'being saved again (0 turns duplicate detection off)',
+        default=0
+    )
+    required_config.add_option(
+        'duplicate_max_entries',
+        doc='the most crashes remembered for duplicate detection',
+        default=1000000
+    )
+    required_config.add_option(
+        'duplicate_digest_bytes',
+        doc='the bytes of each crash digest kept for duplicate detection, '
+            'fewer use less memory but make mistaking a new crash for a '
+            'duplicate more likely',
+        default=8
+    )
+    required_config.add_option(
+        'duplicate_key_fields',
+        doc='a comma separated list of the raw crash fields that, with the '
+            'dumps, identify a crash for duplicate detection',
+        default='ProductName, Version, BuildID, CrashTime, InstallTime'
+    )
 
     #--------------------------------------------------------------------------
     def __init__(self, config):
@@ -43,6 +68,7 @@ class BreakpadCollectorBase(GenericCollectorBase):
             self._get_accept_submitted_legacy_processing()
         self.throttler = self._get_throttler()
         self.crash_storage = self._get_crash_storage()
+        self.duplicate_index = self._get_duplicate_index()
 
     #--------------------------------------------------------------------------
     def _get_dump_field(self):
@@ -60,10 +86,49 @@ class BreakpadCollectorBase(GenericCollectorBase):
     def _get_crash_storage(self):
         return self.config.crash_storage
 
+    #--------------------------------------------------------------------------
+    def _get_duplicate_config(self):
+        return self.config
+
+    #--------------------------------------------------------------------------
+    def _get_duplicate_index(self):
+        return self.config.duplicate_index
+
+    #--------------------------------------------------------------------------
+    def _get_duplicate_digest(self, raw_crash):
+        """a digest of the dumps, by their checksums, and of the fields that
+        identify the crash on the client"""
+        key_fields = self._get_duplicate_config().duplicate_key_fields
+        parts = [
+            '%s=%s' % (name, checksum)
+            for name, checksum in sorted(raw_crash.dump_checksums.items())
+        ]
+        for field in key_fields.split(','):
+            field = field.strip()
+            value = raw_crash.get(field, '')
+            if isinstance(value, unicode):
+                value = value.encode('utf-8')
+            parts.append('%s=%s' % (field, value))
+        return self.checksum_method('\n'.join(parts)).digest()
+
     #--------------------------------------------------------------------------
     def POST(self, *args):
         raw_crash, dumps = self._get_raw_crash_from_form()
 
+        digest = None
+        if self.duplicate_index is not None and raw_crash.dump_checksums:
+            digest = self._get_duplicate_digest(raw_crash)
+            original_crash_id = self.duplicate_index.original_crash_id(digest)
+            if original_crash_id is not None:
+                self.logger.info(
+                    '%s received again, not saved',
+                    original_crash_id
+                )
+                return "CrashID=%s%s\n" % (
+                    self.dump_id_prefix,
+                    original_crash_id
+                )
+
         current_timestamp = utc_now()
         raw_crash.submitted_timestamp = current_timestamp.isoformat()
         # legacy - ought to be removed someday
@@ -100,6 +165,8 @@ class BreakpadCollectorBase(GenericCollectorBase):
             dumps,
             crash_id
         )
+        if digest is not None:
+            self.duplicate_index.add(digest, crash_id)
         self.logger.info('%s accepted', crash_id)
         return "CrashID=%s%s\n" % (self.dump_id_prefix, crash_id)
 
@@ -138,6 +205,10 @@ class BreakpadCollector(BreakpadCollectorBase):
     def _get_accept_submitted_crash_id(self):
         return self.config.collector.accept_submitted_crash_id
 
+    #--------------------------------------------------------------------------
+    def _get_duplicate_config(self):
+        return self.config.collector
+
 
 #==============================================================================
 class BreakpadCollector2015(BreakpadCollectorBase):
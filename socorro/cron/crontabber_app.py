@@ -3,6 +3,11 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import Queue
+import threading
+import time
+
+from configman import Namespace, RequiredConfig
 from crontabber.app import CronTabberBase
 
 
@@ -58,7 +63,184 @@ from socorro.app.socorro_app import App as App
 
 
 #==============================================================================
-class CronTabberApp(CronTabberBase, App):
+class ParallelJobsMixin(RequiredConfig):
+    """a mixin for crontabber classes that replaces the serial 'run_all' with
+    one that runs jobs concurrently on a bounded pool of threads.  A job is
+    only started once every configured job it 'depends_on' has finished, so
+    the nightly run takes as long as the longest chain of dependencies rather
+    than the sum of all the jobs.  Each thread uses its own database
+    connections (the connection factories key connections by thread name)."""
+
+    required_config = Namespace()
+    required_config.add_option(
+        'parallel_jobs',
+        default=1,
+        doc='the maximum number of jobs to run at the same time (1 runs '
+            'them serially in dependency order)',
+    )
+
+    #--------------------------------------------------------------------------
+    @staticmethod
+    def _depends_on(job_class):
+        depends_on = getattr(job_class, 'depends_on', None) or []
+        if isinstance(depends_on, basestring):
+            depends_on = [depends_on]
+        return depends_on
+
+    #--------------------------------------------------------------------------
+    def run_all(self):
+        number_of_workers = self.config.get('parallel_jobs', 1)
+        if number_of_workers <= 1:
+            return super(ParallelJobsMixin, self).run_all()
+
+        class_list = self._reorder_class_list(
+            self.config.crontabber.jobs.class_list
+        )
+        jobs = {}
+        for class_name, job_class in class_list:
+            jobs[job_class.app_name] = (class_name, job_class)
+
+        # only the dependencies on jobs that are part of this run matter to
+        # the scheduling, '_run_one' still checks all of them
+        waiting_on = {}
+        dependents = dict((app_name, []) for app_name in jobs)
+        for app_name, (class_name, job_class) in jobs.iteritems():
+            waiting_on[app_name] = set(
+                x for x in self._depends_on(job_class) if x in jobs
+            )
+            for dependency in waiting_on[app_name]:
+                dependents[dependency].append(app_name)
+
+        # make sure the lazily created state database exists before the
+        # threads race to create it
+        self.job_state_database
+
+        ready_queue = Queue.Queue()
+        done_queue = Queue.Queue()
+
+        def worker():
+            while True:
+                app_name = ready_queue.get()
+                if app_name is None:
+                    return
+                class_name, job_class = jobs[app_name]
+                t0 = time.time()
+                try:
+                    self._run_one(
+                        job_class,
+                        self.config.crontabber['class-%s' % class_name]
+                    )
+                    error = None
+                except Exception, error:
+                    self.config.logger.error(
+                        'error running %s',
+                        app_name,
+                        exc_info=True
+                    )
+                done_queue.put((app_name, time.time() - t0, error))
+
+        workers = [
+            threading.Thread(
+                target=worker,
+                name='crontabber-worker-%d' % i
+            )
+            for i in range(number_of_workers)
+        ]
+        for a_worker in workers:
+            a_worker.start()
+
+        started = time.time()
+        durations = {}
+        first_error = None
+        running = 0
+        try:
+            for class_name, job_class in class_list:
+                if not waiting_on[job_class.app_name]:
+                    ready_queue.put(job_class.app_name)
+                    running += 1
+            while running:
+                app_name, duration, error = done_queue.get()
+                running -= 1
+                durations[app_name] = duration
+                if error is not None:
+                    if first_error is None:
+                        first_error = error
+                    continue
+                if first_error is not None:
+                    # like the serial run, stop at the first failure that
+                    # escaped '_run_one' but let the running jobs finish
+                    continue
+                for dependent in dependents[app_name]:
+                    waiting_on[dependent].discard(app_name)
+                    if not waiting_on[dependent]:
+                        ready_queue.put(dependent)
+                        running += 1
+        finally:
+            for a_worker in workers:
+                ready_queue.put(None)
+            for a_worker in workers:
+                a_worker.join()
+
+        self._log_parallel_run_report(
+            jobs,
+            durations,
+            time.time() - started
+        )
+        if first_error is not None:
+            raise first_error
+
+    #--------------------------------------------------------------------------
+    def _log_parallel_run_report(self, jobs, durations, wall_time):
+        """log the duration of every job and the critical path, the chain of
+        dependencies that determined the length of the run."""
+        logger = self.config.logger
+        for app_name, duration in sorted(
+            durations.items(),
+            key=lambda x: x[1],
+            reverse=True
+        ):
+            logger.info('job %s took %.2fs', app_name, duration)
+
+        # the longest path ending at each job, jobs are visited in
+        # dependency order so their predecessors are always known
+        path_length = {}
+        path_previous = {}
+        for class_name, job_class in self._reorder_class_list(jobs.values()):
+            app_name = job_class.app_name
+            if app_name not in durations:
+                continue
+            previous = None
+            for dependency in self._depends_on(job_class):
+                if dependency in path_length and (
+                    previous is None or
+                    path_length[dependency] > path_length[previous]
+                ):
+                    previous = dependency
+            path_length[app_name] = durations[app_name] + (
+                path_length[previous] if previous else 0
+            )
+            path_previous[app_name] = previous
+        if not path_length:
+            return
+        app_name = max(path_length, key=path_length.get)
+        critical_path = []
+        while app_name:
+            critical_path.append(app_name)
+            app_name = path_previous[app_name]
+        critical_path.reverse()
+        logger.info(
+            'ran %d jobs in %.2fs (%.2fs if run serially), critical path '
+            '%.2fs: %s',
+            len(durations),
+            wall_time,
+            sum(durations.values()),
+            path_length[critical_path[-1]],
+            ' -> '.join(critical_path)
+        )
+
+
+#==============================================================================
+class CronTabberApp(ParallelJobsMixin, CronTabberBase, App):
     #--------------------------------------------------------------------------
     @staticmethod
     def get_application_defaults():
@@ -88,7 +270,14 @@ CronTabber.required_config.crontabber.job_state_db_class.default \
         'socorro.external.postgresql.connection_context.ConnectionContext'
     )
 
+
+#==============================================================================
+class ParallelCronTabber(ParallelJobsMixin, CronTabber):
+    """crontabber's own app with the option to run independent jobs
+    concurrently"""
+
+
 if __name__ == '__main__':  # pragma: no cover
     from crontabber.app import main
     import sys
-    sys.exit(main(CronTabber))
+    sys.exit(main(ParallelCronTabber))
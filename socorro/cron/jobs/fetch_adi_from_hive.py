@@ -6,7 +6,10 @@ import codecs
 import datetime
 import urllib2
 import os
+import Queue
 import tempfile
+import threading
+import time
 import unicodedata
 
 import pyhs2
@@ -124,6 +127,67 @@ _FENNEC38_ADI_CHANNEL_CORRECTION_SQL = """
               and date > '2015-04-27';"""
 
 
+_RAW_ADI_LOGS_COLUMNS = [
+    'report_date',
+    'product_name',
+    'product_os_platform',
+    'product_os_version',
+    'product_version',
+    'build',
+    'build_channel',
+    'product_guid',
+    'count'
+]
+
+
+class CopyStream(object):
+    """A file-like object for `cursor.copy_from()` that is fed lines by
+    another thread through a bounded queue, so a COPY can start before the
+    Hive query has finished and without holding all the rows in memory."""
+
+    def __init__(self, maxsize):
+        self._queue = Queue.Queue(maxsize)
+        self._buffer = ''
+        self._finished = False
+        # set by the reading side once it stops reading for good, so that
+        # the writing side never blocks on a queue nobody empties
+        self.abandoned = False
+        # set by the reading side when it starts reading, a stream can only
+        # be read once
+        self.started = False
+
+    def put(self, line):
+        while not self.abandoned:
+            try:
+                self._queue.put(line, timeout=1)
+                return
+            except Queue.Full:
+                pass
+
+    def finish(self, error=None):
+        self.put(error)
+
+    def read(self, size=-1):
+        chunks = [self._buffer]
+        length = len(self._buffer)
+        while not self._finished and (size < 0 or length < size):
+            line = self._queue.get()
+            if line is None:
+                self._finished = True
+            elif isinstance(line, Exception):
+                self._finished = True
+                raise line
+            else:
+                chunks.append(line)
+                length += len(line)
+        data = ''.join(chunks)
+        if size < 0:
+            self._buffer = ''
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+
+
 @as_backfill_cron_app
 class FetchADIFromHiveCronApp(BaseCronApp):
     """ This cron is our daily blocklist ping web logs query
@@ -176,6 +240,18 @@ class FetchADIFromHiveCronApp(BaseCronApp):
         default=30 * 60,  # 30 minutes
         doc='number of seconds to wait before timing out')
 
+    required_config.add_option(
+        'stream_buffer_size',
+        default=10000,
+        doc='the number of rows buffered between Hive and each Postgres '
+            'destination')
+
+    required_config.add_option(
+        'progress_interval',
+        default=100000,
+        doc='log the number of rows fetched every time this many more rows '
+            'have been read from Hive')
+
     required_config.namespace('primary_destination')
     required_config.primary_destination.add_option(
         'transaction_executor_class',
@@ -218,6 +294,36 @@ class FetchADIFromHiveCronApp(BaseCronApp):
             s = unicode(s, 'utf-8', errors='replace')
         return ''.join(c for c in s if unicodedata.category(c)[0] != "C")
 
+    @classmethod
+    def clean_rows(klass, rows):
+        """generate the rows from Hive as utf-8 encoded lines in the COPY
+        text format, skipping the incomplete rows"""
+        for row in rows:
+            if None in row:
+                continue
+            yield (
+                u"\t".join(
+                    klass.remove_control_characters(
+                        urllib2.unquote(v)
+                    ).replace('\\', '\\\\')
+                    if isinstance(v, basestring) else unicode(v)
+                    for v in row
+                ) + u"\n"
+            ).encode('utf-8')
+
+    def _copy_raw_adi_logs(self, connection, source, target_date):
+        pgcursor = connection.cursor()
+        pgcursor.copy_from(
+            source,
+            'raw_adi_logs',
+            null='None',
+            columns=_RAW_ADI_LOGS_COLUMNS
+        )
+        pgcursor.execute(_RAW_ADI_QUERY, (target_date,))
+
+        # for Bug 1159993
+        execute_no_results(connection, _FENNEC38_ADI_CHANNEL_CORRECTION_SQL)
+
     def _database_transaction(
         self,
         connection,
@@ -225,27 +331,87 @@ class FetchADIFromHiveCronApp(BaseCronApp):
         target_date
     ):
         with codecs.open(raw_adi_logs_pathname, 'r', 'utf-8') as f:
-            pgcursor = connection.cursor()
-            pgcursor.copy_from(
-                f,
-                'raw_adi_logs',
-                null='None',
-                columns=[
-                    'report_date',
-                    'product_name',
-                    'product_os_platform',
-                    'product_os_version',
-                    'product_version',
-                    'build',
-                    'build_channel',
-                    'product_guid',
-                    'count'
-                ]
+            self._copy_raw_adi_logs(connection, f, target_date)
+
+    def _streaming_transaction(
+        self,
+        connection,
+        stream,
+        fetch_state,
+        target_date
+    ):
+        if stream.started:
+            # This is a retry of a transaction that failed after it started
+            # on the stream, possibly as late as the commit, after the
+            # stream was drained. Rather than asking Hive again, resume from
+            # the spool file once the fetch is complete.
+            stream.abandoned = True
+            fetch_state['done'].wait()
+            if fetch_state['error'] is not None:
+                raise fetch_state['error']
+            self._database_transaction(
+                connection,
+                fetch_state['pathname'],
+                target_date
             )
-            pgcursor.execute(_RAW_ADI_QUERY, (target_date,))
+            return
+        stream.started = True
+        try:
+            self._copy_raw_adi_logs(connection, stream, target_date)
+        except:
+            stream.abandoned = True
+            raise
 
-        # for Bug 1159993
-        execute_no_results(connection, _FENNEC38_ADI_CHANNEL_CORRECTION_SQL)
+    def _fetch(self, target_date, streams, fetch_state):
+        """run the Hive query and feed the cleaned rows to every stream and
+        to the spool file"""
+        logger = self.config.logger
+        t0 = time.time()
+        count = 0
+        try:
+            with open(fetch_state['pathname'], 'wb') as spool:
+                hive = pyhs2.connect(
+                    host=self.config.hive_host,
+                    port=self.config.hive_port,
+                    authMechanism=self.config.hive_auth_mechanism,
+                    user=self.config.hive_user,
+                    password=self.config.hive_password,
+                    database=self.config.hive_database,
+                    # the underlying TSocket setTimeout() wants milliseconds
+                    timeout=self.config.timeout * 1000
+                )
+
+                cur = hive.cursor()
+                query = self.config.query % target_date
+                cur.execute(query)
+                for line in self.clean_rows(cur):
+                    spool.write(line)
+                    for stream in streams:
+                        stream.put(line)
+                    count += 1
+                    if not count % self.config.progress_interval:
+                        logger.info(
+                            'fetched %d ADI rows (%.0f rows/s)',
+                            count,
+                            count / (time.time() - t0)
+                        )
+        except Exception, x:
+            fetch_state['error'] = x
+            for stream in streams:
+                stream.finish(x)
+            raise
+        finally:
+            fetch_state['done'].set()
+        for stream in streams:
+            stream.finish()
+        duration = time.time() - t0
+        logger.info(
+            'fetched %d ADI rows for %s in %.2fs (%.0f rows/s)',
+            count,
+            target_date,
+            duration,
+            count / duration if duration else 0
+        )
 
     def run(self, date):
 
@@ -286,44 +452,48 @@ class FetchADIFromHiveCronApp(BaseCronApp):
                 '.txt'
             )
         )
-        try:
-            with codecs.open(raw_adi_logs_pathname, 'w', 'utf-8') as f:
-                hive = pyhs2.connect(
-                    host=self.config.hive_host,
-                    port=self.config.hive_port,
-                    authMechanism=self.config.hive_auth_mechanism,
-                    user=self.config.hive_user,
-                    password=self.config.hive_password,
-                    database=self.config.hive_database,
-                    # the underlying TSocket setTimeout() wants milliseconds
-                    timeout=self.config.timeout * 1000
-                )
+        fetch_state = {
+            'pathname': raw_adi_logs_pathname,
+            'done': threading.Event(),
+            'error': None,
+        }
+        # every destination COPYs from its own stream in its own thread
+        # while the rows are still arriving from Hive
+        streams = []
+        errors = []
+        threads = []
+        for transaction in transactions:
+            stream = CopyStream(self.config.stream_buffer_size)
+            streams.append(stream)
 
-                cur = hive.cursor()
-                query = self.config.query % target_date
-                cur.execute(query)
-                for row in cur:
-                    if None in row:
-                        continue
-                    f.write(
-                        "\t"
-                        .join(
-                            self.remove_control_characters(
-                                urllib2.unquote(v)
-                            ).replace('\\', '\\\\')
-                            if isinstance(v, basestring) else str(v)
-                            for v in row
-                        )
+            def load(transaction=transaction, stream=stream):
+                try:
+                    transaction(
+                        self._streaming_transaction,
+                        stream,
+                        fetch_state,
+                        target_date
                     )
-                    f.write("\n")
-
-            for transaction in transactions:
-                transaction(
-                    self._database_transaction,
-                    raw_adi_logs_pathname,
-                    target_date
-                )
+                except Exception, x:
+                    errors.append(x)
+                    self.config.logger.error(
+                        'loading ADI failed',
+                        exc_info=True
+                    )
+                finally:
+                    stream.abandoned = True
 
+            threads.append(threading.Thread(target=load))
+        try:
+            for thread in threads:
+                thread.start()
+            try:
+                self._fetch(target_date, streams, fetch_state)
+            finally:
+                for thread in threads:
+                    thread.join()
+            if errors:
+                raise errors[0]
         finally:
             if os.path.isfile(raw_adi_logs_pathname):
                 os.remove(raw_adi_logs_pathname)
@@ -222,6 +222,26 @@ class BasicModel(object):
         """Trains the data. Called from __init__."""
         pass
 
+    @classmethod
+    def find_explosive(cls, series):
+        """Checks many series at once.
+
+        Models that can share work between series (because all of them
+        have the same length) should override this.
+
+        Args:
+            series: an iterable of (key, data, observed) tuples where data
+                    is the training data and observed the value of the
+                    next day/time period.
+
+        Returns:
+            The list of keys whose observed value is explosive.
+        """
+        return [
+            key for key, data, observed in series
+            if cls(data).is_explosive(observed)
+        ]
+
 
 class PredictiveModel(BasicModel):
     """Base model for any models that uses prediction."""
@@ -310,6 +330,37 @@ class SlopeBased(BasicModel):
     def probability_of_significance(self, observed):
         pass
 
+    @classmethod
+    def find_explosive(cls, series):
+        # The t statistic only depends on the length of the data, so it is
+        # computed once rather than for every series. The rest is the
+        # arithmetic of train and is_explosive, inlined and in the same
+        # order so that the results are identical.
+        explosive = []
+        t_by_length = {}
+        for key, data, observed in series:
+            n = len(data) - 1
+            try:
+                t = t_by_length[n]
+            except KeyError:
+                t = t_by_length[n] = inv_t_cdf(
+                    cls.MIN_EXPLOSIVE_CONFIDENCE,
+                    n - 1
+                )
+            previous = data[0]
+            slopes = []
+            for value in data[1:]:
+                slopes.append((value - previous) / previous)
+                previous = value
+            m = sum(slopes) / n
+            s = 0
+            for v in slopes:
+                s += (v - m) ** 2
+            threshold = sqrt(s / n) * t
+            if (observed - previous) / previous - m > threshold:
+                explosive.append(key)
+        return explosive
+
 
 MODELS = {
     "SlopeBased": SlopeBased
@@ -333,9 +384,11 @@ SQL_INSERT = """
 INSERT INTO suspicious_crash_signatures
     (signature_id, report_date)
 VALUES
-    ('{signature_id}', '{date}'::timestamp without time zone)
+    {values}
 """
 
+SQL_INSERT_VALUES = "(%s, %s::timestamp without time zone)"
+
 
 @with_postgres_transactions()
 @with_single_postgres_transaction()
@@ -371,11 +424,22 @@ class SuspiciousCrashesApp(BaseCronApp):
         doc='Minimum number of logged crashes today to trigger analysis.'
     )
 
-    def _add_explosive_entry(self, signature_id, date, connection):
-        self.config.logger.info('{0} is explosive!!'.format(signature_id))
+    def _add_explosive_entries(self, signature_ids, date, connection):
+        if not signature_ids:
+            return
+        for signature_id in signature_ids:
+            self.config.logger.info('{0} is explosive!!'.format(signature_id))
+        date = date.strftime('%Y-%m-%d')
+        parameters = []
+        for signature_id in signature_ids:
+            parameters.extend((signature_id, date))
         cursor = connection.cursor()
-        cursor.execute(SQL_INSERT.format(signature_id=signature_id,
-                                         date=date.strftime('%Y-%m-%d')))
+        cursor.execute(
+            SQL_INSERT.format(
+                values=', '.join([SQL_INSERT_VALUES] * len(signature_ids))
+            ),
+            parameters
+        )
 
     def run(self, connection, date):
         logger = self.config.logger
@@ -394,32 +458,39 @@ class SuspiciousCrashesApp(BaseCronApp):
         cursor.execute(SQL_SELECT.format(start=start.strftime('%Y-%m-%d'),
                                          end=end.strftime('%Y-%m-%d')))
 
+        # every signature gets a row of one count per day of training data.
+        # Missing days stay at a tiny value to prevent a division by 0.
+        n_days = (today - start).days
+        day_index = dict(
+            (start + datetime.timedelta(i), i) for i in xrange(n_days)
+        )
+        empty_row = [0.00001] * n_days
         today_counts = {}
         historic_counts = {}
         for signature_id, report_date, count in cursor:
             if report_date == today:
                 today_counts[signature_id] = count
-            else:
-                counts = historic_counts.setdefault(signature_id, {})
-                counts[report_date.strftime('%Y-%m-%d')] = count
+                continue
+            try:
+                i = day_index[report_date]
+            except KeyError:
+                continue
+            try:
+                row = historic_counts[signature_id]
+            except KeyError:
+                row = historic_counts[signature_id] = empty_row[:]
+            row[i] = max(0.00001, count)
 
         logger.info('Finding explosive crashes with {0}'.format(modelcls))
 
-        for signature_id, count in today_counts.iteritems():
-            if count > self.config.min_count:
-                counts = historic_counts.get(signature_id, {})
-                _temp_current = start
-
-                # Makes sure each data has data.
-                crash_counts = []
-                while _temp_current < today:
-                    c = counts.get(_temp_current.strftime('%Y-%m-%d'), 0)
-
-                    # Preventing a division by 0 error.
-                    c = max(0.00001, c)
-                    crash_counts.append(c)
-                    _temp_current += datetime.timedelta(1)
-
-                model = modelcls(crash_counts)
-                if model.is_explosive(count):
-                    self._add_explosive_entry(signature_id, today, connection)
+        min_count = self.config.min_count
+        series = (
+            (signature_id, historic_counts.get(signature_id, empty_row), count)
+            for signature_id, count in today_counts.iteritems()
+            if count > min_count
+        )
+        self._add_explosive_entries(
+            modelcls.find_explosive(series),
+            today,
+            connection
+        )
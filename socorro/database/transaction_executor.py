@@ -28,6 +28,9 @@ class TransactionExecutor(RequiredConfig):
         self.db_conn_context_source = db_conn_context_source
         self.quit_check = quit_check_callback or (lambda: False)
         self.do_quit_check = True
+        # the number of times a transaction has been retried over the
+        # lifetime of this executor, read by monitoring wrappers
+        self.retry_count = 0
 
     #--------------------------------------------------------------------------
     @property
@@ -148,6 +151,7 @@ class TransactionExecutorWithInfiniteBackoff(TransactionExecutor):
                     return
                 raise
 
+            self.retry_count += 1
             self.db_conn_context_source.force_reconnect()
             self.config.logger.debug(
                 'retry in %s seconds' % wait_in_seconds
@@ -10,8 +10,13 @@ import sys
 import os
 import collections
 import datetime
+import json
+import threading
+import time
 
 from socorro.lib.util import DotDict as SocorroDotDict
+from socorro.lib.datetimeutil import JsonDTEncoder
+from socorro.lib.histogram import Histogram
 
 from configman import Namespace,  RequiredConfig
 from configman.converters import classes_in_namespaces_converter, \
@@ -1231,3 +1236,643 @@ class BenchmarkingCrashStorage(CrashStorageBase):
             self.tag,
             end_time - start_time
         )
+
+
+#==============================================================================
+class MetricsCrashStorage(CrashStorageBase):
+    """a wrapper around crash stores that keeps latency histograms for every
+    operation.  Each call is classified as a success, a CrashIDNotFound or an
+    error and timed into a histogram for that outcome.  The bytes moved and
+    the retries made by the wrapped store's transaction executors are counted
+    alongside.  Every 'metrics_flush_interval' seconds the aggregates are
+    logged, sent to statsd as gauges and appended as a line of JSON to a
+    local stats file, then reset for the next interval.  Latencies are
+    recorded in microseconds."""
+    required_config = Namespace()
+    required_config.add_option(
+        name="wrapped_crashstore",
+        doc="another crash store to be measured",
+        default='',
+        from_string_converter=class_converter
+    )
+    required_config.add_option(
+        name="metrics_tag",
+        doc="the name of the store in the metrics (defaults to the class "
+            "name of the wrapped crash store)",
+        default='',
+    )
+    required_config.add_option(
+        name="metrics_flush_interval",
+        doc="seconds between reports of the aggregated metrics",
+        default=60,
+    )
+    required_config.add_option(
+        name="metrics_pathname",
+        doc="a file to append a line of JSON to on every report (leave "
+            "empty for none)",
+        default='',
+    )
+    required_config.add_option(
+        name="count_document_bytes",
+        doc="serialize raw and processed crashes to count their bytes as "
+            "well as the bytes of the dumps",
+        default=False,
+    )
+    required_config.add_option(
+        'statsd_class',
+        doc='the fully qualified name of the statsd client',
+        default='socorro.external.statsd.dogstatsd.StatsClient',
+        reference_value_from='resource.statsd',
+        from_string_converter=class_converter,
+    )
+    required_config.add_option(
+        'statsd_host',
+        doc='the hostname of statsd (leave empty to not use statsd)',
+        default='',
+        reference_value_from='resource.statsd',
+    )
+    required_config.add_option(
+        'statsd_port',
+        doc='the port number for statsd',
+        default=8125,
+        reference_value_from='resource.statsd',
+    )
+    required_config.add_option(
+        'metrics_statsd_prefix',
+        doc='a string to be used as the prefix for statsd names',
+        default='crashstorage',
+    )
+
+    # the attributes under which crash stores keep their transaction
+    # executors
+    transaction_executor_names = (
+        'transaction',
+        'transaction_executor',
+        'transaction_for_get',
+    )
+
+    #--------------------------------------------------------------------------
+    def __init__(self, config, quit_check_callback=None):
+        super(MetricsCrashStorage, self).__init__(
+            config,
+            quit_check_callback
+        )
+        self.wrapped_crashstore = config.wrapped_crashstore(
+            config,
+            quit_check_callback)
+        self.store_name = (
+            config.metrics_tag or
+            self.wrapped_crashstore.__class__.__name__
+        )
+        self.transaction_executors = [
+            getattr(self.wrapped_crashstore, name)
+            for name in self.transaction_executor_names
+            if hasattr(
+                getattr(self.wrapped_crashstore, name, None),
+                'retry_count'
+            )
+        ]
+        if config.statsd_host:
+            self.prefix = config.metrics_statsd_prefix or ''
+            self.statsd = config.statsd_class(
+                config.statsd_host,
+                config.statsd_port,
+                self.prefix
+            )
+        else:
+            self.statsd = None
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._last_flush = time.time()
+
+    #--------------------------------------------------------------------------
+    def _retry_count(self):
+        return sum(
+            executor.retry_count for executor in self.transaction_executors
+        )
+
+    #--------------------------------------------------------------------------
+    def _document_size(self, document):
+        if not self.config.count_document_bytes:
+            return 0
+        try:
+            return len(json.dumps(document, cls=JsonDTEncoder))
+        except (TypeError, ValueError):
+            return 0
+
+    #--------------------------------------------------------------------------
+    @staticmethod
+    def _file_size(pathname):
+        try:
+            return os.path.getsize(pathname)
+        except (OSError, TypeError):
+            return 0
+
+    #--------------------------------------------------------------------------
+    @classmethod
+    def _dumps_size(cls, dumps):
+        if isinstance(dumps, basestring):
+            return len(dumps)
+        if isinstance(dumps, FileDumpsMapping):
+            return sum(cls._file_size(x) for x in dumps.itervalues())
+        try:
+            return sum(len(x) for x in dumps.itervalues())
+        except (AttributeError, TypeError):
+            return 0
+
+    #--------------------------------------------------------------------------
+    def _call(self, operation, function, args, byte_count=0,
+              result_size=None):
+        """call 'function' with 'args' on behalf of 'operation' and record
+        how long it took, how it ended and how many bytes and retries it
+        cost"""
+        retries_before = self._retry_count()
+        start_time = time.time()
+        try:
+            result = function(*args)
+        except CrashIDNotFound:
+            self._record(operation, 'not_found', start_time, retries_before,
+                         byte_count)
+            raise
+        except Exception:
+            self._record(operation, 'error', start_time, retries_before,
+                         byte_count)
+            raise
+        if result_size is not None:
+            byte_count += result_size(result)
+        self._record(operation, 'success', start_time, retries_before,
+                     byte_count)
+        return result
+
+    #--------------------------------------------------------------------------
+    def _record(self, operation, outcome, start_time, retries_before,
+                byte_count):
+        now = time.time()
+        # the executors may be shared between threads, so retries made on
+        # behalf of a concurrent call can be attributed to this one.  The
+        # totals per interval are exact.
+        retries = self._retry_count() - retries_before
+        with self._lock:
+            try:
+                metrics = self._metrics[operation]
+            except KeyError:
+                metrics = self._metrics[operation] = {
+                    'histograms': {},
+                    'bytes': 0,
+                    'retries': 0,
+                }
+            try:
+                histogram = metrics['histograms'][outcome]
+            except KeyError:
+                histogram = metrics['histograms'][outcome] = Histogram()
+            histogram.record((now - start_time) * 1000000)
+            metrics['bytes'] += byte_count
+            metrics['retries'] += retries
+            flush_due = (
+                now - self._last_flush >= self.config.metrics_flush_interval
+            )
+        if flush_due:
+            self.flush()
+
+    #--------------------------------------------------------------------------
+    def flush(self):
+        """report the metrics gathered since the last flush and start over.
+        Returns the report as a mapping."""
+        with self._lock:
+            metrics, self._metrics = self._metrics, {}
+            now = time.time()
+            interval = now - self._last_flush
+            self._last_flush = now
+        report = {
+            'store': self.store_name,
+            'time': now,
+            'interval': interval,
+            'operations': {},
+        }
+        for operation, operation_metrics in sorted(metrics.items()):
+            report['operations'][operation] = {
+                'bytes': operation_metrics['bytes'],
+                'retries': operation_metrics['retries'],
+            }
+            for outcome, histogram in operation_metrics['histograms'].items():
+                report['operations'][operation][outcome] = histogram.summary()
+        if report['operations']:
+            self._report_to_log(report)
+            if self.statsd is not None:
+                self._report_to_statsd(report)
+            if self.config.metrics_pathname:
+                self._report_to_file(report)
+        return report
+
+    #--------------------------------------------------------------------------
+    def _report_to_log(self, report):
+        for operation, values in sorted(report['operations'].items()):
+            success = values.get('success', {})
+            self.config.logger.info(
+                '%s %s: %d ok (p50 %sus, p99 %sus, max %sus), %d not found, '
+                '%d errors, %d retries, %d bytes',
+                self.store_name,
+                operation,
+                success.get('count', 0),
+                success.get('p50'),
+                success.get('p99'),
+                success.get('max'),
+                values.get('not_found', {}).get('count', 0),
+                values.get('error', {}).get('count', 0),
+                values['retries'],
+                values['bytes'],
+            )
+
+    #--------------------------------------------------------------------------
+    def _make_name(self, *args):
+        names = [self.prefix] if self.prefix else []
+        names.extend(list(args))
+        return '.'.join(x for x in names if x)
+
+    #--------------------------------------------------------------------------
+    def _report_to_statsd(self, report):
+        for operation, values in report['operations'].items():
+            for counter in ('bytes', 'retries'):
+                self.statsd.gauge(
+                    self._make_name(self.store_name, operation, counter),
+                    values[counter]
+                )
+            for outcome in ('success', 'not_found', 'error'):
+                if outcome not in values:
+                    continue
+                for key, value in values[outcome].items():
+                    if value is None:
+                        continue
+                    if key != 'count':
+                        # statsd timings are conventionally milliseconds
+                        value = value / 1000.0
+                    self.statsd.gauge(
+                        self._make_name(
+                            self.store_name,
+                            operation,
+                            outcome,
+                            key
+                        ),
+                        value
+                    )
+
+    #--------------------------------------------------------------------------
+    def _report_to_file(self, report):
+        try:
+            with open(self.config.metrics_pathname, 'a') as f:
+                f.write(json.dumps(report, sort_keys=True))
+                f.write('\n')
+        except IOError:
+            self.config.logger.warning(
+                'unable to write crash storage metrics to %s',
+                self.config.metrics_pathname,
+                exc_info=True
+            )
+
+    #--------------------------------------------------------------------------
+    def close(self):
+        """report the metrics of the final partial interval and close the
+        wrapped crash store"""
+        self.flush()
+        self.wrapped_crashstore.close()
+
+    #--------------------------------------------------------------------------
+    def save_raw_crash(self, raw_crash, dumps, crash_id):
+        self._call(
+            'save_raw_crash',
+            self.wrapped_crashstore.save_raw_crash,
+            (raw_crash, dumps, crash_id),
+            byte_count=(
+                self._document_size(raw_crash) + self._dumps_size(dumps)
+            ),
+        )
+
+    #--------------------------------------------------------------------------
+    def save_processed(self, processed_crash):
+        self._call(
+            'save_processed',
+            self.wrapped_crashstore.save_processed,
+            (processed_crash,),
+            byte_count=self._document_size(processed_crash),
+        )
+
+    #--------------------------------------------------------------------------
+    def save_raw_and_processed(self, raw_crash, dumps, processed_crash,
+                               crash_id):
+        self._call(
+            'save_raw_and_processed',
+            self.wrapped_crashstore.save_raw_and_processed,
+            (raw_crash, dumps, processed_crash, crash_id),
+            byte_count=(
+                self._document_size(raw_crash) +
+                self._dumps_size(dumps) +
+                self._document_size(processed_crash)
+            ),
+        )
+
+    #--------------------------------------------------------------------------
+    def get_raw_crash(self, crash_id):
+        return self._call(
+            'get_raw_crash',
+            self.wrapped_crashstore.get_raw_crash,
+            (crash_id,),
+            result_size=self._document_size,
+        )
+
+    #--------------------------------------------------------------------------
+    def get_raw_dump(self, crash_id, name=None):
+        return self._call(
+            'get_raw_dump',
+            self.wrapped_crashstore.get_raw_dump,
+            (crash_id, name),
+            result_size=self._dumps_size,
+        )
+
+    #--------------------------------------------------------------------------
+    def get_raw_dumps(self, crash_id):
+        return self._call(
+            'get_raw_dumps',
+            self.wrapped_crashstore.get_raw_dumps,
+            (crash_id,),
+            result_size=self._dumps_size,
+        )
+
+    #--------------------------------------------------------------------------
+    def get_raw_dumps_as_files(self, crash_id):
+        return self._call(
+            'get_raw_dumps_as_files',
+            self.wrapped_crashstore.get_raw_dumps_as_files,
+            (crash_id,),
+            result_size=lambda dumps: sum(
+                self._file_size(x) for x in dumps.itervalues()
+            ),
+        )
+
+    #--------------------------------------------------------------------------
+    def get_unredacted_processed(self, crash_id):
+        return self._call(
+            'get_unredacted_processed',
+            self.wrapped_crashstore.get_unredacted_processed,
+            (crash_id,),
+            result_size=self._document_size,
+        )
+
+    #--------------------------------------------------------------------------
+    def remove(self, crash_id):
+        self._call(
+            'remove',
+            self.wrapped_crashstore.remove,
+            (crash_id,),
+        )
+
+
+#==============================================================================
+class SpoolingCrashStorage(CrashStorageBase):
+    """a write-ahead spool in front of slow crash storage.  Raw crashes are
+    saved to a local 'spool' store, typically an FSDatedRadixTreeStorage with
+    'fsync' turned on, and the save returns as soon as they are durable there.
+    A background mover thread drains the spool's 'new_crashes' into the
+    'destination' store, the way the crashmover app would, and removes each
+    crash from the spool once the destination has it.  A crash the
+    destination fails to take is put back into the spool for the next pass.
+    The number of spooled crashes is kept as 'spool_depth', logged with each
+    pass of the mover and sent to statsd as a gauge."""
+    required_config = Namespace()
+    required_config.spool = Namespace()
+    required_config.spool.add_option(
+      'storage_class',
+      doc='storage class for the local spool, it must have new_crashes',
+      default='socorro.external.fs.crashstorage.FSDatedRadixTreeStorage',
+      from_string_converter=class_converter
+    )
+    required_config.destination = Namespace()
+    required_config.destination.add_option(
+      'storage_class',
+      doc='storage class for the final destination of crashes',
+      default='',
+      from_string_converter=class_converter
+    )
+    required_config.add_option(
+        'mover_interval',
+        doc='seconds the mover waits between passes over the spool',
+        default=5.0,
+    )
+    required_config.add_option(
+        'statsd_class',
+        doc='the fully qualified name of the statsd client',
+        default='socorro.external.statsd.dogstatsd.StatsClient',
+        reference_value_from='resource.statsd',
+        from_string_converter=class_converter,
+    )
+    required_config.add_option(
+        'statsd_host',
+        doc='the hostname of statsd (leave empty to not use statsd)',
+        default='',
+        reference_value_from='resource.statsd',
+    )
+    required_config.add_option(
+        'statsd_port',
+        doc='the port number for statsd',
+        default=8125,
+        reference_value_from='resource.statsd',
+    )
+    required_config.add_option(
+        'spool_depth_statsd_name',
+        doc='the statsd name of the spool depth gauge',
+        default='collector.spool_depth',
+    )
+
+    #--------------------------------------------------------------------------
+    def __init__(self, config, quit_check_callback=None):
+        super(SpoolingCrashStorage, self).__init__(
+            config,
+            quit_check_callback
+        )
+        self.spool_store = config.spool.storage_class(
+            config.spool,
+            quit_check_callback
+        )
+        self.destination_store = config.destination.storage_class(
+            config.destination,
+            quit_check_callback
+        )
+        self.logger = self.config.logger
+        if config.statsd_host:
+            self.statsd = config.statsd_class(
+                config.statsd_host,
+                config.statsd_port,
+                ''
+            )
+        else:
+            self.statsd = None
+        self._lock = threading.Lock()
+        # crashes left in the spool by a previous run are still to be moved
+        try:
+            self.spool_depth = self.spool_store.count_new_crashes()
+        except AttributeError:
+            self.spool_depth = 0
+        self._stop_event = threading.Event()
+        self._mover = threading.Thread(
+            target=self._mover_loop,
+            name='SpoolMover'
+        )
+        self._mover.daemon = True
+        self._mover.start()
+
+    #--------------------------------------------------------------------------
+    def _adjust_depth(self, change):
+        with self._lock:
+            self.spool_depth += change
+
+    #--------------------------------------------------------------------------
+    def close(self):
+        """stop the mover after the crash it is moving and close both
+        storage systems.  Whatever is still spooled is moved by the next
+        run."""
+        self._stop_event.set()
+        self._mover.join()
+        poly_exception = PolyStorageError()
+        for a_store in (self.spool_store, self.destination_store):
+            try:
+                a_store.close()
+            except NotImplementedError:
+                pass
+            except Exception:
+                poly_exception.gather_current_exception()
+        if len(poly_exception.exceptions) > 1:
+            raise poly_exception
+
+    #--------------------------------------------------------------------------
+    def save_raw_crash(self, raw_crash, dumps, crash_id):
+        """save the crash to the spool only, the mover takes it from there"""
+        self.spool_store.save_raw_crash(raw_crash, dumps, crash_id)
+        self._adjust_depth(1)
+
+    #--------------------------------------------------------------------------
+    def _move(self, crash_id):
+        """move one crash from the spool to the destination, returns False if
+        the crash could not be read or the destination failed and the crash
+        is still spooled"""
+        try:
+            raw_crash = self.spool_store.get_raw_crash(crash_id)
+            dumps = self.spool_store.get_raw_dumps(crash_id)
+        except Exception:
+            self.logger.error(
+                'unable to read spooled crash %s, it stays spooled',
+                crash_id,
+                exc_info=True
+            )
+            return False
+        try:
+            self.destination_store.save_raw_crash(raw_crash, dumps, crash_id)
+        except Exception:
+            self.logger.error(
+                'unable to move spooled crash %s, it stays spooled',
+                crash_id,
+                exc_info=True
+            )
+            return False
+        self._adjust_depth(-1)
+        try:
+            self.spool_store.remove(crash_id)
+        except Exception:
+            self.logger.error(
+                'unable to remove moved crash %s from the spool',
+                crash_id,
+                exc_info=True
+            )
+        return True
+
+    #--------------------------------------------------------------------------
+    def _respool(self, crash_ids):
+        """save the crashes that were not moved to the spool again, so
+        that a later pass offers them as new.  This must wait for the end of
+        the pass: while new_crashes is suspended on a crash, the spool still
+        holds the links that mark it as new."""
+        for crash_id in crash_ids:
+            try:
+                self.spool_store.save_raw_crash(
+                    self.spool_store.get_raw_crash(crash_id),
+                    self.spool_store.get_raw_dumps(crash_id),
+                    crash_id
+                )
+            except Exception:
+                self.logger.error(
+                    'unable to respool crash %s',
+                    crash_id,
+                    exc_info=True
+                )
+
+    #--------------------------------------------------------------------------
+    def move_spooled_crashes(self):
+        """one pass of the mover over the spool, returns the number of
+        crashes moved"""
+        moved = 0
+        failed = []
+        new_crashes = self.spool_store.new_crashes()
+        for crash_id in new_crashes:
+            if self._move(crash_id):
+                moved += 1
+            else:
+                failed.append(crash_id)
+            if self._stop_event.is_set():
+                # resuming once more lets the spool forget the crash just
+                # visited, the one it offers next stays spooled
+                next(new_crashes, None)
+                break
+        self._respool(failed)
+        return moved
+
+    #--------------------------------------------------------------------------
+    def _report_depth(self, moved):
+        if moved or self.spool_depth:
+            self.logger.info(
+                'spool mover moved %d crashes, %d remain spooled',
+                moved,
+                self.spool_depth
+            )
+        if self.statsd:
+            self.statsd.gauge(
+                self.config.spool_depth_statsd_name,
+                self.spool_depth
+            )
+
+    #--------------------------------------------------------------------------
+    def _mover_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                moved = self.move_spooled_crashes()
+                self._report_depth(moved)
+            except Exception:
+                self.logger.error('spool mover pass failed', exc_info=True)
+            self._stop_event.wait(self.config.mover_interval)
+
+    #--------------------------------------------------------------------------
+    def get_raw_crash(self, crash_id):
+        """get a raw crash from the spool and if it has already been moved
+        then from the destination"""
+        try:
+            return self.spool_store.get_raw_crash(crash_id)
+        except CrashIDNotFound:
+            return self.destination_store.get_raw_crash(crash_id)
+
+    #--------------------------------------------------------------------------
+    def get_raw_dump(self, crash_id, name=None):
+        try:
+            return self.spool_store.get_raw_dump(crash_id, name)
+        except CrashIDNotFound:
+            return self.destination_store.get_raw_dump(crash_id, name)
+
+    #--------------------------------------------------------------------------
+    def get_raw_dumps(self, crash_id):
+        try:
+            return self.spool_store.get_raw_dumps(crash_id)
+        except CrashIDNotFound:
+            return self.destination_store.get_raw_dumps(crash_id)
+
+    #--------------------------------------------------------------------------
+    def get_raw_dumps_as_files(self, crash_id):
+        try:
+            return self.spool_store.get_raw_dumps_as_files(crash_id)
+        except CrashIDNotFound:
+            return self.destination_store.get_raw_dumps_as_files(crash_id)
@@ -385,6 +385,18 @@ class SuperSearch(SearchBase):
         results_to = results_from + results_number
         search = search[results_from:results_to]
 
+        # When no hits are requested, only the total and the aggregations
+        # matter. Using the `count` search type skips the fetch phase
+        # entirely, which makes facet-heavy queries much cheaper.
+        aggregations_only = results_number == 0
+        if aggregations_only:
+            search = search.params(search_type='count')
+
+        # Indices that do not exist in elasticsearch are ignored instead of
+        # raising an error, so a date range that covers days without data
+        # does not require a round trip per missing index.
+        search = search.params(ignore_unavailable=True)
+
         # Create facets.
         for param in params['_facets']:
             for value in param.value:
@@ -483,10 +495,13 @@ class SuperSearch(SearchBase):
         while True:
             try:
                 results = search.execute()
-                for hit in results:
-                    hits.append(self.format_fields(hit.to_dict()))
+                if not aggregations_only:
+                    for hit in results:
+                        hits.append(self.format_fields(hit.to_dict()))
 
-                total = search.count()
+                # The total is part of the search response, there is no
+                # need to run a second `count` query.
+                total = results.hits.total
                 aggregations = self.format_aggregations(results.aggregations)
                 break  # Yay! Results!
             except NotFoundError, e:
@@ -3,6 +3,7 @@
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 import datetime
+import errno
 import json
 import os
 import gzip
@@ -23,7 +24,7 @@ from socorro.external.crashstorage_base import (
     FileDumpsMapping,
     MemoryDumpsMapping
 )
-from socorro.lib.ooid import dateFromOoid, depthFromOoid
+from socorro.lib.ooid import dateFromOoid, depthFromOoid, Ooid
 from socorro.lib.datetimeutil import utc_now
 from socorro.lib.util import DotDict
 
@@ -111,6 +112,14 @@ class FSRadixTreeStorage(CrashStorageBase):
         default='name',
         reference_value_from='resource.fs',
     )
+    required_config.add_option(
+        'fsync',
+        doc='flush saved crashes all the way to disk before returning, for '
+            'when the file system is a spool that must survive a crash of '
+            'the host',
+        default=False,
+        reference_value_from='resource.fs',
+    )
 
     def __init__(self, *args, **kwargs):
         super(FSRadixTreeStorage, self).__init__(*args, **kwargs)
@@ -145,6 +154,8 @@ class FSRadixTreeStorage(CrashStorageBase):
 
     @staticmethod
     def _get_radix(crash_id):
+        if isinstance(crash_id, Ooid):
+            return list(crash_id.radix)
         return [crash_id[i * 2:(i + 1) * 2]
                 for i in range(depthFromOoid(crash_id))]
 
@@ -186,6 +197,21 @@ class FSRadixTreeStorage(CrashStorageBase):
             for fn, contents in files.iteritems():
                 with open(os.sep.join([parent_dir, fn]), 'wb') as f:
                     f.write(contents)
+                    if self.config.fsync:
+                        f.flush()
+                        os.fsync(f.fileno())
+        if self.config.fsync:
+            self._fsync_directory(parent_dir)
+
+    @staticmethod
+    def _fsync_directory(pathname):
+        """new directory entries are only durable once their directory has
+        been flushed too"""
+        fd = os.open(pathname, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
 
     def save_processed(self, processed_crash):
         crash_id = processed_crash['uuid']
@@ -412,6 +438,9 @@ class FSDatedRadixTreeStorage(FSRadixTreeStorage):
             # can fail will fail first and not leave an orphan symlink behind.
             self._create_date_to_name_symlink(crash_id, slot)
             self._create_name_to_date_symlink(crash_id, slot)
+        if self.config.fsync:
+            self._fsync_directory(self._get_radixed_parent_directory(crash_id))
+            self._fsync_directory(parent_dir)
 
     def remove(self, crash_id):
         dated_path = os.path.realpath(
@@ -432,7 +461,13 @@ class FSDatedRadixTreeStorage(FSRadixTreeStorage):
     def _visit_minute_slot(self, minute_slot_base):
         for crash_id in os.listdir(minute_slot_base):
             namedir = os.sep.join([minute_slot_base, crash_id])
-            st_result = os.lstat(namedir)
+            try:
+                st_result = os.lstat(namedir)
+            except OSError, x:
+                if x.errno != errno.ENOENT:
+                    raise
+                # another process sharing the tree visited it first
+                continue
 
             if stat.S_ISLNK(st_result.st_mode):
                 # This is a link, so we can dereference it to find
@@ -455,7 +490,25 @@ class FSDatedRadixTreeStorage(FSRadixTreeStorage):
                                           namedir,
                                           exc_info=True)
 
-                    os.unlink(namedir)
+                    try:
+                        os.unlink(namedir)
+                    except OSError, x:
+                        if x.errno != errno.ENOENT:
+                            raise
+
+    def count_new_crashes(self):
+        """count the crashes that ``new_crashes`` has yet to visit, the links
+        in the slots of every date"""
+        count = 0
+        for date in os.listdir(self.config.fs_root):
+            dated_base = os.sep.join([self.config.fs_root, date,
+                                      self.config.date_branch_base])
+            for path, dirs, files in os.walk(dated_base):
+                count += sum(
+                    1 for name in dirs + files
+                    if os.path.islink(os.sep.join([path, name]))
+                )
+        return count
 
     def new_crashes(self):
         """
@@ -3,10 +3,15 @@
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 import datetime
+import fcntl
+import marshal
+import mmap
 import os
 import re
 import stat
+import struct
 import tempfile
+import threading
 import time
 
 import requests
@@ -29,9 +34,132 @@ def file_age(f):
 COUNT_REGEX = re.compile('\((\d+) crashes\)')
 SIGNATURE_LINE_START_REGEX = re.compile('\s{2}\w')
 
+MARSHAL_VERSION = 2
+
+
+def build_index(content):
+    """parse the text of a correlations report and return it serialized in
+    the format read by CorrelationsIndex.  The serialized form starts
+    with a header and a marshalled dict of every key to the offset and
+    length of its record, after that come the marshalled records.  The
+    keys are:
+        None - the list of platforms in the order of the report
+        (platform, None) - the list of signatures of a platform
+        (platform, signature) - a (reason, count, load) tuple"""
+    records = {}
+    platforms = []
+    platform = None
+    current_load = None
+    for line in content.splitlines():
+        if line and not line.startswith(' '):
+            # change of platform
+            platform = line
+            current_load = None
+            if (platform, None) not in records:
+                platforms.append(platform)
+                records[(platform, None)] = []
+            continue
+        if platform is None:
+            continue
+
+        # if starts with exactly two spaces it contains the signature
+        if SIGNATURE_LINE_START_REGEX.match(line):
+            if '|' in line:
+                this_signature = line.split('|')[-2].strip()
+            else:
+                # less obvious
+                # default to everything *but* the count
+                this_signature = COUNT_REGEX.sub('', line).strip()
+            records[(platform, None)].append(this_signature)
+
+        if current_load is not None:
+            if not line.strip():
+                current_load = None
+            else:
+                current_load.append(line.strip())
+        elif '|' in line:
+            this_signature = line.split('|')[-2].strip()
+            key = (platform, this_signature)
+            if key in records:
+                # only the first mention of a signature counts
+                continue
+            rest = line.split('|')[-1]
+            reason = rest.split('(')[0].strip()
+            counts = COUNT_REGEX.findall(rest)
+            current_load = []
+            records[key] = (
+                reason,
+                int(counts[0]) if counts else None,
+                current_load
+            )
+    records[None] = platforms
+
+    offsets = {}
+    chunks = []
+    offset = 0
+    for key, value in records.iteritems():
+        chunk = marshal.dumps(value, MARSHAL_VERSION)
+        offsets[key] = (offset, len(chunk))
+        chunks.append(chunk)
+        offset += len(chunk)
+    index = marshal.dumps(offsets, MARSHAL_VERSION)
+    return (
+        CorrelationsIndex.HEADER.pack(CorrelationsIndex.MAGIC, len(index)) +
+        index +
+        ''.join(chunks)
+    )
+
+
+class CorrelationsIndex(object):
+    """the platform -> signature -> (reason, count, load) index of one
+    correlations report.  Only the offsets are read up front, a record is
+    unmarshalled from the buffer, a string or an mmap of an index file,
+    when it is asked for."""
+
+    HEADER = struct.Struct('!4sI')
+    MAGIC = 'SCI1'
+
+    def __init__(self, buffer):
+        magic, length = self.HEADER.unpack(buffer[:self.HEADER.size])
+        if magic != self.MAGIC:
+            raise ValueError('not a correlations index')
+        self.buffer = buffer
+        self.start = self.HEADER.size + length
+        self.offsets = marshal.loads(buffer[self.HEADER.size:self.start])
+
+    @classmethod
+    def from_file(cls, filepath):
+        with open(filepath, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer)
+
+    def _record(self, key, default):
+        try:
+            offset, length = self.offsets[key]
+        except KeyError:
+            return default
+        offset += self.start
+        return marshal.loads(self.buffer[offset:offset + length])
+
+    def get(self, platform, signature):
+        """return (reason, count, load) of a signature on a platform"""
+        return self._record((platform, signature), (None, None, []))
+
+    def signatures(self, platforms):
+        """return a list of signatures that these platforms mention"""
+        signatures = []
+        for platform in self._record(None, []):
+            if platform in platforms:
+                signatures.extend(self._record((platform, None), []))
+        return signatures
+
 
 class Correlations(object):
 
+    # the indexes that have been opened in this process by their file path
+    _indexes = {}
+    _indexes_lock = threading.Lock()
+
     def __init__(self, *args, **kwargs):
         self.config = kwargs.get('config')
 
@@ -46,24 +174,25 @@ class Correlations(object):
         params = external_common.parse_arguments(filters, kwargs)
 
         try:
-            content = self._get_content(params)
+            index = self._get_index(params)
         except NotFoundError, msg:
             self.config.logger.info('Failed to download %s' % msg)
             return
 
-        data = self._parse_content(
-            content,
+        reason, count, load = index.get(
             params['platform'],
             params['signature']
         )
-        reason, count, load = data
         return {
             'reason': reason,
             'count': count,
             'load': '\n'.join(load),
         }
 
-    def _get_content(self, params):
+    def _get_index(self, params):
+        """return the CorrelationsIndex of yesterday's report.  Each report
+        is downloaded and indexed once per day by whichever process gets to
+        it first, the others wait for it and then use its index file."""
         if 'http' in self.config and 'correlations' in self.config.http:
             # new middleware!
             base_url = self.config.http.correlations.base_url
@@ -82,29 +211,66 @@ class Correlations(object):
             '%(date)s/%(date)s_%(product)s_%(version)s-%(report_type)s'
             % dict(params, date=date.strftime('%Y%m%d'))
         )
+        if not save_download:
+            return CorrelationsIndex(build_index(self._download(url_start)))
+
         if not save_root:
             save_root = tempfile.gettempdir()
         save_dir = os.path.join(save_root, date.strftime('%Y%m%d'))
         if not os.path.isdir(save_dir):
-            os.mkdir(save_dir)
-
-        tmp_filepath = os.path.join(
+            try:
+                os.mkdir(save_dir)
+            except OSError:
+                # another process got there first
+                if not os.path.isdir(save_dir):
+                    raise
+
+        index_filepath = os.path.join(
             save_dir,
-            '%s.txt' % url_start.split('/')[-1]
+            '%s.index' % url_start.split('/')[-1]
         )
 
-        if (
-            save_download and
-            os.path.isfile(tmp_filepath) and
-            file_age(tmp_filepath) < save_seconds
-        ):
-            content = open(tmp_filepath).read()
-        else:
-            content = self._download(url_start)
-            if save_download:
-                with open(tmp_filepath, 'w') as f:
-                    f.write(content)
-        return content
+        def is_fresh():
+            return (
+                os.path.isfile(index_filepath) and
+                file_age(index_filepath) < save_seconds
+            )
+
+        if not is_fresh():
+            with open(index_filepath + '.lock', 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    # it might have been refreshed while waiting for the lock
+                    if not is_fresh():
+                        content = build_index(self._download(url_start))
+                        temp_filepath = '%s.%d.tmp' % (
+                            index_filepath,
+                            os.getpid()
+                        )
+                        with open(temp_filepath, 'wb') as f:
+                            f.write(content)
+                        os.rename(temp_filepath, index_filepath)
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return self._open_index(index_filepath, save_dir)
+
+    @classmethod
+    def _open_index(cls, index_filepath, save_dir):
+        inode = os.stat(index_filepath).st_ino
+        with cls._indexes_lock:
+            for filepath in cls._indexes.keys():
+                # the indexes of other days have expired
+                if os.path.dirname(filepath) != save_dir:
+                    del cls._indexes[filepath]
+            try:
+                index_inode, index = cls._indexes[index_filepath]
+                if index_inode == inode:
+                    return index
+            except KeyError:
+                pass
+            index = CorrelationsIndex.from_file(index_filepath)
+            cls._indexes[index_filepath] = (inode, index)
+            return index
 
     @staticmethod
     def _download(url_start):
@@ -120,44 +286,6 @@ class Correlations(object):
             else:
                 raise DownloadError(url_start + '(.txt|.txt.gz)')
 
-    @staticmethod
-    def _parse_content(content, platform, signature):
-
-        on = False
-        reason = count = None
-        signature_found = False
-        load = []
-        this_platform = None
-        for line in content.splitlines():
-            if line and not line.startswith(' '):
-                # change of platform
-                this_platform = line
-                if this_platform == platform:
-                    on = True
-                elif on:
-                    # was on
-                    break
-            elif on:
-                try:
-                    this_signature = line.split('|')[-2].strip()
-                    if this_signature == signature:
-                        if signature_found:
-                            break
-                        signature_found = True
-                        rest = line.split('|')[-1]
-                        reason = rest.split('(')[0].strip()
-                        count = int(COUNT_REGEX.findall(rest)[0])
-                        continue
-                except IndexError:
-                    pass
-                if signature_found:
-                    if not line.strip():
-                        break
-                    else:
-                        load.append(line.strip())
-
-        return reason, count, load
-
 
 class CorrelationsSignatures(Correlations):
 
@@ -174,39 +302,13 @@ class CorrelationsSignatures(Correlations):
 
         params = external_common.parse_arguments(filters, kwargs)
         try:
-            content = self._get_content(params)
+            index = self._get_index(params)
         except NotFoundError, msg:
             self.config.logger.info('Failed to download %s' % msg)
             return
-        signatures = self._parse_signatures(content, params['platforms'])
+        signatures = index.signatures(params['platforms'])
 
         return {
             'hits': signatures,
             'total': len(signatures),
         }
-
-    @staticmethod
-    def _parse_signatures(content, platforms):
-        """return a list of signatures that these platforms mention"""
-        signatures = []
-
-        on = False
-        for line in content.splitlines():
-            if line and not line.startswith(' '):
-                # change of platform
-                if line in platforms:
-                    on = True
-                else:
-                    on = False
-            elif on:
-                # if starts with exactly two spaces it contains the signature
-                if SIGNATURE_LINE_START_REGEX.match(line):
-                    if '|' in line:
-                        this_signature = line.split('|')[-2].strip()
-                    else:
-                        # less obvious
-                        # default to everything *but* the count
-                        this_signature = COUNT_REGEX.sub('', line).strip()
-                    signatures.append(this_signature)
-
-        return signatures
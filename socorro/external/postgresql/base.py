@@ -5,18 +5,45 @@
 """Deprecated by socorro/external/postgresql/service_base.py"""
 
 import contextlib
+import hashlib
 import logging
+import re
+import sys
+import threading
+import time
+import weakref
 
 import psycopg2
+import psycopg2.extensions
 
 from socorro.external import DatabaseError
 
 from socorro.external.postgresql.dbapi2_util import (
     execute_query_fetchall,
+    execute_query_iter_server_side,
+    execute_query_zipped_iter_server_side,
+    execute_no_results,
     single_value_sql
 )
+from socorro.lib.histogram import Histogram
+
 logger = logging.getLogger("webapi")
 
+# the connection pools of this process, one per dsn
+_pools = {}
+_pools_lock = threading.Lock()
+
+# connection -> the names of the statements prepared on it
+_prepared_statements = weakref.WeakKeyDictionary()
+# sql -> (statement name, the sql with $1, $2... placeholders)
+_statements = {}
+
+# 'Class.method' -> Histogram of the microseconds its queries took
+_latencies = {}
+_latencies_lock = threading.Lock()
+_last_latency_report = [time.time()]
+LATENCY_REPORT_INTERVAL = 300
+
 
 def add_param_to_dict(dictionary, key, value):
     """
@@ -27,12 +54,160 @@ def add_param_to_dict(dictionary, key, value):
     return dictionary
 
 
+class ConnectionPool(object):
+    """A bounded pool of database connections.  `get` waits while all
+    `size` connections are in use.  Connections are handed out again only
+    if they weren't broken and are idle, anything left of a transaction
+    is rolled back when a connection is put back."""
+
+    def __init__(self, connect, size):
+        self.connect = connect
+        self.size = size
+        self._idle = []
+        self._lock = threading.Lock()
+        self._available = threading.BoundedSemaphore(size)
+
+    def get(self):
+        self._available.acquire()
+        try:
+            with self._lock:
+                connection = self._idle.pop() if self._idle else None
+            if connection is None or connection.closed:
+                connection = self.connect()
+            return connection
+        except:
+            self._available.release()
+            raise
+
+    def put(self, connection, broken=False):
+        try:
+            if not broken and not connection.closed:
+                status = connection.get_transaction_status()
+                if status == psycopg2.extensions.TRANSACTION_STATUS_INTRANS:
+                    connection.rollback()
+                    status = connection.get_transaction_status()
+                if status == psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    with self._lock:
+                        self._idle.append(connection)
+                    return
+            try:
+                connection.close()
+            except psycopg2.Error:
+                pass
+        finally:
+            self._available.release()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+def _numbered_placeholders(sql):
+    """turn the positional %s placeholders of a query into the $1, $2...
+    of PREPARE"""
+    counter = [0]
+
+    def replace(match):
+        if match.group(1) == '%':
+            return '%'
+        counter[0] += 1
+        return '$%d' % counter[0]
+
+    return re.sub(r'%([s%])', replace, sql)
+
+
+def execute_prepared_fetchall(connection, sql, parameters=None):
+    """execute `sql` as a statement prepared on the connection, preparing
+    it first if it hasn't been on this connection yet"""
+    try:
+        name, prepared_sql = _statements[sql]
+    except KeyError:
+        name = 'socorro_%s' % hashlib.md5(sql).hexdigest()[:16]
+        prepared_sql = _numbered_placeholders(sql)
+        _statements[sql] = (name, prepared_sql)
+    prepared = _prepared_statements.setdefault(connection, set())
+    if name not in prepared:
+        execute_no_results(
+            connection,
+            'PREPARE %s AS %s' % (name, prepared_sql)
+        )
+        prepared.add(name)
+    if parameters:
+        execute_sql = 'EXECUTE %s (%s)' % (
+            name,
+            ', '.join(['%s'] * len(parameters))
+        )
+    else:
+        execute_sql = 'EXECUTE %s' % name
+    return execute_query_fetchall(connection, execute_sql, parameters)
+
+
+def _caller_name():
+    """return 'Class.method' of the service method that is running a
+    query, that is the first frame outside of this module"""
+    this_file = _caller_name.func_code.co_filename
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_code.co_filename == this_file:
+        frame = frame.f_back
+    if frame is None:
+        return 'unknown'
+    instance = frame.f_locals.get('self')
+    if instance is None:
+        return frame.f_code.co_name
+    return '%s.%s' % (instance.__class__.__name__, frame.f_code.co_name)
+
+
+def record_latency(name, seconds):
+    """add a query's latency to the histogram of the service method that
+    ran it and every LATENCY_REPORT_INTERVAL seconds log the percentiles
+    of all of them"""
+    now = time.time()
+    with _latencies_lock:
+        try:
+            histogram = _latencies[name]
+        except KeyError:
+            histogram = _latencies[name] = Histogram()
+        histogram.record(seconds * 1000000)
+        if now - _last_latency_report[0] < LATENCY_REPORT_INTERVAL:
+            return
+        _last_latency_report[0] = now
+    for name, summary in sorted(query_latencies().items()):
+        logger.info(
+            'query latency of %s: count %d, p50 %sus, p99 %sus, max %sus',
+            name,
+            summary['count'],
+            summary['p50'],
+            summary['p99'],
+            summary['max']
+        )
+
+
+def query_latencies(reset=False):
+    """return the latency summary of the queries of every service method
+    seen so far, keyed by 'Class.method'"""
+    with _latencies_lock:
+        result = dict(
+            (name, histogram.summary())
+            for name, histogram in _latencies.items()
+        )
+        if reset:
+            _latencies.clear()
+    return result
+
+
 class PostgreSQLBase(object):
 
     """
     Base class for PostgreSQL based service implementations.
     """
 
+    # Services that can return big lists of results return them as
+    # generators when this is True, the middleware sets it because it
+    # encodes them as they come. Left False they return lists.
+    stream_results = False
+
     def __init__(self, *args, **kwargs):
         """
         Store the config and create a connection to the database.
@@ -52,14 +227,56 @@ class PostgreSQLBase(object):
             self.database = self.context.database.database_class(
                 self.context.database
             )
+        self.pool = self._get_pool()
+
+    def _get_pool(self):
+        """return the ConnectionPool shared by the services of this process
+        that use the same database or None if pooling isn't configured
+        with a 'connection_pool_size'."""
+        pool_size = None
+        for config in (self.context, self.context.get('database')):
+            try:
+                pool_size = config['connection_pool_size']
+                break
+            except (KeyError, TypeError):
+                pass
+        dsn = getattr(self.database, 'dsn', None)
+        if not pool_size or not dsn:
+            return None
+        with _pools_lock:
+            try:
+                return _pools[dsn]
+            except KeyError:
+                pool = _pools[dsn] = ConnectionPool(
+                    self.database.connection,
+                    int(pool_size)
+                )
+                return pool
+
+    def _acquire(self):
+        if self.pool is None:
+            return self.database.connection()
+        return self.pool.get()
+
+    def _release(self, connection, broken=False):
+        if self.pool is None:
+            connection.close()
+        else:
+            self.pool.put(connection, broken)
 
     @contextlib.contextmanager
     def get_connection(self):
-        connection = self.database.connection()
+        connection = self._acquire()
+        broken = False
         try:
             yield connection
+        except (psycopg2.Error, DatabaseError):
+            # whatever went wrong, don't let the next user of a pooled
+            # connection find out
+            broken = True
+            raise
         finally:
-            connection.close()
+            self._release(connection, broken)
 
     def query(self, sql, params=None, error_message=None, connection=None):
         """Return the result of a query executed against PostgreSQL.
@@ -105,18 +322,88 @@ class PostgreSQLBase(object):
             connection=connection
         )
 
+    def query_iter(
+        self, sql, params=None, error_message=None, zipped=False,
+        fetch_size=1000
+    ):
+        """Return a generator of the rows of a query executed against
+        PostgreSQL.
+
+        The rows are fetched from a server side cursor `fetch_size` at a
+        time, so the memory used doesn't depend on the number of rows. A
+        connection is only taken when the first row is asked for and it's
+        held until the generator is exhausted or closed. If an error
+        occures, log it and raise a DatabaseError.
+
+        Keyword arguments:
+        sql -- SQL query to execute.
+        params -- Parameters to merge into the SQL query when executed.
+        error_message -- Eventual error message to log.
+        zipped -- If True, every row is a DotDict of column names to values.
+        fetch_size -- Number of rows fetched from the server at a time.
+
+        """
+        if zipped:
+            actor_function = execute_query_zipped_iter_server_side
+        else:
+            actor_function = execute_query_iter_server_side
+        connection = self._acquire()
+        broken = False
+        try:
+            for row in actor_function(connection, sql, params, fetch_size):
+                yield row
+            connection.commit()
+        except psycopg2.Error, e:
+            broken = True
+            error_message = "%s - %s" % (
+                error_message or "Failed to execute query against PostgreSQL",
+                str(e)
+            )
+            logger.error(error_message, exc_info=True)
+            connection.rollback()
+            raise DatabaseError(error_message)
+        finally:
+            self._release(connection, broken)
+
+    def prepared_query(
+        self, sql, params=None, error_message=None, connection=None
+    ):
+        """Return the result of a query executed against PostgreSQL as a
+        prepared statement.
+
+        Like `query` except that `sql` may only use positional `%s`
+        placeholders. With pooled connections the statement is prepared
+        once per connection and executed by name after that, otherwise
+        this is the same as `query`.
+
+        """
+        if self.pool is None:
+            actor_function = execute_query_fetchall
+        else:
+            actor_function = execute_prepared_fetchall
+        return self._execute(
+            actor_function,
+            sql,
+            error_message or "Failed to execute query against PostgreSQL",
+            params=params,
+            connection=connection
+        )
+
     def _execute(
         self, actor_function, sql, error_message, params=None, connection=None
     ):
         fresh_connection = False
+        broken = False
+        start = time.time()
         try:
             if not connection:
-                connection = self.database.connection()
+                connection = self._acquire()
                 fresh_connection = True
             # logger.debug(connection.cursor().mogrify(sql, params))
             result = actor_function(connection, sql, params)
             connection.commit()
         except psycopg2.Error, e:
+            broken = True
             error_message = "%s - %s" % (error_message, str(e))
             logger.error(error_message, exc_info=True)
             if connection:
@@ -124,7 +411,8 @@ class PostgreSQLBase(object):
             raise DatabaseError(error_message)
         finally:
             if connection and fresh_connection:
-                connection.close()
+                self._release(connection, broken)
+            record_latency(_caller_name(), time.time() - start)
         return result
 
     @staticmethod
@@ -277,7 +277,8 @@ class Crashes(PostgreSQLBase):
                 sql = "%s GROUP BY %s" % (sql, ", ".join(db_group))
 
         error_message = "Failed to retrieve daily crashes data from PostgreSQL"
-        results = self.query(sql, params, error_message=error_message)
+        # only the hits are kept in memory, not all the rows as well
+        results = self.query_iter(sql, params, error_message=error_message)
 
         hits = {}
         for row in results:
@@ -429,13 +429,23 @@ class PostgreSQLCrashStorage(CrashStorageBase):
             raise CrashIDNotFound(crash_id)
 
     #--------------------------------------------------------------------------
-    @staticmethod
-    def _table_suffix_for_crash_id(crash_id):
+    # the suffix depends only on the date encoded in the last six characters
+    # of a crash_id, each distinct date is worked out once
+    _table_suffixes = {}
+
+    @classmethod
+    def _table_suffix_for_crash_id(cls, crash_id):
         """given an crash_id, return the name of its storage table"""
+        try:
+            return cls._table_suffixes[crash_id[-6:]]
+        except KeyError:
+            pass
         crash_id_date = uuid_to_date(crash_id)
         previous_monday_date = (
             crash_id_date + datetime.timedelta(days=-crash_id_date.weekday())
         )
-        return '%4d%02d%02d' % (previous_monday_date.year,
-                                previous_monday_date.month,
-                                previous_monday_date.day)
+        suffix = '%4d%02d%02d' % (previous_monday_date.year,
+                                  previous_monday_date.month,
+                                  previous_monday_date.day)
+        cls._table_suffixes[crash_id[-6:]] = suffix
+        return suffix
@@ -5,6 +5,7 @@
 """short cuts for ugly Python DBAPI2 syntax"""
 
 from collections import Sequence
+from uuid import uuid4
 
 from socorro.lib.util import DotDict
 
@@ -96,6 +97,44 @@ def execute_query_iter(connection, sql, parameters=None):
                 break
 
 
+#------------------------------------------------------------------------------
+def execute_query_iter_server_side(connection, sql, parameters=None,
+                                   fetch_size=1000):
+    """like 'execute_query_iter' but with a named (server side) cursor.  The
+    result set stays on the server and is fetched 'fetch_size' rows at a
+    time, so memory use does not depend on the number of rows.  Named
+    cursors only live as long as the transaction they were opened in."""
+    cursor_name = 'socorro_%s' % uuid4().hex
+    with connection.cursor(cursor_name) as a_cursor:
+        a_cursor.execute(sql, parameters)
+        while True:
+            rows = a_cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            for a_row in rows:
+                yield a_row
+
+
+#------------------------------------------------------------------------------
+def execute_query_zipped_iter_server_side(connection, sql, parameters=None,
+                                          fetch_size=1000):
+    """like 'execute_query_iter_server_side' but every row is a DotDict of
+    column names to values, the way FetchAllSequence.zipped() has them"""
+    cursor_name = 'socorro_%s' % uuid4().hex
+    with connection.cursor(cursor_name) as a_cursor:
+        a_cursor.execute(sql, parameters)
+        names = None
+        while True:
+            rows = a_cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            if names is None:
+                # a named cursor only has a description once it fetched
+                names = [x.name for x in a_cursor.description]
+            for a_row in rows:
+                yield DotDict(zip(names, a_row))
+
+
 #------------------------------------------------------------------------------
 def execute_query_fetchall(connection, sql, parameters=None):
     with connection.cursor() as a_cursor:
@@ -239,32 +239,42 @@ class Report(PostgreSQLBase):
             "SELECT count(*)", sql_from, sql_where)
         )
 
-        # Querying the DB
-        with self.get_connection() as connection:
+        # Querying the DB.  The count and the rows, which may be streamed,
+        # are read on different connections.  Like two statements of the
+        # same READ COMMITTED transaction they may see different data, the
+        # total is an estimate when crashes are being inserted.
+        total = self.count(
+            sql_count_query,
+            sql_params,
+            error_message="Failed to count crashes from reports."
+        )
+
+        # No need to call Postgres if we know there will be no results
+        if total:
+
+            if include_raw_crash:
+                sql_query = wrapped_select % sql_query
 
-            total = self.count(
-                sql_count_query,
+            results = self.query_iter(
+                sql_query,
                 sql_params,
-                error_message="Failed to count crashes from reports.",
-                connection=connection
+                error_message="Failed to retrieve crashes from reports",
+                zipped=True
             )
+        else:
+            results = []
 
-            # No need to call Postgres if we know there will be no results
-            if total:
-
-                if include_raw_crash:
-                    sql_query = wrapped_select % sql_query
+        crashes = self._clean_crashes(results, include_raw_crash)
+        if not self.stream_results:
+            crashes = list(crashes)
 
-                results = self.query(
-                    sql_query,
-                    sql_params,
-                    error_message="Failed to retrieve crashes from reports",
-                    connection=connection
-                ).zipped()
-            else:
-                results = []
+        return {
+            "hits": crashes,
+            "total": total
+        }
 
-        crashes = []
+    @staticmethod
+    def _clean_crashes(results, include_raw_crash):
         for crash in results:
             assert crash['uuid'] == crash['uuid_text']
             crash.pop('uuid_text')
@@ -275,12 +285,7 @@ class Report(PostgreSQLBase):
                     crash[i] = datetimeutil.date_to_string(crash[i])
                 except TypeError:
                     pass
-            crashes.append(crash)
-
-        return {
-            "hits": crashes,
-            "total": total
-        }
+            yield crash
 
     def generate_sql_select(self, params):
         """
@@ -105,9 +105,11 @@ class SignatureSummary(PostgreSQLBase):
                 products.append(versions_info[elem]["product_name"])
                 versions.append(str(versions_info[elem]["version_string"]))
 
-        # This MUST be a tuple otherwise it gets cast to an array
-        params['product'] = tuple(products)
-        params['version'] = tuple(versions)
+        # These are compared with `= ANY(%s)` and so they are passed as
+        # arrays, that way the same prepared statement serves any number
+        # of products and versions
+        params['product'] = products
+        params['version'] = versions
 
         all_results = {}
         assert isinstance(params['start_date'], datetime.date)
@@ -119,7 +121,7 @@ class SignatureSummary(PostgreSQLBase):
                     report_type,
                     params
                 )
-                sql_results = self.query(
+                sql_results = self.prepared_query(
                     query_string,
                     params=query_parameters,
                     connection=connection
@@ -135,12 +137,12 @@ class SignatureSummary(PostgreSQLBase):
     def _get_query(self, report_type, params):
 
         if params['product'] and report_type is not 'products':
-            product_list = ' AND product_name IN %s '
+            product_list = ' AND product_name = ANY(%s) '
         else:
             product_list = ''
 
         if params['version'] and report_type is not 'products':
-            version_list = ' AND version_string IN %s '
+            version_list = ' AND version_string = ANY(%s) '
         else:
             version_list = ''
 
@@ -7,6 +7,9 @@ import logging
 
 from configman import Namespace
 from socorro.app.generic_app import App, main  # main not used here, but
+from socorro.external.rabbitmq.reprocessing_engine import (
+    ReprocessingPublisher
+)
 
 
 # To run this script in production:
@@ -57,6 +60,17 @@ class ReprocessCrashlistApp(App):
         doc='File containing crash UUIDs, one per line',
         default='crashlist.txt'
     )
+    required_config.reprocesscrashlist.add_option(
+        'batch_size',
+        doc='the number of crash_ids published in one AMQP transaction',
+        default=500,
+    )
+    required_config.reprocesscrashlist.add_option(
+        'max_rate',
+        doc='the maximum number of crash_ids published per second (0 for no '
+            'limit)',
+        default=0,
+    )
 
     def connect(self):
         logging.debug("connecting to rabbit")
@@ -81,15 +95,18 @@ class ReprocessCrashlistApp(App):
 
         channel.queue_declare(queue='socorro.reprocessing', durable=True)
 
+        publisher = ReprocessingPublisher(
+            'socorro.reprocessing',
+            logging,
+            max_rate=self.config.reprocesscrashlist.max_rate,
+        )
+        batch_size = self.config.reprocesscrashlist.batch_size
         with open(self.config.reprocesscrashlist.crashes, 'r') as file:
-            for uuid in file.read().splitlines():
-                channel.basic_publish(
-                    exchange='',
-                    routing_key="socorro.reprocessing",
-                    body=uuid,
-                    properties=pika.BasicProperties(delivery_mode=2)
-                )
-                logging.debug('submitted %s' % uuid)
+            uuids = [x for x in file.read().splitlines() if x]
+        for start in xrange(0, len(uuids), batch_size):
+            batch = uuids[start:start + batch_size]
+            publisher.publish(channel, batch)
+            logging.debug('submitted %d crash_ids', len(batch))
 
         self.connection.close()
 
@@ -0,0 +1,501 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""bulk reprocessing of the crashes from a date range, optionally limited to
+one signature.  Crash ids are paged out of the 'reports' table with server
+side cursors and published to the reprocessing queue in batches, each batch
+in a single AMQP transaction.  Publishing can be rate limited and held back
+while the queue is deeper than the processors can absorb.  Progress is
+checkpointed after every batch so that an interrupted run resumes where it
+stopped."""
+
+import json
+import os
+import threading
+import time
+from Queue import Queue
+
+import pika
+
+from configman import Namespace, class_converter
+
+from socorro.app.generic_app import App, main
+from socorro.external.postgresql.dbapi2_util import (
+    execute_query_iter_server_side,
+    single_value_sql,
+)
+
+
+#==============================================================================
+class ReprocessingPublisher(object):
+    """publishes crash_ids to a queue in batches.  Each batch is one AMQP
+    transaction: once 'publish' returns, the broker has accepted the whole
+    batch.  If it raises, none of the batch can be assumed queued and the
+    whole batch should be published again."""
+
+    #--------------------------------------------------------------------------
+    def __init__(self, routing_key, logger, max_rate=0, max_queue_depth=0,
+                 headroom_check_interval=10):
+        """parameters:
+            routing_key - the name of the queue to publish to
+            logger - where to report waiting for headroom
+            max_rate - the maximum crash_ids per second, 0 for no limit
+            max_queue_depth - hold back publishing while the queue holds at
+                              least this many crash_ids, 0 for no limit
+            headroom_check_interval - seconds between queue depth checks
+                                      while holding back"""
+        self.routing_key = routing_key
+        self.logger = logger
+        self.max_rate = max_rate
+        self.max_queue_depth = max_queue_depth
+        self.headroom_check_interval = headroom_check_interval
+        self._properties = pika.BasicProperties(
+            delivery_mode=2,  # make message persistent
+        )
+        self._earliest_next_batch = None
+
+    #--------------------------------------------------------------------------
+    def queue_depth(self, channel):
+        return channel.queue_declare(
+            queue=self.routing_key,
+            durable=True,
+            passive=True
+        ).method.message_count
+
+    #--------------------------------------------------------------------------
+    def wait_for_headroom(self, channel):
+        """the processors take from the reprocessing queue as they have
+        capacity to spare, so a deep queue means the fleet is already busy.
+        Wait until it has drained below 'max_queue_depth'."""
+        if not self.max_queue_depth:
+            return
+        while True:
+            depth = self.queue_depth(channel)
+            if depth < self.max_queue_depth:
+                return
+            self.logger.info(
+                '%d crash_ids waiting in %s, holding back for %ss',
+                depth,
+                self.routing_key,
+                self.headroom_check_interval
+            )
+            time.sleep(self.headroom_check_interval)
+
+    #--------------------------------------------------------------------------
+    def _throttle(self, count):
+        if not self.max_rate:
+            return
+        now = time.time()
+        if self._earliest_next_batch is not None:
+            if now < self._earliest_next_batch:
+                time.sleep(self._earliest_next_batch - now)
+            now = max(now, self._earliest_next_batch)
+        self._earliest_next_batch = now + count / float(self.max_rate)
+
+    #--------------------------------------------------------------------------
+    def publish(self, channel, crash_ids):
+        self.wait_for_headroom(channel)
+        self._throttle(len(crash_ids))
+        # selecting transaction mode again on a channel is harmless and saves
+        # tracking which channels have been selected across reconnections
+        channel.tx_select()
+        for crash_id in crash_ids:
+            channel.basic_publish(
+                exchange='',
+                routing_key=self.routing_key,
+                body=crash_id,
+                properties=self._properties
+            )
+        channel.tx_commit()
+
+
+#==============================================================================
+class ReprocessingEngineApp(App):
+    """queue the crashes of a date range, optionally of a single signature,
+    for reprocessing"""
+    app_name = 'reprocessing_engine'
+    app_version = '1.0'
+    app_description = __doc__
+
+    required_config = Namespace()
+
+    #--------------------------------------------------------------------------
+    # database namespace
+    #     the source of the crash_ids
+    #--------------------------------------------------------------------------
+    required_config.namespace('database')
+    required_config.database.add_option(
+        'database_class',
+        doc="the class of the database",
+        default='socorro.external.postgresql.connection_context.'
+                'ConnectionContext',
+        from_string_converter=class_converter,
+        reference_value_from='resource.postgresql',
+    )
+    required_config.database.add_option(
+        'transaction_executor_class',
+        default='socorro.database.transaction_executor.'
+                'TransactionExecutorWithInfiniteBackoff',
+        doc='a class that will manage transactions',
+        from_string_converter=class_converter,
+        reference_value_from='resource.postgresql',
+    )
+
+    #--------------------------------------------------------------------------
+    # queue namespace
+    #     the destination of the crash_ids
+    #--------------------------------------------------------------------------
+    required_config.namespace('queue')
+    required_config.queue.add_option(
+        'rabbitmq_class',
+        default='socorro.external.rabbitmq.connection_context.'
+                'ConnectionContext',
+        doc='the class responsible for connecting to RabbitMQ',
+        from_string_converter=class_converter,
+        reference_value_from='resource.rabbitmq',
+    )
+    required_config.queue.add_option(
+        'transaction_executor_class',
+        default='socorro.database.transaction_executor.'
+                'TransactionExecutorWithInfiniteBackoff',
+        doc='a class that will manage transactions',
+        from_string_converter=class_converter,
+        reference_value_from='resource.rabbitmq',
+    )
+    required_config.queue.add_option(
+        'routing_key',
+        default='socorro.reprocessing',
+        doc='the name of the queue to receive the crash_ids',
+    )
+
+    #--------------------------------------------------------------------------
+    # reprocessing namespace
+    #     what to reprocess and how fast
+    #--------------------------------------------------------------------------
+    required_config.namespace('reprocessing')
+    required_config.reprocessing.add_option(
+        'start_date',
+        doc='reprocess crashes processed on or after this date (YYYY-MM-DD)',
+        default='',
+    )
+    required_config.reprocessing.add_option(
+        'end_date',
+        doc='reprocess crashes processed before this date (YYYY-MM-DD)',
+        default='',
+    )
+    required_config.reprocessing.add_option(
+        'signature',
+        doc='reprocess only the crashes with this signature (leave empty '
+            'for all)',
+        default='',
+    )
+    required_config.reprocessing.add_option(
+        'page_size',
+        doc='the number of crash_ids read in one database transaction',
+        default=50000,
+    )
+    required_config.reprocessing.add_option(
+        'fetch_size',
+        doc='the number of rows fetched at a time from the server side cursor',
+        default=2000,
+    )
+    required_config.reprocessing.add_option(
+        'batch_size',
+        doc='the number of crash_ids published in one AMQP transaction',
+        default=500,
+    )
+    required_config.reprocessing.add_option(
+        'max_rate',
+        doc='the maximum number of crash_ids published per second (0 for no '
+            'limit)',
+        default=0,
+    )
+    required_config.reprocessing.add_option(
+        'max_queue_depth',
+        doc='hold back while the reprocessing queue holds at least this many '
+            'crash_ids, size it to what the processors can absorb (0 for no '
+            'limit)',
+        default=10000,
+    )
+    required_config.reprocessing.add_option(
+        'headroom_check_interval',
+        doc='seconds between checks of the queue depth while holding back',
+        default=10,
+    )
+    required_config.reprocessing.add_option(
+        'checkpoint_pathname',
+        doc='a file recording progress after every batch, an interrupted run '
+            'with the same date range and signature resumes from it (leave '
+            'empty for none)',
+        default='',
+    )
+    required_config.reprocessing.add_option(
+        'estimate_total',
+        doc='count the crashes to reprocess first to be able to report an ETA',
+        default=True,
+    )
+    required_config.reprocessing.add_option(
+        'progress_interval',
+        doc='seconds between progress reports',
+        default=60,
+    )
+
+    #--------------------------------------------------------------------------
+    def __init__(self, config):
+        super(ReprocessingEngineApp, self).__init__(config)
+        self.database = config.database.database_class(config.database)
+        self.database_transaction = \
+            config.database.transaction_executor_class(
+                config.database,
+                self.database,
+            )
+        self.queue = config.queue.rabbitmq_class(config.queue)
+        self.queue_transaction = config.queue.transaction_executor_class(
+            config.queue,
+            self.queue,
+        )
+        self.publisher = ReprocessingPublisher(
+            config.queue.routing_key,
+            config.logger,
+            max_rate=config.reprocessing.max_rate,
+            max_queue_depth=config.reprocessing.max_queue_depth,
+            headroom_check_interval=(
+                config.reprocessing.headroom_check_interval
+            ),
+        )
+        # the (date_processed, uuid) of the last crash_id handed to the
+        # publisher by the reader thread
+        self._read_position = None
+
+    #--------------------------------------------------------------------------
+    def _filter_sql(self):
+        config = self.config.reprocessing
+        sql = (
+            "date_processed >= %(start_date)s "
+            "AND date_processed < %(end_date)s"
+        )
+        parameters = {
+            'start_date': config.start_date,
+            'end_date': config.end_date,
+        }
+        if config.signature:
+            sql += " AND signature = %(signature)s"
+            parameters['signature'] = config.signature
+        return sql, parameters
+
+    #--------------------------------------------------------------------------
+    def _page_sql(self, position):
+        """keyset pagination over (date_processed, uuid): every page starts
+        right after the last row of the previous page, which makes a page
+        as cheap to find as the first and gives a stable resume point"""
+        where, parameters = self._filter_sql()
+        if position is not None:
+            where += (
+                " AND (date_processed, uuid) > "
+                "(%(last_date_processed)s, %(last_uuid)s)"
+            )
+            parameters['last_date_processed'] = position[0]
+            parameters['last_uuid'] = position[1]
+        parameters['page_size'] = self.config.reprocessing.page_size
+        sql = (
+            "SELECT date_processed, uuid FROM reports WHERE %s "
+            "ORDER BY date_processed, uuid LIMIT %%(page_size)s" % where
+        )
+        return sql, parameters
+
+    #--------------------------------------------------------------------------
+    def _count_total(self, connection):
+        where, parameters = self._filter_sql()
+        return single_value_sql(
+            connection,
+            "SELECT count(*) FROM reports WHERE %s" % where,
+            parameters
+        )
+
+    #--------------------------------------------------------------------------
+    def _read_page_transaction(self, connection, batches):
+        """put one page of crash_ids on the 'batches' queue in batches and
+        return the number of rows read.  A retried transaction starts over
+        from the last batch queued, not from the start of the page."""
+        sql, parameters = self._page_sql(self._read_position)
+        batch_size = self.config.reprocessing.batch_size
+        row_count = 0
+        batch = []
+        for row in execute_query_iter_server_side(
+            connection,
+            sql,
+            parameters,
+            fetch_size=self.config.reprocessing.fetch_size
+        ):
+            row_count += 1
+            batch.append(row)
+            if len(batch) == batch_size:
+                batches.put(batch)
+                self._read_position = batch[-1]
+                batch = []
+        if batch:
+            batches.put(batch)
+            self._read_position = batch[-1]
+        return row_count
+
+    #--------------------------------------------------------------------------
+    def _read_crash_ids(self, batches):
+        """the reader thread: page through the crash_ids until a page comes
+        up short, ending with a None on the 'batches' queue"""
+        try:
+            while True:
+                row_count = self.database_transaction(
+                    self._read_page_transaction,
+                    batches
+                )
+                if row_count < self.config.reprocessing.page_size:
+                    break
+        except Exception, x:
+            self.config.logger.error(
+                'reading crash_ids failed',
+                exc_info=True
+            )
+            batches.put(x)
+        batches.put(None)
+
+    #--------------------------------------------------------------------------
+    def _publish_transaction(self, connection, crash_ids):
+        self.publisher.publish(connection.channel, crash_ids)
+
+    #--------------------------------------------------------------------------
+    def _checkpoint_key(self):
+        config = self.config.reprocessing
+        return {
+            'start_date': config.start_date,
+            'end_date': config.end_date,
+            'signature': config.signature,
+        }
+
+    #--------------------------------------------------------------------------
+    def _load_checkpoint(self):
+        """return the checkpoint of an earlier run over the same crashes or
+        None"""
+        pathname = self.config.reprocessing.checkpoint_pathname
+        if not pathname or not os.path.exists(pathname):
+            return None
+        with open(pathname) as f:
+            checkpoint = json.load(f)
+        if checkpoint.get('key') != self._checkpoint_key():
+            self.config.logger.warning(
+                'ignoring the checkpoint in %s, it is for %s',
+                pathname,
+                checkpoint.get('key')
+            )
+            return None
+        return checkpoint
+
+    #--------------------------------------------------------------------------
+    def _save_checkpoint(self, position, published, complete=False):
+        pathname = self.config.reprocessing.checkpoint_pathname
+        if not pathname:
+            return
+        checkpoint = {
+            'key': self._checkpoint_key(),
+            'last_date_processed': str(position[0]) if position else None,
+            'last_uuid': position[1] if position else None,
+            'published': published,
+            'complete': complete,
+        }
+        temporary_pathname = '%s.tmp' % pathname
+        with open(temporary_pathname, 'w') as f:
+            json.dump(checkpoint, f)
+        os.rename(temporary_pathname, pathname)
+
+    #--------------------------------------------------------------------------
+    def _report_progress(self, published, published_at_start, total,
+                         start_time):
+        elapsed = time.time() - start_time
+        rate = (published - published_at_start) / elapsed if elapsed else 0
+        if total is not None and rate:
+            eta = '%ds' % (max(total - published, 0) / rate)
+        else:
+            eta = 'unknown'
+        self.config.logger.info(
+            'reprocessing: %d of %s crash_ids queued, %.1f per second, '
+            'ETA %s',
+            published,
+            total if total is not None else 'an unknown number of',
+            rate,
+            eta
+        )
+
+    #--------------------------------------------------------------------------
+    def main(self):
+        config = self.config.reprocessing
+        if not (config.start_date and config.end_date):
+            raise ValueError('both start_date and end_date are required')
+
+        position = None
+        published = 0
+        checkpoint = self._load_checkpoint()
+        if checkpoint:
+            if checkpoint['complete']:
+                self.config.logger.info(
+                    'nothing to do, %s records a completed run',
+                    config.checkpoint_pathname
+                )
+                return
+            if checkpoint['last_uuid'] is not None:
+                position = (
+                    checkpoint['last_date_processed'],
+                    checkpoint['last_uuid']
+                )
+            published = checkpoint['published']
+            self.config.logger.info(
+                'resuming after %d crash_ids, from %s',
+                published,
+                position
+            )
+
+        total = None
+        if config.estimate_total:
+            total = self.database_transaction(self._count_total)
+
+        # reading from Postgres overlaps with publishing to RabbitMQ.  A
+        # couple of batches of look ahead is all that is needed for that.
+        self._read_position = position
+        batches = Queue(maxsize=4)
+        reader = threading.Thread(
+            target=self._read_crash_ids,
+            args=(batches,),
+            name='ReprocessingReader'
+        )
+        reader.daemon = True
+        reader.start()
+
+        published_at_start = published
+        start_time = last_report_time = time.time()
+        for batch in iter(batches.get, None):
+            if isinstance(batch, Exception):
+                raise batch
+            self.queue_transaction(
+                self._publish_transaction,
+                [uuid for date_processed, uuid in batch]
+            )
+            published += len(batch)
+            position = batch[-1]
+            self._save_checkpoint(position, published)
+            if time.time() - last_report_time >= config.progress_interval:
+                self._report_progress(
+                    published,
+                    published_at_start,
+                    total,
+                    start_time
+                )
+                last_report_time = time.time()
+        reader.join()
+
+        self._save_checkpoint(position, published, complete=True)
+        self._report_progress(published, published_at_start, total, start_time)
+        self.queue.close()
+        self.database.close()
+
+
+if __name__ == '__main__':
+    main(ReprocessingEngineApp)
@@ -0,0 +1,100 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""a compact latency histogram in the spirit of HdrHistogram.  Values are
+non-negative integers (typically microseconds).  Small values are counted
+exactly, larger ones in buckets that keep a fixed number of significant bits,
+so the relative error of any reported percentile is bounded no matter how
+wide the range of recorded values is.  Memory use grows with the logarithm of
+the range, not with the number of values recorded."""
+
+
+#==============================================================================
+class Histogram(object):
+
+    #--------------------------------------------------------------------------
+    def __init__(self, significant_bits=7):
+        """parameters:
+            significant_bits - the precision of the buckets.  Seven bits
+                               count values below 128 exactly and bound the
+                               error for larger values to about 1.6%"""
+        self.significant_bits = significant_bits
+        self.reset()
+
+    #--------------------------------------------------------------------------
+    def reset(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    #--------------------------------------------------------------------------
+    def _bucket(self, value):
+        shift = value.bit_length() - self.significant_bits
+        if shift <= 0:
+            return value
+        return (value >> shift) << shift
+
+    #--------------------------------------------------------------------------
+    def _highest_equivalent(self, bucket):
+        shift = bucket.bit_length() - self.significant_bits
+        if shift <= 0:
+            return bucket
+        return bucket | ((1 << shift) - 1)
+
+    #--------------------------------------------------------------------------
+    def record(self, value, count=1):
+        value = max(int(value), 0)
+        bucket = self._bucket(value)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.count += count
+        self.total += value * count
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    #--------------------------------------------------------------------------
+    def merge(self, other):
+        for bucket, count in other.buckets.iteritems():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            if self.min is None or other.min < self.min:
+                self.min = other.min
+        if other.max is not None:
+            if self.max is None or other.max > self.max:
+                self.max = other.max
+
+    #--------------------------------------------------------------------------
+    def percentile(self, percent):
+        """return the value that 'percent' percent of the recorded values are
+        less than or equal to, reported as the highest value of its bucket
+        but never more than the largest value actually recorded."""
+        if not self.count:
+            return None
+        threshold = self.count * percent / 100.0
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= threshold:
+                return min(self._highest_equivalent(bucket), self.max)
+        return self.max
+
+    #--------------------------------------------------------------------------
+    def summary(self, percentiles=(50, 90, 99, 99.9)):
+        """return a mapping of the count, min, max, mean and the requested
+        percentiles keyed as 'p50', 'p99_9' etc."""
+        result = {
+            'count': self.count,
+            'min': self.min,
+            'max': self.max,
+            'mean': float(self.total) / self.count if self.count else None,
+        }
+        for percent in percentiles:
+            name = 'p%s' % ('%g' % percent).replace('.', '_')
+            result[name] = self.percentile(percent)
+        return result
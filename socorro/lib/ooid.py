@@ -39,29 +39,52 @@ def uuidToOoid(uuid,timestamp=None, depth= None):
   assert depth <= 4 and depth >=1
   return "%s%d%02d%02d%02d" %(uuid[:-7],depth,timestamp.year%100,timestamp.month,timestamp.day)
 
-def dateAndDepthFromOoid(ooid):
-  """ Extract the encoded date and expected storage depth from an ooid.
-  ooid: The ooid from which to extract the info
-  returns (datetime(yyyy,mm,dd),depth) if the ooid is in expected format else (None,None)
+# the date and depth of an ooid depend only on its last seven characters and
+# there are only so many distinct days.  Parsing each of them once and
+# sharing the result makes the lookups below nearly free.
+_maxCachedTails = 100000
+_cachedTails = {}
+
+def _parseTail(tail):
+  """ Parse the last seven characters of an ooid.
+  returns (datetime(yyyy,mm,dd),depth) if the tail is in expected format else (None,None)
   """
   year = month = day = None
   try:
-    day = int(ooid[-2:])
+    day = int(tail[-2:])
   except:
     return None,None
   try:
-    month = int(ooid[-4:-2])
+    month = int(tail[-4:-2])
   except:
     return None,None
   try:
-    year = 2000 + int(ooid[-6:-4])
-    depth = int(ooid[-7])
+    year = 2000 + int(tail[-6:-4])
+    depth = int(tail[-7])
     if not depth: depth = oldHardDepth
     return (dt.datetime(year,month,day,tzinfo=UTC),depth)
   except:
     return None,None
   return None,None
 
+def dateAndDepthFromOoid(ooid):
+  """ Extract the encoded date and expected storage depth from an ooid.
+  ooid: The ooid from which to extract the info
+  returns (datetime(yyyy,mm,dd),depth) if the ooid is in expected format else (None,None)
+  """
+  try:
+    tail = ooid[-7:]
+    return _cachedTails[tail]
+  except KeyError:
+    pass
+  except TypeError:
+    return None,None
+  result = _parseTail(tail)
+  if len(_cachedTails) >= _maxCachedTails:
+    _cachedTails.clear()
+  _cachedTails[tail] = result
+  return result
+
 def depthFromOoid(ooid):
   """Extract the encoded expected storage depth from an ooid.
   ooid: The ooid from which to extract the info
@@ -76,4 +99,69 @@ def dateFromOoid(ooid):
   """
   return dateAndDepthFromOoid(ooid)[0]
 
+class Ooid(str):
+  """ An ooid that is parsed once.  It is a string and can be used wherever
+  an ooid string is expected, but it also carries
+    date: the encoded date or None
+    depth: the expected storage depth or None
+    radix: the leading pairs of hex digits that name the storage directories,
+           one per level of depth
+  """
+  def __new__(cls, ooid):
+    if isinstance(ooid, Ooid):
+      return ooid
+    self = str.__new__(cls, ooid)
+    self.date, self.depth = dateAndDepthFromOoid(self)
+    if self.depth:
+      self.radix = tuple(self[i:i + 2] for i in range(0, self.depth * 2, 2))
+    else:
+      self.radix = ()
+    return self
+
+def groupByDate(ooids, key=None):
+  """ Partition many ooids by their encoded date.
+  ooids: an iterable of ooids
+  key: optional function applied to each distinct date to name its partition
+       (a table suffix, an index name...).  It is called only once for each
+       distinct encoded date and depth, not once per ooid.
+  returns a dict of partition (or date) to the list of its ooids in their
+  original order.  Ooids without a valid date are under None, key is not
+  applied to them.
+  """
+  partitions = {}
+  groups = {}
+  for ooid in ooids:
+    tail = ooid[-7:]
+    try:
+      partition = partitions[tail]
+    except KeyError:
+      partition = dateAndDepthFromOoid(tail)[0]
+      if partition is not None and key is not None:
+        partition = key(partition)
+      partitions[tail] = partition
+    try:
+      groups[partition].append(ooid)
+    except KeyError:
+      groups[partition] = [ooid]
+  return groups
 
+def groupByRadix(ooids, depth=None):
+  """ Partition many ooids by the storage directories they belong in.
+  ooids: an iterable of ooids
+  depth: the number of levels of radix to group by.  If None, each ooid
+         uses the depth it encodes.
+  returns a dict of radix tuples to the lists of their ooids in their
+  original order.
+  """
+  groups = {}
+  for ooid in ooids:
+    if depth is None:
+      ooidDepth = dateAndDepthFromOoid(ooid)[1] or 0
+    else:
+      ooidDepth = depth
+    radix = tuple(ooid[i:i + 2] for i in range(0, ooidDepth * 2, 2))
+    try:
+      groups[radix].append(ooid)
+    except KeyError:
+      groups[radix] = [ooid]
+  return groups
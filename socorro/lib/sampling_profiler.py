@@ -0,0 +1,165 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""a statistical profiler for long running socorro processes.  While it is
+running, a background thread periodically takes a snapshot of the stack of
+every other thread and counts how often each distinct stack was seen.  The
+counts can be written out in the "collapsed stacks" format understood by
+flamegraph.pl and speedscope.  While it is stopped there is no thread and no
+cost at all."""
+
+import os
+import sys
+import threading
+import time
+
+
+#==============================================================================
+class SamplingProfiler(object):
+
+    #--------------------------------------------------------------------------
+    def __init__(self, interval=0.01, pathname_template=None, logger=None):
+        """parameters:
+            interval - the number of seconds between samples
+            pathname_template - where 'toggle' writes the stacks, 'pid' and
+                                'time' are formatted into it
+            logger - where to report starting, stopping and dumping"""
+        self.interval = interval
+        self.pathname_template = pathname_template
+        self.logger = logger
+        self.stacks = {}
+        self.sample_count = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        # naming a frame is comparatively expensive, do it once per code
+        # object
+        self._frame_names = {}
+
+    #--------------------------------------------------------------------------
+    @property
+    def running(self):
+        return self._thread is not None
+
+    #--------------------------------------------------------------------------
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._sample_loop,
+            name='SamplingProfiler'
+        )
+        self._thread.daemon = True
+        self._thread.start()
+        if self.logger:
+            self.logger.info(
+                'sampling profiler started, one sample every %ss',
+                self.interval
+            )
+
+    #--------------------------------------------------------------------------
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+        if self.logger:
+            self.logger.info(
+                'sampling profiler stopped after %d samples',
+                self.sample_count
+            )
+
+    #--------------------------------------------------------------------------
+    def reset(self):
+        with self._lock:
+            self.stacks = {}
+            self.sample_count = 0
+
+    #--------------------------------------------------------------------------
+    def _frame_name(self, frame):
+        code = frame.f_code
+        try:
+            return self._frame_names[code]
+        except KeyError:
+            name = '%s (%s:%d)' % (
+                code.co_name,
+                code.co_filename,
+                code.co_firstlineno
+            )
+            # ';' separates frames and ' ' the count in the collapsed format
+            name = name.replace(';', ':').replace(' ', '_')
+            self._frame_names[code] = name
+            return name
+
+    #--------------------------------------------------------------------------
+    def sample(self):
+        """take one snapshot of the stacks of all threads but this one"""
+        this_thread = threading.current_thread().ident
+        thread_names = dict(
+            (a_thread.ident, a_thread.name)
+            for a_thread in threading.enumerate()
+        )
+        frame_name = self._frame_name
+        with self._lock:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == this_thread:
+                    continue
+                names = []
+                while frame is not None:
+                    names.append(frame_name(frame))
+                    frame = frame.f_back
+                names.append(
+                    thread_names.get(thread_id, str(thread_id)).replace(
+                        ' ',
+                        '_'
+                    )
+                )
+                names.reverse()
+                stack = ';'.join(names)
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+            self.sample_count += 1
+
+    #--------------------------------------------------------------------------
+    def _sample_loop(self):
+        while not self._stop_event.wait(self.interval):
+            self.sample()
+
+    #--------------------------------------------------------------------------
+    def dump(self, pathname):
+        """write the stacks seen so far in the collapsed stacks format, one
+        'frame;frame;frame count' line per distinct stack"""
+        with self._lock:
+            stacks = sorted(self.stacks.items())
+        temporary_pathname = '%s.%d.tmp' % (pathname, os.getpid())
+        with open(temporary_pathname, 'w') as f:
+            for stack, count in stacks:
+                f.write('%s %d\n' % (stack, count))
+        os.rename(temporary_pathname, pathname)
+        if self.logger:
+            self.logger.info(
+                'sampling profiler wrote %d stacks to %s',
+                len(stacks),
+                pathname
+            )
+        return pathname
+
+    #--------------------------------------------------------------------------
+    def toggle(self):
+        """start the profiler if it is stopped.  Otherwise stop it, write the
+        collected stacks to a file named by the 'pathname_template' and clear
+        them for the next session."""
+        if not self.running:
+            self.start()
+            return None
+        self.stop()
+        pathname = self.pathname_template.format(
+            pid=os.getpid(),
+            time=time.strftime('%Y%m%d%H%M%S'),
+        )
+        try:
+            return self.dump(pathname)
+        finally:
+            self.reset()
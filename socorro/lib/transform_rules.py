@@ -145,6 +145,12 @@ class Rule(RequiredConfig):
         else:
             return (False, None)
 
+    #--------------------------------------------------------------------------
+    def close(self):
+        """rules that hold resources or accumulate data across crashes should
+        override this method to release or write them out at shutdown."""
+        pass
+
 
 #==============================================================================
 class TransformRule(Rule):
@@ -332,6 +338,15 @@ class TransformRuleSystem(RequiredConfig):
         "a no-op method to do nothing if no quit check method has been defined"
         pass
 
+    #--------------------------------------------------------------------------
+    def close(self):
+        """give each of the rules the opportunity to release resources or
+        write out whatever they may have accumulated"""
+        for a_rule in self.rules:
+            close_method = getattr(a_rule, 'close', None)
+            if close_method is not None:
+                close_method()
+
     #--------------------------------------------------------------------------
     def load_rules(self, an_iterable):
         """cycle through a collection of Transform rule tuples loading them
@@ -30,7 +30,10 @@ from socorro.webapi.webapiService import (
     JsonWebServiceBase,
     Timeout,
     NotFound,
-    BadRequest
+    BadRequest,
+    is_streamed,
+    json_chunks,
+    start_streams,
 )
 
 import raven
@@ -172,6 +175,12 @@ class MiddlewareApp(App):
                 'PostgreSQLCrashStorage',
         from_string_converter=class_converter
     )
+    required_config.database.add_option(
+        'connection_pool_size',
+        doc='the number of connections to PostgreSQL that the services of '
+            'this process share (0 to connect for every query)',
+        default=10,
+    )
 
     #--------------------------------------------------------------------------
     # hbase namespace
@@ -306,8 +315,8 @@ class MiddlewareApp(App):
     )
     required_config.http.correlations.add_option(
         'save_seconds',
-        doc='Number of seconds that the downloaded .txt file is stored '
-            'in a temporary place',
+        doc='Number of seconds that the index of a downloaded .txt file '
+            'is used before it is downloaded again',
         default=60 * 10,
     )
     required_config.http.correlations.add_option(
@@ -463,6 +472,9 @@ class ImplementationWrapper(JsonWebServiceBase):
                 config=self.config,
                 all_services=self.all_services
             )
+        if hasattr(instance, 'stream_results'):
+            # big lists of results are encoded as they are fetched
+            instance.stream_results = True
 
         # find the method to call
         default_method = kwargs.pop('default_method', 'get')
@@ -510,6 +522,9 @@ class ImplementationWrapper(JsonWebServiceBase):
                 web.header('Content-Type', result[1])
                 return result[0]
             web.header('Content-Type', 'application/json')
+            if is_streamed(result):
+                # without a Content-Length the server sends it chunked
+                return json_chunks(start_streams(result), ujson.dumps)
             dumped = ujson.dumps(result)
             web.header('Content-Length', len(dumped))
             return dumped
@@ -5,6 +5,8 @@
 
 """the monitor_app manages the jobs queue and their processor assignments"""
 
+import heapq
+import itertools
 import signal
 import threading
 import time
@@ -35,6 +37,62 @@ class NoProcessorsRegisteredError (Exception):
     pass
 
 
+#==============================================================================
+class BalancedProcessorIterator(object):
+    """an infinite iterator of (processor_id, processor_name) that always
+    returns the processor with the fewest jobs.  The processors and their
+    loads, a list of [processor_id, load, processor_name], are fetched by
+    calling 'get_processors_and_loads' the first time a processor is asked
+    for.  If there are no processors, None is returned instead.
+
+    The processors are kept in a heap ordered by load so that finding the
+    least loaded one doesn't require a full sort for every job assigned.  A
+    processor returned is counted as having one more job only tentatively:
+    'commit' keeps the counts once the jobs are in the database, 'rollback'
+    goes back to the counts of the last commit when they are not."""
+
+    #--------------------------------------------------------------------------
+    def __init__(self, get_processors_and_loads):
+        self._get_processors_and_loads = get_processors_and_loads
+        self._processor_heap = None
+        self._committed_processor_heap = None
+
+    #--------------------------------------------------------------------------
+    def __iter__(self):
+        return self
+
+    #--------------------------------------------------------------------------
+    def next(self):
+        if self._processor_heap is None:
+            self._processor_heap = [
+                (load, processor_id, processor_name)
+                for processor_id, load, processor_name
+                in self._get_processors_and_loads()
+            ]
+            heapq.heapify(self._processor_heap)
+            self._committed_processor_heap = list(self._processor_heap)
+        if not self._processor_heap:
+            return None
+        load, processor_id, processor_name = self._processor_heap[0]
+        # the processor with the fewest jobs is about to be assigned a new
+        # job, so increment its count
+        heapq.heapreplace(
+          self._processor_heap,
+          (load + 1, processor_id, processor_name)
+        )
+        return processor_id, processor_name
+
+    #--------------------------------------------------------------------------
+    def commit(self):
+        if self._processor_heap is not None:
+            self._committed_processor_heap = list(self._processor_heap)
+
+    #--------------------------------------------------------------------------
+    def rollback(self):
+        if self._committed_processor_heap is not None:
+            self._processor_heap = list(self._committed_processor_heap)
+
+
 #==============================================================================
 class MonitorApp(App):
     """the MonitorApp class is responsible for gathering new crashes and
@@ -155,6 +213,12 @@ class MonitorApp(App):
       doc="the frequency to check for new priority jobs (hh:mm:ss)",
       from_string_converter=timedelta_to_seconds_coverter
     )
+    required_config.job_manager.add_option(
+      'standard_job_batch_size',
+      default=100,
+      doc="the maximum number of new crashes to queue in a single "
+          "transaction",
+    )
     required_config.job_manager.add_option(
       'job_cleanup_frequency',
       default='00:05:00',
@@ -190,6 +254,9 @@ class MonitorApp(App):
           ''
         )
 
+        # crash_ids that found no processor, to be queued again
+        self._unassigned_crash_ids = []
+
         signal.signal(signal.SIGTERM, self._respond_to_SIGTERM)
         signal.signal(signal.SIGHUP, self._respond_to_SIGTERM)
 
@@ -503,18 +570,9 @@ class MonitorApp(App):
                 for a_row in processors_and_load]
 
     #--------------------------------------------------------------------------
-    def _balanced_processor_iter(self):
-        """ This takes a snap shot of the state of the processors as well as
-        the number of jobs assigned to each then acts as an iterator that
-        returns a sequence of processor ids.  Order of ids returned will assure
-        that jobs are assigned in a balanced manner.
-
-        This iterator is infinite.  It never raises StopIteration.  How does
-        it ever quit?  It is run in parallel with the iterator that fetches
-        a batch of crash_ids from the crash_id source by the
-        '_standard_job_thread' method.  When that iterator is exhausted, this
-        iterator is thrown away. On the next batch of crash_ids, a new copy of
-        this iterator is created."""
+    def _get_processors_and_loads(self):
+        """fetch the live processors and their loads, complaining if there
+        are none"""
         self.config.logger.debug(
           "balanced _balanced_processor_iter: compiling list of active "
           "processors"
@@ -537,26 +595,30 @@ class MonitorApp(App):
                       "There are no live processors. "
                       "Waiting for processors to come on line"
                     )
-                    yield None
-            while True:
-                #self.config.logger.debug(
-                  #"sort the list of (processorId, numberOfAssignedJobs) pairs"
-                #)
-                list_of_processors_and_loads.sort(lambda x, y: cmp(x[1], y[1]))
-                # the processor with the fewest jobs is about to be assigned a
-                # new job, so increment its count
-                list_of_processors_and_loads[0][1] += 1
-                #self.config.logger.debug(
-                  #"yield the processorId which had the fewest jobs: %d",
-                  #list_of_processors_and_loads[0][0]
-                #)
-                yield (list_of_processors_and_loads[0][0],
-                       list_of_processors_and_loads[0][2])
+            return list_of_processors_and_loads
         except NoProcessorsRegisteredError:
             self.quit = True
             self.config.logger.critical('there are no live processors')
             raise
 
+    #--------------------------------------------------------------------------
+    def _balanced_processor_iter(self):
+        """ This takes a snap shot of the state of the processors as well as
+        the number of jobs assigned to each then acts as an iterator that
+        returns a sequence of processor ids.  Order of ids returned will assure
+        that jobs are assigned in a balanced manner.
+
+        This iterator is infinite.  It never raises StopIteration.  How does
+        it ever quit?  It is run in parallel with the iterator that fetches
+        a batch of crash_ids from the crash_id source by the
+        '_standard_job_thread' method.  When that iterator is exhausted, this
+        iterator is thrown away. On the next batch of crash_ids, a new copy of
+        this iterator is created.
+
+        The jobs it hands out are only counted once they are committed, see
+        'BalancedProcessorIterator'."""
+        return BalancedProcessorIterator(self._get_processors_and_loads)
+
     #--------------------------------------------------------------------------
     def _get_live_processors_transaction(self, connection):
         """this transaction just fetches a list of live processors"""
@@ -615,9 +677,10 @@ class MonitorApp(App):
         key reference to the 'processors' table, the act of insertion is also
         the act of assigning the crash to a processor."""
         #self.config.logger.debug("trying to insert %s", crash_id)
-        processor_id, processor_name = candidate_processor_iter.next()
-        if processor_id is None:
+        candidate_processor = candidate_processor_iter.next()
+        if candidate_processor is None:
             return None
+        processor_id, processor_name = candidate_processor
         execute_no_results(
           connection,
           "insert into jobs (pathname, uuid, owner, priority,"
@@ -633,6 +696,95 @@ class MonitorApp(App):
         )
         return processor_id
 
+    #--------------------------------------------------------------------------
+    def _queue_standard_jobs_batch_transaction(self, connection, crash_ids,
+                                               candidate_processor_iter):
+        """this method implements a single transaction, inserting a batch of
+        crashes into the 'jobs' table with one multi-row insert.  Like
+        '_queue_standard_job_transaction', inserting a row is the act of
+        assigning the crash to a processor.  Returns the list of assigned
+        processor ids or None if there were no processors available."""
+        assignments = []
+        for crash_id in crash_ids:
+            candidate_processor = candidate_processor_iter.next()
+            if candidate_processor is None:
+                return None
+            processor_id, processor_name = candidate_processor
+            assignments.append((crash_id, processor_id, processor_name))
+        now = utc_now()
+        values_sql = ", ".join(
+          ["(%s, %s, %s, %s, %s)"] * len(assignments)
+        )
+        parameters = []
+        for crash_id, processor_id, processor_name in assignments:
+            parameters.extend(('', crash_id, processor_id, 1, now))
+        execute_no_results(
+          connection,
+          "insert into jobs (pathname, uuid, owner, priority,"
+          "                  queuedDateTime) "
+          "values %s" % values_sql,
+          parameters
+        )
+        for crash_id, processor_id, processor_name in assignments:
+            self.config.logger.info(
+              "%s assigned to processor %s (%d)",
+              crash_id,
+              processor_name,
+              processor_id
+            )
+        return [processor_id for crash_id, processor_id, processor_name
+                in assignments]
+
+    #--------------------------------------------------------------------------
+    def _queue_standard_jobs_singly(self, crash_ids, candidate_processor_iter):
+        """queue each crash_id in its own transaction so that a failure to
+        queue one of them doesn't prevent queuing the others.  The crash_ids
+        that find no processor are queued again with the next new crashes."""
+        for crash_id in crash_ids:
+            try:
+                assigned_processor = self.job_manager_transaction(
+                  self._queue_standard_job_transaction,
+                  crash_id,
+                  candidate_processor_iter
+                )
+            except Exception:
+                candidate_processor_iter.rollback()
+                self.config.logger.error(
+                  'Unexpected exception while assigning %s to a processor',
+                  crash_id,
+                  exc_info=True
+                )
+                continue
+            candidate_processor_iter.commit()
+            if assigned_processor is None:
+                self.config.logger.warning(
+                  'no processor for %s, it will be queued again',
+                  crash_id
+                )
+                self._unassigned_crash_ids.append(crash_id)
+
+    #--------------------------------------------------------------------------
+    def _new_crash_id_batches(self):
+        """this generator groups the crash_ids coming from the
+        'new_crash_source' into lists no larger than the configured batch
+        size so that they may be queued with a single transaction each.  The
+        crash_ids that could not be assigned to a processor before come
+        first."""
+        batch_size = max(self.config.job_manager.standard_job_batch_size, 1)
+        unassigned_crash_ids = self._unassigned_crash_ids
+        self._unassigned_crash_ids = []
+        batch = []
+        for crash_id in itertools.chain(
+            unassigned_crash_ids,
+            self.new_crash_source()
+        ):
+            batch.append(crash_id)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
     #--------------------------------------------------------------------------
     def _queue_priorty_job_transaction(self, connection, crash_id,
                                        candidate_processor_iter):
@@ -675,19 +827,22 @@ class MonitorApp(App):
                 self.config.logger.debug("getting _balanced_processor_iter")
                 processor_iter = self._balanced_processor_iter()
                 self.config.logger.debug("scanning for new crashes")
-                for crash_id in self.new_crash_source():
+                for crash_ids in self._new_crash_id_batches():
                     try:
-                        #self.config.logger.debug("new job: %s", crash_id)
+                        #self.config.logger.debug("new jobs: %s", crash_ids)
                         while True:
                             # retry until we succeed in assigning
                             self._quit_check()
-                            assigned_processor = \
+                            assigned_processors = \
                               self.job_manager_transaction(
-                                  self._queue_standard_job_transaction,
-                                  crash_id,
+                                  self._queue_standard_jobs_batch_transaction,
+                                  crash_ids,
                                   processor_iter
                                 )
-                            if assigned_processor is not None:
+                            if assigned_processors is not None:
+                                # the jobs are in the database, they count
+                                # toward the processors' loads
+                                processor_iter.commit()
                                 break
                             self.config.logger.warning(
                               'sleeping for %s, and then trying again',
@@ -703,11 +858,21 @@ class MonitorApp(App):
                         #self.quit = True
                         #raise
                     except Exception:
+                        # the batch was rolled back, the processors drawn for
+                        # it must not count it as assigned
+                        processor_iter.rollback()
                         self.config.logger.error(
                           'Unexpected exception while assigning jobs '
                           'to processors',
                           exc_info=True
                         )
+                        if len(crash_ids) > 1:
+                            # one bad crash_id spoils the whole batch, fall
+                            # back to queuing them one at a time
+                            self._queue_standard_jobs_singly(
+                              crash_ids,
+                              processor_iter
+                            )
                 self.config.logger.info("end _standard_job_thread cycle")
                 self._responsive_sleep(
                   self.config.job_manager.standard_loop_frequency
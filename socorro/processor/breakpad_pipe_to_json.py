@@ -66,6 +66,8 @@ dump into a json format.
 }
 """
 
+import collections
+
 from socorro.lib.util import DotDict
 
 
@@ -77,6 +79,88 @@ class DotDictWithPut(DotDict):
             self[key] = value
 
 
+#==============================================================================
+class LazyJsonDump(collections.MutableMapping):
+    """a stand in for the result of 'pipe_dump_to_json_dump' that defers the
+    conversion until the json_dump is actually read.  Many crashes never have
+    their json_dump examined and the json_dump is often discarded before the
+    processed crash is saved.  For those crashes, the per frame structures are
+    never built.
+
+    The conversion works from the pipe dump as a single string, the same one
+    that is saved as the 'dump' field, so holding it costs no extra memory.
+    Attribute style access is supported like with a DotDict.  Use the
+    'materialize' method to get a real DotDict before serializing."""
+
+    #--------------------------------------------------------------------------
+    def __init__(self, pipe_dump_str):
+        self.__dict__['_pipe_dump_str'] = pipe_dump_str
+        self.__dict__['_json_dump'] = None
+        self.__dict__['_conversion_error'] = None
+
+    #--------------------------------------------------------------------------
+    @property
+    def is_materialized(self):
+        return self._json_dump is not None
+
+    #--------------------------------------------------------------------------
+    @property
+    def conversion_error(self):
+        """the exception raised by a failed conversion or None"""
+        return self._conversion_error
+
+    #--------------------------------------------------------------------------
+    def materialize(self):
+        """convert the pipe dump, if not already done, and return the result
+        as a DotDict.  A failed conversion is not tried again, every later
+        access raises the same exception."""
+        if self._conversion_error is not None:
+            raise self._conversion_error
+        if self._json_dump is None:
+            try:
+                self.__dict__['_json_dump'] = pipe_dump_to_json_dump(
+                    self._pipe_dump_str.split('\n')
+                )
+            except Exception, x:
+                self.__dict__['_conversion_error'] = x
+                raise
+            self.__dict__['_pipe_dump_str'] = None
+        return self._json_dump
+
+    #--------------------------------------------------------------------------
+    def __getitem__(self, key):
+        return self.materialize()[key]
+
+    #--------------------------------------------------------------------------
+    def __setitem__(self, key, value):
+        self.materialize()[key] = value
+
+    #--------------------------------------------------------------------------
+    def __delitem__(self, key):
+        del self.materialize()[key]
+
+    #--------------------------------------------------------------------------
+    def __iter__(self):
+        return iter(self.materialize())
+
+    #--------------------------------------------------------------------------
+    def __len__(self):
+        return len(self.materialize())
+
+    #--------------------------------------------------------------------------
+    def __getattr__(self, key):
+        if key.startswith('__'):
+            # protocol lookups, like 'copy' probing for '__deepcopy__',
+            # must not trigger the conversion
+            raise AttributeError(key)
+        # like a DotDict, a missing key raises a KeyError
+        return self[key]
+
+    #--------------------------------------------------------------------------
+    def __setattr__(self, key, value):
+        self[key] = value
+
+
 #------------------------------------------------------------------------------
 def pipe_dump_to_json_dump(pipe_dump_iterable):
     """given a list (or any iterable) of strings representing a MDSW pipe dump,
@@ -84,24 +168,24 @@ def pipe_dump_to_json_dump(pipe_dump_iterable):
     json_dump = DotDict()
     crashing_thread = None
     module_counter = 0
-    thread_counter = 0
     for a_line in pipe_dump_iterable:
         parts = a_line.split('|')
-        if parts[0] == 'OS':
+        line_type = parts[0]
+        if line_type == 'OS':
             _extract_OS_info(parts, json_dump)
-        elif parts[0] == 'CPU':
+        elif line_type == 'CPU':
             _extract_CPU_info(parts, json_dump)
-        elif parts[0] == 'Crash':
+        elif line_type == 'Crash':
             crashing_thread = _extract_crash_info(parts, json_dump)
-        elif parts[0] == 'Module':
+        elif line_type == 'Module':
             _extract_module_info(parts, json_dump, module_counter)
             module_counter += 1
         else:
             try:
-                thread_number = int(parts[0])
-            except (ValueError, IndexError):
+                thread_number = int(line_type)
+            except ValueError:
                 continue  # unknow line type, ignore it
-            _extract_frame_info(parts, json_dump)
+            _extract_frame_info(parts, json_dump, thread_number)
     try:
         json_dump.thread_count = len(json_dump.threads)
     except KeyError:  # no threads were over found, 'threads' key was not made
@@ -195,46 +279,82 @@ def _extract_module_info(module_line, json_dump, module_counter):
     json_dump.modules.append(module)
 
 #------------------------------------------------------------------------------
-def _extract_frame_info(frame_line, json_dump):
+# the number of fields in a pipe dump frame line
+_FRAME_LINE_LENGTH = 7
+_FRAME_LINE_PADDING = (None,) * _FRAME_LINE_LENGTH
+
+
+#------------------------------------------------------------------------------
+def _extract_frame_info(frame_line, json_dump, thread_number=None):
     """given a pipe dump Frame line, extract the parts and put them in their
-    proper location within the json_dump"""
-    if 'threads' not in json_dump:
-        json_dump.threads = []
-    thread_number = _get_int(frame_line, 0, None)
+    proper location within the json_dump.
+
+    This is the hot spot of the conversion, there is one frame line per frame
+    of every thread.  The line is padded to its full length once rather than
+    testing for each field's presence, and the frame is built directly
+    instead of through 'put_if_not_none'."""
+    try:
+        threads = json_dump.threads
+    except KeyError:
+        threads = json_dump.threads = []
     if thread_number is None:
-        return
-    if thread_number >=len(json_dump.threads):
+        thread_number = _get_int(frame_line, 0, None)
+        if thread_number is None:
+            return
+    if thread_number >= len(threads):
         # threads are supposed to arrive in order.  We've not seen this thread
         # before, fill in a new entry in the 'threads' section of the json_dump
         # making sure that intervening missing threads have empty thread data
-        for i in range(thread_number - len(json_dump.threads) + 1):
+        for i in range(thread_number - len(threads) + 1):
             thread = DotDict()
             thread.frame_count = 0
             thread.frames = []
-            json_dump.threads.append(thread)
+            threads.append(thread)
     # collect frame info from the pipe dump line
-    tmp_frame = _get_int(frame_line, 1, None)
-    tmp_module = _get(frame_line, 2, None)
-    tmp_function = _get(frame_line, 3, None)
-    tmp_file = _get(frame_line, 4, None)
-    tmp_line = _get_int(frame_line, 5, None)
-    tmp_offset = _get(frame_line, 6, None)
-    frame = DotDictWithPut()
-    frame.put_if_not_none('frame', tmp_frame)
-    frame.put_if_not_none('module', tmp_module)
-    frame.put_if_not_none('function', tmp_function)
-    frame.put_if_not_none('file', tmp_file)
-    frame.put_if_not_none('line', tmp_line)
+    if len(frame_line) < _FRAME_LINE_LENGTH:
+        frame_line = list(frame_line)
+        frame_line.extend(
+            _FRAME_LINE_PADDING[:_FRAME_LINE_LENGTH - len(frame_line)]
+        )
+    (
+        unused_thread_number,
+        tmp_frame,
+        tmp_module,
+        tmp_function,
+        tmp_file,
+        tmp_line,
+        tmp_offset
+    ) = frame_line[:_FRAME_LINE_LENGTH]
+    frame = DotDict()
+    if tmp_frame:
+        try:
+            frame['frame'] = int(tmp_frame)
+        except ValueError:
+            pass
+    if tmp_module:
+        frame['module'] = tmp_module
+    if tmp_function:
+        frame['function'] = tmp_function
+    if tmp_file:
+        frame['file'] = tmp_file
+    if tmp_line:
+        try:
+            tmp_line = int(tmp_line)
+            frame['line'] = tmp_line
+        except ValueError:
+            tmp_line = None
+    else:
+        tmp_line = None
     if tmp_file and tmp_line is not None:
         # skip offset entirely
         pass
     elif not tmp_file and tmp_function:
-        frame.function_offset = tmp_offset
+        frame['function_offset'] = tmp_offset
     elif not tmp_function and tmp_module:
-        frame.module_offset = tmp_offset
+        frame['module_offset'] = tmp_offset
     else:
-        frame.offset = tmp_offset
+        frame['offset'] = tmp_offset
     # save the frame info into the json
-    json_dump.threads[thread_number].frames.append(frame)
-    json_dump.threads[thread_number].frame_count += 1
-
+    thread = threads[thread_number]
+    thread.frames.append(frame)
+    thread.frame_count += 1
@@ -1,5 +1,6 @@
 import re
 import os
+import hashlib
 import subprocess
 import threading
 import ujson
@@ -15,6 +16,10 @@ from socorro.lib.converters import change_default
 
 from socorro.lib.util import DotDict
 from socorro.lib.transform_rules import Rule
+from socorro.processor.stackwalker_output_cache import (
+    StackwalkerOutputCache,
+    file_digest,
+)
 
 
 #------------------------------------------------------------------------------
@@ -536,11 +541,74 @@ class BreakpadStackwalkerRule2015(ExternalProcessRule):
         doc='a path where temporary files may be written',
         default=tempfile.gettempdir(),
     )
+    required_config.add_option(
+        'stackwalker_output_cache_path',
+        doc='a path where the output of the stackwalker is cached by the '
+        'digest of the dump, it may be shared by the processors on a host '
+        '(empty to disable the cache)',
+        default='',
+    )
+    required_config.add_option(
+        'stackwalker_output_cache_size',
+        doc='the maximum size in bytes of the stackwalker output cache',
+        default=1024 ** 3,
+    )
+    required_config.add_option(
+        'symbols_version',
+        doc='a label for the symbols on the symbol servers, change it when '
+        'symbols are replaced so that cached stackwalker output made with '
+        'the old symbols is not used',
+        default='',
+    )
+
+    #--------------------------------------------------------------------------
+    def __init__(self, config):
+        super(BreakpadStackwalkerRule2015, self).__init__(config)
+        if config.get('stackwalker_output_cache_path'):
+            self.output_cache = StackwalkerOutputCache(
+                config.stackwalker_output_cache_path,
+                config.stackwalker_output_cache_size,
+                config.logger
+            )
+            self._output_cache_context = self._get_output_cache_context()
+        else:
+            self.output_cache = None
 
     #--------------------------------------------------------------------------
     def version(self):
         return '1.0'
 
+    #--------------------------------------------------------------------------
+    def _get_output_cache_context(self):
+        """return a digest of everything but the dump that determines the
+        output of the stackwalker: the stackwalker binary, identified by its
+        size and modification time, how it is invoked and the symbols it
+        uses.  The raw crash that is also passed to the stackwalker is
+        assumed not to change its output for a given dump."""
+        try:
+            stat = os.stat(self.config.command_pathname)
+            stackwalker_version = '%d:%d' % (stat.st_size, stat.st_mtime)
+        except OSError:
+            stackwalker_version = ''
+        context = hashlib.sha256()
+        for part in (
+            self.config.command_pathname,
+            stackwalker_version,
+            self.config.command_line,
+            self.config.public_symbols_url,
+            self.config.private_symbols_url,
+            self.config.symbols_version,
+        ):
+            context.update(str(part))
+            context.update('\0')
+        return context.hexdigest()
+
+    #--------------------------------------------------------------------------
+    def _get_output_cache_key(self, dump_pathname):
+        return hashlib.sha256(
+            self._output_cache_context + file_digest(dump_pathname)
+        ).hexdigest()
+
     #--------------------------------------------------------------------------
     @contextmanager
     def _temp_raw_crash_json_file(self, raw_crash, crash_id):
@@ -564,7 +632,21 @@ class BreakpadStackwalkerRule2015(ExternalProcessRule):
             BreakpadStackwalkerRule2015,
             self
         )._execute_external_process(command_line, processor_meta)
+        return self._interpret_stackwalker_output(
+            stackwalker_output,
+            return_code,
+            command_line,
+            processor_meta
+        )
 
+    #--------------------------------------------------------------------------
+    def _interpret_stackwalker_output(
+        self,
+        stackwalker_output,
+        return_code,
+        command_line,
+        processor_meta
+    ):
         if not isinstance(stackwalker_output, Mapping):
             processor_meta.processor_notes.append(
                 "MDSW produced unexpected output: %s..." %
@@ -596,6 +678,68 @@ class BreakpadStackwalkerRule2015(ExternalProcessRule):
 
         return stackwalker_data, return_code
 
+    #--------------------------------------------------------------------------
+    @staticmethod
+    def _is_cacheable(stackwalker_output, return_code):
+        """only complete results are cached: a failed run may succeed next
+        time and symbols missing now may be uploaded before the crash is
+        reprocessed"""
+        if (
+            return_code != 0
+            or not isinstance(stackwalker_output, Mapping)
+            or stackwalker_output.get('status') != 'OK'
+        ):
+            return False
+        for module in stackwalker_output.get('modules', ()):
+            if module.get('missing_symbols'):
+                return False
+        return True
+
+    #--------------------------------------------------------------------------
+    def _stackwalk(self, command_line, dump_pathname, processor_meta):
+        """run the stackwalker on a dump unless its output for the same dump
+        is in the output cache"""
+        if self.output_cache is None:
+            return self._execute_external_process(command_line, processor_meta)
+
+        try:
+            key = self._get_output_cache_key(dump_pathname)
+        except IOError, x:
+            # the stackwalker will report on the unreadable dump
+            self.config.logger.warning(
+                'cannot digest %s: %s',
+                dump_pathname,
+                x
+            )
+            return self._execute_external_process(command_line, processor_meta)
+
+        stackwalker_output = self.output_cache.get(key)
+        if stackwalker_output is not None:
+            if self.config.chatty:
+                self.config.logger.debug(
+                    'BreakpadStackwalkerRule: cached output for %s',
+                    dump_pathname
+                )
+            return self._interpret_stackwalker_output(
+                stackwalker_output,
+                0,
+                command_line,
+                processor_meta
+            )
+
+        stackwalker_output, return_code = super(
+            BreakpadStackwalkerRule2015,
+            self
+        )._execute_external_process(command_line, processor_meta)
+        if self._is_cacheable(stackwalker_output, return_code):
+            self.output_cache.put(key, stackwalker_output)
+        return self._interpret_stackwalker_output(
+            stackwalker_output,
+            return_code,
+            command_line,
+            processor_meta
+        )
+
     #--------------------------------------------------------------------------
     def _action(self, raw_crash, raw_dumps, processed_crash, processor_meta):
         if 'additional_minidumps' not in processed_crash:
@@ -636,8 +780,9 @@ class BreakpadStackwalkerRule2015(ExternalProcessRule):
                     )
                 )
 
-                stackwalker_data, return_code = self._execute_external_process(
+                stackwalker_data, return_code = self._stackwalk(
                     command_line,
+                    dump_pathname,
                     processor_meta
                 )
 
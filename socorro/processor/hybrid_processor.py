@@ -31,7 +31,6 @@ from socorro.lib.ooid import dateFromOoid
 from socorro.lib.util import (
     DotDict,
     emptyFilter,
-    CachingIterator
 )
 
 
@@ -43,6 +42,94 @@ def create_symbol_path_str(input_str):
     return ' '.join(quoted_symbols_list)
 
 
+#==============================================================================
+class StackwalkerOutput(object):
+    """the complete stdout of the hybrid minidump stackwalker held in a single
+    string.  The output is the pipe dump (header lines, a blank line and the
+    frame lines), optionally a sentinel line and then the json dump.  The
+    boundaries are found with 'find' on the whole buffer, iteration yields
+    the lines of the pipe dump without collecting them and both the pipe dump
+    text and the json dump are taken straight from the buffer."""
+
+    pipe_dump_sentinel = '====PIPE DUMP ENDS==='
+
+    #--------------------------------------------------------------------------
+    def __init__(self, buffer):
+        self.buffer = buffer
+        pipe_dump_end = len(buffer)
+        json_start = None
+        sentinel_index = buffer.find(self.pipe_dump_sentinel)
+        if sentinel_index != -1:
+            pipe_dump_end = buffer.rfind('\n', 0, sentinel_index) + 1
+            line_end = buffer.find('\n', sentinel_index)
+            json_start = len(buffer) if line_end == -1 else line_end + 1
+        if buffer.startswith('{'):
+            brace_index = 0
+        else:
+            brace_index = buffer.find('\n{', 0, pipe_dump_end)
+            if brace_index != -1:
+                brace_index += 1
+        if brace_index != -1 and brace_index < pipe_dump_end:
+            # no sentinel before the json dump
+            pipe_dump_end = json_start = brace_index
+        self.pipe_dump_end = pipe_dump_end
+        self.json_start = json_start
+        self._lines = self._iter_pipe_dump_lines()
+
+    #--------------------------------------------------------------------------
+    def _iter_pipe_dump_lines(self):
+        buffer = self.buffer
+        end = self.pipe_dump_end
+        start = 0
+        while start < end:
+            line_end = buffer.find('\n', start, end)
+            if line_end == -1:
+                line_end = end
+            yield buffer[start:line_end]
+            start = line_end + 1
+
+    #--------------------------------------------------------------------------
+    def __iter__(self):
+        """like a file, the lines come from a single shared iterator so that
+        one loop can pick up where an earlier one stopped."""
+        return self._lines
+
+    #--------------------------------------------------------------------------
+    def next(self):
+        return self._lines.next()
+
+    #--------------------------------------------------------------------------
+    def close(self):
+        pass
+
+    #--------------------------------------------------------------------------
+    @property
+    def pipe_dump(self):
+        """the pipe dump text without the sentinel, ending in a linefeed"""
+        if not self.pipe_dump_end:
+            return '\n'
+        if self.buffer[self.pipe_dump_end - 1] == '\n':
+            return self.buffer[:self.pipe_dump_end]
+        return self.buffer[:self.pipe_dump_end] + '\n'
+
+    #--------------------------------------------------------------------------
+    def json_dump(self):
+        """decode the json dump in place, raising ValueError if there is
+        none or it is not valid json"""
+        if self.json_start is None:
+            raise ValueError('no json dump in the stackwalker output')
+        decoder = json.JSONDecoder()
+        start = json.decoder.WHITESPACE.match(
+            self.buffer,
+            self.json_start
+        ).end()
+        json_dump, end = decoder.raw_decode(self.buffer, start)
+        end = json.decoder.WHITESPACE.match(self.buffer, end).end()
+        if end != len(self.buffer):
+            raise ValueError('extra data after the json dump')
+        return json_dump
+
+
 #==============================================================================
 class HybridCrashProcessor(RequiredConfig):
     """this class is a refactoring of the original processor algorithm into
@@ -820,7 +907,8 @@ class HybridCrashProcessor(RequiredConfig):
             shell=True,
             stdout=subprocess.PIPE
         )
-        return (CachingIterator(subprocess_handle.stdout),
+        # one read into one buffer, the analysis works from slices of it
+        return (StackwalkerOutput(subprocess_handle.stdout.read()),
                 subprocess_handle)
 
     #--------------------------------------------------------------------------
@@ -852,8 +940,6 @@ class HybridCrashProcessor(RequiredConfig):
         """
         dump_analysis_line_iterator, mdsw_subprocess_handle = \
             self._invoke_minidump_stackwalk(dump_pathname, raw_crash_pathname)
-        dump_analysis_line_iterator.secondaryCacheMaximumSize = \
-            self.config.crashing_thread_tail_frame_threshold + 1
 
         processed_crash_update = self._stackwalk_analysis(
             dump_analysis_line_iterator,
@@ -926,19 +1012,6 @@ class HybridCrashProcessor(RequiredConfig):
 
         return memory_info
 
-    #--------------------------------------------------------------------------
-    @staticmethod
-    def _create_pipe_dump_entry(pipedump_lines):
-        """make one string from all the cached lines of the stackwalker
-        output.  If we've got linefeeds at the end of the lines, don't add
-        any more."""
-        try:
-            if pipedump_lines[0].endswith('\n'):
-                return ''.join(pipedump_lines)
-        except IndexError:
-            return '\n'  # no pipe dump lines at all
-        return '\n'.join(pipedump_lines) + '\n'
-
     #--------------------------------------------------------------------------
     def _stackwalk_analysis(
         self,
@@ -977,30 +1050,10 @@ class HybridCrashProcessor(RequiredConfig):
             processed_crash_update.update(processed_crash_from_frames)
 
             self.quit_check()
+            processed_crash_update.dump = mdsw_iter.pipe_dump
             try:
-                mdsw_iter.cache.remove("====PIPE DUMP ENDS===")
+                processed_crash_update.json_dump = mdsw_iter.json_dump()
             except ValueError:
-                pass  # the sentinel is not there, this is ok, ignore the error
-            if (len(mdsw_iter.cache) > 0
-                and mdsw_iter.cache[-1].startswith('{')
-            ):
-                # we've gone too far and consumed the jDump - get it back
-                json_dump_lines = [mdsw_iter.cache[-1]]
-                pipe_dump_str = self._create_pipe_dump_entry(
-                    mdsw_iter.cache[:-1]
-                )
-            else:
-                pipe_dump_str = self._create_pipe_dump_entry(mdsw_iter.cache)
-                json_dump_lines = []
-
-            processed_crash_update.dump = pipe_dump_str
-
-            for x in mdsw_iter:
-                json_dump_lines.append(x)
-            json_dump_str = ''.join(json_dump_lines)
-            try:
-                processed_crash_update.json_dump = json.loads(json_dump_str)
-            except ValueError, x:
                 processed_crash_update.json_dump = {}
                 processor_notes.append("no json output found from MDSW")
 
@@ -1315,7 +1368,6 @@ class HybridCrashProcessor(RequiredConfig):
                 # this boolean will force the loop to just consume the rest
                 # of the pipe dump with no more processing.
                 crashing_thread_found = True
-        dump_analysis_line_iterator.stopUsingSecondaryCache()
 
         signature = self._generate_signature(signature_generation_frames,
                                              java_stack_trace,
@@ -30,7 +30,7 @@ from socorro.lib.util import (
     emptyFilter,
     StrCachingIterator
 )
-from socorro.processor.breakpad_pipe_to_json import pipe_dump_to_json_dump
+from socorro.processor.breakpad_pipe_to_json import LazyJsonDump
 
 #------------------------------------------------------------------------------
 def create_symbol_path_str(input_str):
@@ -193,7 +193,8 @@ class LegacyCrashProcessor(RequiredConfig):
     required_config.add_option(
         'save_mdsw_json',
         doc='boolean if the json version of the MDSW pipe dump should be saved'
-            'with the pipedump',
+            'with the pipedump (failures to convert it are noted only when it '
+            'is saved or read by a rule)',
         default=False,
     )
     required_config.namespace('statistics')
@@ -337,19 +338,14 @@ class LegacyCrashProcessor(RequiredConfig):
                         processor_notes
                     )
                 try:
-                    dump_analysis.json_dump = pipe_dump_to_json_dump(
-                        dump_analysis.dump.split('\n')
+                    # the conversion is deferred until something reads the
+                    # json_dump or it is about to be saved
+                    dump_analysis.json_dump = LazyJsonDump(
+                        dump_analysis.dump
                     )
                 except (KeyError, AttributeError):
                     processor_notes.append(
                         "Pipe dump missing from '%s'" % name)
-                except Exception, x:
-                    error_message = (
-                        "Conversion to json dump format has failed for '%s'" %
-                        name
-                    )
-                    processor_notes.append(error_message)
-                    self.config.logger.info(error_message)
 
                 if name == self.config.dump_field:
                     processed_crash.update(dump_analysis)
@@ -389,20 +385,27 @@ class LegacyCrashProcessor(RequiredConfig):
             processor_notes.append('unrecoverable processor error: %s' % x)
             self._statistics.incr('errors')
 
+        self._materialize_json_dump(
+            processed_crash,
+            self.config.dump_field,
+            processor_notes,
+            self.config.save_mdsw_json
+        )
+        for a_dump_name in processed_crash.get('additional_minidumps', ()):
+            try:
+                self._materialize_json_dump(
+                    processed_crash[a_dump_name],
+                    a_dump_name,
+                    processor_notes,
+                    self.config.save_mdsw_json
+                )
+            except (KeyError, AttributeError):
+                pass
+
         processor_notes = '; '.join(processor_notes)
         processed_crash.processor_notes = processor_notes
         completed_datetime = utc_now()
         processed_crash.completeddatetime = completed_datetime
-        if not self.config.save_mdsw_json:
-            try:
-                del processed_crash['json_dump']
-            except (KeyError, AttributeError):
-                pass
-            for a_dump_name in processed_crash.additional_minidumps:
-                try:
-                    del processed_crash[a_dump_name]['json_dump']
-                except (KeyError, AttributeError):
-                    pass
 
         self._log_job_end(
             completed_datetime,
@@ -411,6 +414,37 @@ class LegacyCrashProcessor(RequiredConfig):
         )
         return processed_crash
 
+    #--------------------------------------------------------------------------
+    def _materialize_json_dump(self, dump_analysis, name, processor_notes,
+                               keep=True):
+        """replace a deferred json_dump with its converted form so that it
+        can be serialized with the rest of the processed crash, or remove it
+        if it is not to be kept.  A failed conversion is noted either way.
+
+        A json_dump that is not kept is only converted if something already
+        tried to read it.  Converting it here just to drop it would cost
+        every crash what the deferral saves, so a pipe dump that nothing
+        reads and that cannot be converted is deliberately not noted."""
+        json_dump = dump_analysis.get('json_dump')
+        if isinstance(json_dump, LazyJsonDump) and (
+            keep or json_dump.conversion_error is not None
+        ):
+            try:
+                json_dump = json_dump.materialize()
+            except Exception:
+                json_dump = None
+                error_message = (
+                    "Conversion to json dump format has failed for '%s'" %
+                    name
+                )
+                processor_notes.append(error_message)
+                self.config.logger.info(error_message)
+        if keep and json_dump is not None:
+            dump_analysis.json_dump = json_dump
+        elif 'json_dump' in dump_analysis:
+            del dump_analysis['json_dump']
+
+    #--------------------------------------------------------------------------
     def _create_minimal_processed_crash(self):
         processed_crash = DotDict()
         processed_crash.addons = None
@@ -882,9 +916,7 @@ class LegacyCrashProcessor(RequiredConfig):
                         # cache doesn't get truncated
             pipe_dump_str = ('\n'.join(mdsw_iter.cache))
             processed_crash_update.dump = pipe_dump_str
-            processed_crash_update.json_dump = pipe_dump_to_json_dump(
-                mdsw_iter.cache
-            )
+            processed_crash_update.json_dump = LazyJsonDump(pipe_dump_str)
 
         return_code = mdsw_subprocess_handle.wait()
         if return_code is not None and return_code != 0:
@@ -3,6 +3,9 @@
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 import datetime
+import heapq
+import json
+import threading
 import time
 import ujson
 import re
@@ -26,12 +29,12 @@ from socorro.lib.datetimeutil import (
     datestring_to_weekly_partition
 )
 from socorro.lib.context_tools import temp_file_context
-
-from socorro.external.postgresql.dbapi2_util import (
-    execute_query_fetchall,
-    execute_no_results
+from socorro.processor.product_version_lookup import (
+    get_product_version_lookup
 )
 
+from socorro.external.postgresql.dbapi2_util import execute_no_results
+
 
 #==============================================================================
 class ProductRule(Rule):
@@ -354,20 +357,65 @@ class JavaProcessRule(Rule):
 
 #==============================================================================
 class OutOfMemoryBinaryRule(Rule):
+    required_config = Namespace()
+    required_config.add_option(
+        'summarize_memory_report',
+        doc='always store a summary of the memory report rather than the '
+            'whole report',
+        default=False,
+    )
+    required_config.add_option(
+        'max_full_memory_report_size',
+        doc='memory reports larger than this (in decompressed bytes) are '
+            'summarized rather than stored in full',
+        default=10 * 1024 * 1024,
+    )
+    required_config.add_option(
+        'max_memory_report_size',
+        doc='stop reading a memory report after this many decompressed bytes '
+            'and mark its summary as truncated',
+        default=200 * 1024 * 1024,
+    )
+    required_config.add_option(
+        'memory_report_top_n',
+        doc='the number of largest reporters kept in a memory report summary',
+        default=20,
+    )
+    required_config.add_option(
+        'memory_report_prefix_depth',
+        doc='the number of path components used to group reporter totals in '
+            'a memory report summary',
+        default=2,
+    )
+
+    _report_chunk_size = 64 * 1024
+    _header_re = re.compile(r'"(version|hasMozMallocUsableSize)"\s*:\s*(\w+)')
+    _reports_re = re.compile(r'"reports"\s*:\s*\[')
+    _json_decoder = json.JSONDecoder()
 
     #--------------------------------------------------------------------------
     def version(self):
-        return '1.0'
+        return '2.0'
 
     #--------------------------------------------------------------------------
     def _predicate(self, raw_crash, raw_dumps, processed_crash, proc_meta):
         return 'memory_report' in raw_dumps
 
     #--------------------------------------------------------------------------
-    @staticmethod
-    def _extract_memory_info(dump_pathname, processor_notes):
+    @classmethod
+    def _extract_memory_info(
+        klass,
+        dump_pathname,
+        processor_notes,
+        max_size=None,
+        summary_options=None
+    ):
         """Extract and return the JSON data from the .json.gz memory report.
-        file"""
+        file.  If 'max_size' is given, no more than that many decompressed
+        bytes are loaded: a larger report is summarized instead, by
+        '_summarize_memory_info' called with the 'summary_options'.  The
+        summary carries on from where the size check stopped, so the report
+        is decompressed only once either way."""
         try:
             fd = gzip_open(dump_pathname, "rb")
         except IOError, x:
@@ -375,7 +423,19 @@ class OutOfMemoryBinaryRule(Rule):
             processor_notes.append(error_message)
             return {"ERROR": error_message}
         try:
-            memory_info = json_load(fd)
+            if max_size is None:
+                memory_info = json_load(fd)
+            else:
+                head = klass._read_at_most(fd, max_size)
+                if len(head) > max_size:
+                    return klass._summarize_memory_info(
+                        dump_pathname,
+                        processor_notes,
+                        fd=fd,
+                        head=head,
+                        **(summary_options or {})
+                    )
+                memory_info = ujson.loads(head)
         except ValueError, x:
             error_message = "error in json for %s: %r" % (dump_pathname, x)
             processor_notes.append(error_message)
@@ -385,39 +445,219 @@ class OutOfMemoryBinaryRule(Rule):
 
         return memory_info
 
+    #--------------------------------------------------------------------------
+    @classmethod
+    def _read_at_most(klass, fd, max_size):
+        """read and return the decompressed report in chunks, stopping as
+        soon as more than 'max_size' bytes have been read.  The size in the
+        gzip trailer is only the size modulo 4GB, so it is not used."""
+        chunks = []
+        size = 0
+        while size <= max_size:
+            chunk = fd.read(klass._report_chunk_size)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size += len(chunk)
+        return ''.join(chunks)
+
+    #--------------------------------------------------------------------------
+    @classmethod
+    def _iter_memory_reports(klass, fd, header, max_size, head=''):
+        """generate the entries of the 'reports' array of a memory report one
+        at a time, reading the file in chunks so that only one entry and one
+        chunk are ever held in memory.  'head' holds the start of the report
+        if it has already been read from 'fd'.  The scalars preceding the
+        array are stored into 'header'.  If more than 'max_size' bytes would
+        have to be read, the generation stops and header['truncated'] is
+        set."""
+        decoder = klass._json_decoder
+        buffer = head
+        bytes_read = len(head)
+        eof = False
+
+        def read_more(buffer, index):
+            chunk = fd.read(klass._report_chunk_size)
+            return buffer[index:] + chunk, chunk
+
+        # find the start of the reports array
+        while True:
+            match = klass._reports_re.search(buffer)
+            if match:
+                break
+            if eof or bytes_read >= max_size:
+                raise ValueError('no reports found in memory report')
+            # keep a tail in case the key straddles two chunks
+            for key, value in klass._header_re.findall(buffer):
+                header[key] = json.loads(value)
+            buffer, chunk = read_more(buffer, max(len(buffer) - 32, 0))
+            bytes_read += len(chunk)
+            eof = not chunk
+        for key, value in klass._header_re.findall(buffer[:match.start()]):
+            header[key] = json.loads(value)
+
+        index = match.end()
+        while True:
+            # skip to the next entry
+            while True:
+                while index < len(buffer) and buffer[index] in ' \t\r\n,':
+                    index += 1
+                if index < len(buffer) or eof:
+                    break
+                if bytes_read >= max_size:
+                    header['truncated'] = True
+                    return
+                buffer, chunk = read_more(buffer, index)
+                bytes_read += len(chunk)
+                eof = not chunk
+                index = 0
+            if index >= len(buffer):
+                raise ValueError('memory report ended inside the reports')
+            if buffer[index] == ']':
+                return
+            try:
+                entry, index = decoder.raw_decode(buffer, index)
+            except ValueError:
+                # the entry is not entirely in the buffer yet
+                if eof:
+                    raise
+                if bytes_read >= max_size:
+                    header['truncated'] = True
+                    return
+                buffer, chunk = read_more(buffer, index)
+                bytes_read += len(chunk)
+                eof = not chunk
+                index = 0
+                continue
+            yield entry
+
+    #--------------------------------------------------------------------------
+    @classmethod
+    def _summarize_memory_info(
+        klass,
+        dump_pathname,
+        processor_notes,
+        top_n=20,
+        prefix_depth=2,
+        max_size=200 * 1024 * 1024,
+        fd=None,
+        head=''
+    ):
+        """Extract and return a summary of the .json.gz memory report: the
+        'top_n' largest reporters and the byte totals grouped by the first
+        'prefix_depth' components of the reporter paths.  A report already
+        opened and partly read, into 'head', may be passed in as 'fd'; it
+        is left for the caller to close."""
+        if fd is None:
+            try:
+                report_file = gzip_open(dump_pathname, "rb")
+            except IOError, x:
+                error_message = "error in gzip for %s: %r" % (
+                    dump_pathname,
+                    x
+                )
+                processor_notes.append(error_message)
+                return {"ERROR": error_message}
+        else:
+            report_file = fd
+        header = {}
+        totals = {}
+        largest = []
+        report_count = 0
+        try:
+            for entry in klass._iter_memory_reports(
+                report_file,
+                header,
+                max_size,
+                head
+            ):
+                report_count += 1
+                # only reports in bytes can be added together
+                if entry.get('units', 0) != 0:
+                    continue
+                path = entry.get('path', '')
+                amount = entry.get('amount', 0)
+                prefix = '/'.join(path.split('/')[:prefix_depth])
+                totals[prefix] = totals.get(prefix, 0) + amount
+                if len(largest) < top_n:
+                    push = heapq.heappush
+                elif largest and amount > largest[0][0]:
+                    push = heapq.heapreplace
+                else:
+                    continue
+                push(
+                    largest,
+                    (
+                        amount,
+                        report_count,
+                        {
+                            'process': entry.get('process', ''),
+                            'path': path,
+                            'amount': amount,
+                        }
+                    )
+                )
+        except (IOError, ValueError), x:
+            error_message = "error in json for %s: %r" % (dump_pathname, x)
+            processor_notes.append(error_message)
+            return {"ERROR": error_message}
+        finally:
+            if fd is None:
+                report_file.close()
+
+        if header.get('truncated'):
+            processor_notes.append(
+                'memory report exceeded %d bytes, summary is truncated'
+                % max_size
+            )
+        summary = {
+            'summary': True,
+            'truncated': header.pop('truncated', False),
+            'report_count': report_count,
+            'totals_by_path_prefix': totals,
+            'top_reporters': [
+                reporter for amount, order, reporter in sorted(
+                    largest,
+                    reverse=True
+                )
+            ],
+        }
+        summary.update(header)
+        return summary
+
     #--------------------------------------------------------------------------
     def _action(self, raw_crash, raw_dumps, processed_crash, processor_meta):
         pathname = raw_dumps['memory_report']
+        summary_options = {
+            'top_n': self.config.memory_report_top_n,
+            'prefix_depth': self.config.memory_report_prefix_depth,
+            'max_size': self.config.max_memory_report_size,
+        }
         with temp_file_context(pathname):
-            processed_crash.memory_report = self._extract_memory_info(
-                dump_pathname=pathname,
-                processor_notes=processor_meta.processor_notes
-            )
+            if self.config.summarize_memory_report:
+                memory_report = self._summarize_memory_info(
+                    dump_pathname=pathname,
+                    processor_notes=processor_meta.processor_notes,
+                    **summary_options
+                )
+            else:
+                memory_report = self._extract_memory_info(
+                    dump_pathname=pathname,
+                    processor_notes=processor_meta.processor_notes,
+                    max_size=self.config.max_full_memory_report_size,
+                    summary_options=summary_options
+                )
+        if isinstance(memory_report, dict) and memory_report.get('summary'):
+            # the complete report remains available from crash storage as
+            # the raw dump of that name
+            memory_report['full_report_dump_name'] = 'memory_report'
+        processed_crash.memory_report = memory_report
         return True
 
 
 #--------------------------------------------------------------------------
 def setup_product_id_map(config, local_config, args_unused):
-    database_connection = local_config.database_class(local_config)
-    transaction = local_config.transaction_executor_class(
-        local_config,
-        database_connection
-    )
-    sql = (
-        "SELECT product_name, productid, rewrite FROM "
-        "product_productid_map WHERE rewrite IS TRUE"
-    )
-    product_mappings = transaction(
-        execute_query_fetchall,
-        sql
-    )
-    product_id_map = {}
-    for product_name, productid, rewrite in product_mappings:
-        product_id_map[productid] = {
-            'product_name': product_name,
-            'rewrite': rewrite
-        }
-    return product_id_map
+    return get_product_version_lookup(local_config).get_product_id_map()
 
 
 #==============================================================================
@@ -448,11 +688,9 @@ class ProductRewrite(Rule):
     #--------------------------------------------------------------------------
     def __init__(self, config):
         super(ProductRewrite, self).__init__(config)
-        self.product_id_map = setup_product_id_map(
-            config,
-            config,
-            None
-        )
+        self.product_id_map = get_product_version_lookup(
+            config
+        ).get_product_id_map()
 
     #--------------------------------------------------------------------------
     def version(self):
@@ -771,6 +1009,19 @@ class MissingSymbolsRule(Rule):
         reference_value_from='resource.postgresql',
     )
 
+    required_config.add_option(
+        'batch_size',
+        doc='the number of distinct missing symbols to accumulate before '
+            'they are written to the database',
+        default=500,
+    )
+    required_config.add_option(
+        'flush_interval',
+        doc='the maximum number of seconds missing symbols are held in '
+            'memory before they are written to the database',
+        default=60,
+    )
+
     #--------------------------------------------------------------------------
     def __init__(self, config):
         super(MissingSymbolsRule, self).__init__(config)
@@ -781,42 +1032,115 @@ class MissingSymbolsRule(Rule):
         )
         self.sql = (
             "INSERT INTO missing_symbols_%s (date_processed, debug_file, debug_id)"
-            " VALUES (%%s, %%s, %%s)"
+            " VALUES %s"
         )
+        # the rule is shared by all the processor threads, the pending
+        # missing symbols are protected by this lock
+        self._lock = threading.Lock()
+        # a mapping of (partition, debug_file, debug_id) to the
+        # date_processed of the first crash seen with those missing symbols
+        self._pending = {}
+        self._pending_since = time.time()
+        self.seen_count = 0
+        self.duplicate_count = 0
 
     #--------------------------------------------------------------------------
     def version(self):
-        return '1.0'
+        return '2.0'
 
     #--------------------------------------------------------------------------
     def _action(self, raw_crash, raw_dumps, processed_crash, processor_meta):
         try:
             date = processed_crash['date_processed']
             # update partition information based on date processed
-            sql = self.sql % datestring_to_weekly_partition(date)
+            partition = datestring_to_weekly_partition(date)
+            missing_symbols = []
             for module in processed_crash['json_dump']['modules']:
                 try:
                     if module['missing_symbols']:
-                        self.transaction(
-                            execute_no_results,
-                            sql,
-                            (
-                                date,
-                                module['debug_file'],
-                                module['debug_id']
-                            )
-                        )
-                except self.database.ProgrammingError as e:
-                    processor_meta.processor_notes.append(
-                        "WARNING: missing symbols rule failed for"
-                        " %s" % raw_crash.uuid
-                    )
+                        missing_symbols.append((
+                            partition,
+                            module['debug_file'],
+                            module['debug_id']
+                        ))
                 except KeyError:
                     pass
         except KeyError:
             return False
+
+        with self._lock:
+            for key in missing_symbols:
+                self.seen_count += 1
+                if key in self._pending:
+                    self.duplicate_count += 1
+                else:
+                    self._pending[key] = date
+            age = time.time() - self._pending_since
+            flush_is_due = (
+                len(self._pending) >= self.config.batch_size
+                or age >= self.config.flush_interval
+            )
+            if flush_is_due:
+                pending = self._swap_pending()
+        if flush_is_due:
+            self._save_missing_symbols(pending)
         return True
 
+    #--------------------------------------------------------------------------
+    def _swap_pending(self):
+        """must be called while holding the lock.  Take the currently pending
+        missing symbols and start a new collection window."""
+        pending = self._pending
+        self._pending = {}
+        self._pending_since = time.time()
+        return pending
+
+    #--------------------------------------------------------------------------
+    def _save_missing_symbols(self, pending):
+        """write the collected missing symbols with one multi-row insert per
+        weekly partition."""
+        if not pending:
+            return
+        by_partition = {}
+        for (partition, debug_file, debug_id), date in pending.iteritems():
+            by_partition.setdefault(partition, []).append(
+                (date, debug_file, debug_id)
+            )
+        self.config.logger.info(
+            'MissingSymbolsRule: saving %d missing symbols, %d of %d seen '
+            'were duplicates',
+            len(pending),
+            self.duplicate_count,
+            self.seen_count
+        )
+        for partition, rows in sorted(by_partition.iteritems()):
+            sql = self.sql % (
+                partition,
+                ', '.join(['(%s, %s, %s)'] * len(rows))
+            )
+            parameters = [value for a_row in rows for value in a_row]
+            try:
+                self.transaction(execute_no_results, sql, parameters)
+            except self.database.ProgrammingError:
+                self.config.logger.warning(
+                    'MissingSymbolsRule: failed to save %d missing symbols '
+                    'to missing_symbols_%s',
+                    len(rows),
+                    partition,
+                    exc_info=True
+                )
+
+    #--------------------------------------------------------------------------
+    def flush(self):
+        """write any pending missing symbols immediately"""
+        with self._lock:
+            pending = self._swap_pending()
+        self._save_missing_symbols(pending)
+
+    #--------------------------------------------------------------------------
+    def close(self):
+        self.flush()
+
 
 #==============================================================================
 class BetaVersionRule(Rule):
@@ -837,54 +1161,44 @@ class BetaVersionRule(Rule):
         from_string_converter=str_to_python_object,
         reference_value_from='resource.postgresql',
     )
+    required_config.add_option(
+        'version_data_refresh_interval',
+        doc='seconds between incremental reloads of the shared product '
+            'version index',
+        default=600,
+    )
+    required_config.add_option(
+        'version_data_negative_cache_ttl',
+        doc='seconds an unknown build is remembered before it is looked up '
+            'in the database again',
+        default=60,
+    )
 
     #--------------------------------------------------------------------------
     def __init__(self, config):
         super(BetaVersionRule, self).__init__(config)
-        database = config.database_class(config)
-        self.transaction = config.transaction_executor_class(
+        self.version_lookup = get_product_version_lookup(
             config,
-            database,
+            refresh_interval=config.get(
+                'version_data_refresh_interval', 600
+            ),
+            negative_cache_ttl=config.get(
+                'version_data_negative_cache_ttl', 60
+            ),
         )
-        self._versions_data_cache = {}
 
     #--------------------------------------------------------------------------
     def version(self):
-        return '1.0'
+        return '2.0'
 
     #--------------------------------------------------------------------------
     def _get_version_data(self, product, version, release_channel, build_id):
-        key = '%s:%s:%s:%s' % (product, version, release_channel, build_id)
-
-        if key in self._versions_data_cache:
-            return self._versions_data_cache[key]
-
-        sql = """
-            SELECT
-                pv.version_string
-            FROM product_versions pv
-                LEFT JOIN product_version_builds pvb ON
-                    (pv.product_version_id = pvb.product_version_id)
-            WHERE pv.product_name = %(product)s
-            AND pv.release_version = %(version)s
-            AND pv.build_type ILIKE %(release_channel)s
-            AND pvb.build_id = %(build_id)s
-        """
-        params = {
-            'product': product,
-            'version': version,
-            'release_channel': release_channel,
-            'build_id': build_id,
-        }
-        results = self.transaction(
-            execute_query_fetchall,
-            sql,
-            params
+        return self.version_lookup.get_version_string(
+            product,
+            version,
+            release_channel,
+            build_id
         )
-        for real_version, in results:
-            self._versions_data_cache[key] = real_version
-
-        return self._versions_data_cache.get(key)
 
     #--------------------------------------------------------------------------
     def _predicate(self, raw_crash, raw_dumps, processed_crash, proc_meta):
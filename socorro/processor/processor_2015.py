@@ -268,6 +268,13 @@ class Processor2015(RequiredConfig):
         )
         return processed_crash
 
+    #--------------------------------------------------------------------------
+    def close(self):
+        """when the processor shuts down, the rules get a chance to clean up
+        and save anything they have accumulated"""
+        for a_rule_set in self.rule_system.itervalues():
+            a_rule_set.close()
+
     #--------------------------------------------------------------------------
     def reject_raw_crash(self, crash_id, reason):
         self._log_job_start(crash_id)
@@ -220,6 +220,10 @@ class ProcessorApp(FetchTransformSaveApp):
     #--------------------------------------------------------------------------
     def _cleanup(self):
         """when  the processor shutsdown, this function cleans up"""
+        # not all processor classes have anything to clean up
+        close_processor = getattr(self.processor, 'close', None)
+        if close_processor is not None:
+            close_processor()
         if self.companion_process:
             self.companion_process.close()
         self.iterator.close()
@@ -0,0 +1,273 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""an in-memory index of the product/version/build tables shared by the
+processor rules that need them.  The rules used to query Postgres for every
+crash that missed their private caches.  Instead, the index is loaded once,
+refreshed incrementally on an interval and consulted without touching the
+database on the per crash path."""
+
+import threading
+import time
+
+from socorro.external.postgresql.dbapi2_util import execute_query_fetchall
+
+
+#==============================================================================
+class ProductVersionLookup(object):
+    """a lookup service over 'product_versions', 'product_version_builds' and
+    'product_productid_map'.  Instances are normally obtained through
+    'get_product_version_lookup' so that every rule talking to the same
+    database shares one index."""
+
+    versions_sql = """
+        SELECT
+            pv.product_name,
+            pv.release_version,
+            pv.build_type,
+            pvb.build_id,
+            pv.version_string
+        FROM product_versions pv
+            JOIN product_version_builds pvb ON
+                (pv.product_version_id = pvb.product_version_id)
+        WHERE pvb.build_id >= %(since_build_id)s
+    """
+
+    # the incremental refresh cannot see builds registered late with a lower
+    # build_id than the newest one loaded, a miss looks for its build alone
+    version_sql = """
+        SELECT
+            pv.version_string
+        FROM product_versions pv
+            JOIN product_version_builds pvb ON
+                (pv.product_version_id = pvb.product_version_id)
+        WHERE pv.product_name = %(product)s
+        AND pv.release_version = %(version)s
+        AND pv.build_type ILIKE %(build_type)s
+        AND pvb.build_id = %(build_id)s
+    """
+
+    product_id_map_sql = (
+        "SELECT product_name, productid, rewrite FROM "
+        "product_productid_map WHERE rewrite IS TRUE"
+    )
+
+    #--------------------------------------------------------------------------
+    def __init__(self, config, refresh_interval=600, negative_cache_ttl=60):
+        """parameters:
+            config - a configuration with 'database_class',
+                     'transaction_executor_class' and 'logger'
+            refresh_interval - seconds between incremental reloads of the
+                               versions index
+            negative_cache_ttl - seconds that a miss is remembered before it
+                                 is looked up in the database again"""
+        self.config = config
+        self.refresh_interval = refresh_interval
+        self.negative_cache_ttl = negative_cache_ttl
+        database = config.database_class(config)
+        self.transaction = config.transaction_executor_class(
+            config,
+            database,
+        )
+        # guards the index and the counters, never held during a query
+        self._lock = threading.Lock()
+        # (product, version, build_type, build_id) -> version_string
+        self._versions = {}
+        self._max_build_id = 0
+        self._last_refresh = None
+        self._refreshing = False
+        self._negative_cache = {}
+        self._product_id_map = None
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.refreshes = 0
+
+    #--------------------------------------------------------------------------
+    @staticmethod
+    def _key(product, version, build_type, build_id):
+        # product_versions uses case insensitive columns, the index must
+        # behave the same way
+        return (
+            product.lower(),
+            version.lower(),
+            build_type.lower(),
+            int(build_id)
+        )
+
+    #--------------------------------------------------------------------------
+    def _load_versions(self, since_build_id):
+        """query the database for the builds since 'since_build_id' and merge
+        them into the index.  The lock is taken only for the merge."""
+        try:
+            results = self.transaction(
+                execute_query_fetchall,
+                self.versions_sql,
+                {'since_build_id': since_build_id}
+            )
+            with self._lock:
+                for (
+                    product, version, build_type, build_id, version_string
+                ) in results:
+                    key = self._key(product, version, build_type, build_id)
+                    self._versions[key] = version_string
+                    self._max_build_id = max(self._max_build_id, key[3])
+                self._last_refresh = time.time()
+                self.refreshes += 1
+                number_of_entries = len(self._versions)
+        finally:
+            with self._lock:
+                self._refreshing = False
+        self.config.logger.debug(
+            'product version index refreshed: %d entries, %s',
+            number_of_entries,
+            self.stats()
+        )
+
+    #--------------------------------------------------------------------------
+    def _load_version(self, product, version, build_type, build_id):
+        results = self.transaction(
+            execute_query_fetchall,
+            self.version_sql,
+            {
+                'product': product,
+                'version': version,
+                'build_type': build_type,
+                'build_id': build_id,
+            }
+        )
+        for version_string, in results:
+            return version_string
+        return None
+
+    #--------------------------------------------------------------------------
+    def _claim_refresh(self):
+        """return the build_id to refresh the index from if a refresh is due
+        and no other thread is already doing it, None otherwise.  Must be
+        called with the lock held."""
+        if self._refreshing:
+            return None
+        if (
+            self._last_refresh is not None and
+            time.time() - self._last_refresh < self.refresh_interval
+        ):
+            return None
+        self._refreshing = True
+        return self._max_build_id
+
+    #--------------------------------------------------------------------------
+    def get_version_string(self, product, version, build_type, build_id):
+        """return the real version string for a product, version, build type
+        and build id or None if that combination is not known.  While one
+        thread refreshes the index, the others carry on with the index as it
+        was."""
+        if build_id is None:
+            return None
+        key = self._key(product, version, build_type, build_id)
+        with self._lock:
+            since_build_id = self._claim_refresh()
+        if since_build_id is not None:
+            self._load_versions(since_build_id)
+        with self._lock:
+            try:
+                version_string = self._versions[key]
+                self.hits += 1
+                return version_string
+            except KeyError:
+                pass
+            expires = self._negative_cache.get(key)
+            if expires is not None and expires > time.time():
+                self.negative_hits += 1
+                return None
+            self.misses += 1
+        # the build may have been added since the last refresh (the cron jobs
+        # feeding these tables can run late or backfill)
+        version_string = self._load_version(
+            product,
+            version,
+            build_type,
+            build_id
+        )
+        with self._lock:
+            if version_string is not None:
+                self._versions[key] = version_string
+                return version_string
+            now = time.time()
+            self._negative_cache[key] = now + self.negative_cache_ttl
+            if len(self._negative_cache) > 10000:
+                self._negative_cache = dict(
+                    (k, v) for k, v in self._negative_cache.iteritems()
+                    if v > now
+                )
+            return None
+
+    #--------------------------------------------------------------------------
+    def get_product_id_map(self):
+        """return a mapping of productid to a dict with the 'product_name'
+        and the 'rewrite' flag.  The table is tiny and changes only with
+        schema migrations, so it is loaded once."""
+        with self._lock:
+            if self._product_id_map is not None:
+                return self._product_id_map
+        product_mappings = self.transaction(
+            execute_query_fetchall,
+            self.product_id_map_sql
+        )
+        product_id_map = {}
+        for product_name, productid, rewrite in product_mappings:
+            product_id_map[productid] = {
+                'product_name': product_name,
+                'rewrite': rewrite
+            }
+        with self._lock:
+            if self._product_id_map is None:
+                self._product_id_map = product_id_map
+            return self._product_id_map
+
+    #--------------------------------------------------------------------------
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'negative_hits': self.negative_hits,
+            'refreshes': self.refreshes,
+        }
+
+
+#------------------------------------------------------------------------------
+# the connection parameters that ConnectionContext builds its dsn from
+_dsn_parameters = (
+    'database_hostname',
+    'database_name',
+    'database_port',
+    'database_username',
+    'database_password',
+)
+_shared_lookups = {}
+_shared_lookups_lock = threading.Lock()
+
+
+#------------------------------------------------------------------------------
+def get_product_version_lookup(config, refresh_interval=600,
+                               negative_cache_ttl=60):
+    """return the ProductVersionLookup shared by every caller using the same
+    database, as given by the classes and the connection parameters,
+    creating it on first use.  The timing parameters of the first caller
+    win."""
+    key = (
+        config.database_class,
+        config.transaction_executor_class,
+        tuple(config.get(name) for name in _dsn_parameters)
+    )
+    with _shared_lookups_lock:
+        try:
+            return _shared_lookups[key]
+        except KeyError:
+            lookup = ProductVersionLookup(
+                config,
+                refresh_interval=refresh_interval,
+                negative_cache_ttl=negative_cache_ttl,
+            )
+            _shared_lookups[key] = lookup
+            return lookup
@@ -310,18 +310,45 @@ class SkunkClassificationRule(Rule):
                                    crash storage.
         """
         for a_frame in stack:
-            try:
-                normalized_frame = a_frame['normalized']
-            except KeyError:
-                normalized_frame = a_signature_tool.normalize_signature(
-                    **a_frame
-                )
-                if cache_normalizations:
-                    a_frame['normalized'] = normalized_frame
+            normalized_frame = SkunkClassificationRule._normalized_signature(
+                a_frame,
+                a_signature_tool,
+                cache_normalizations
+            )
             if normalized_frame.startswith(signature):
                 return True
         return False
 
+    #--------------------------------------------------------------------------
+    @staticmethod
+    def _normalized_signature(
+        a_frame,
+        a_signature_tool,
+        cache_normalizations=True
+    ):
+        """return the normalized signature of a single stack frame.  The
+        normalization is done only once per frame: its result is saved in the
+        frame itself under the key 'normalized' where every subsequent rule
+        will find it.
+
+        parameters:
+            a_frame - a frame mapping from a json_dump stack
+            a_signature_tool - a reference to an object having a
+                               'normalize_signature' method.
+            cache_normalizations - if True, save the normalized form within
+                                   the frame.  This cache will persist and
+                                   get saved to processed crash storage.
+        """
+        try:
+            return a_frame['normalized']
+        except KeyError:
+            normalized_frame = a_signature_tool.normalize_signature(
+                **a_frame
+            )
+            if cache_normalizations:
+                a_frame['normalized'] = normalized_frame
+            return normalized_frame
+
 
 #==============================================================================
 class DontConsiderTheseFilter(SkunkClassificationRule):
@@ -512,8 +539,10 @@ class UpdateWindowAttributes(SkunkClassificationRule):
 
             current_target_signature = target_signatures.pop(0)
             for i, a_frame in enumerate(stack):
-                normalized_signature = \
-                    processor.c_signature_tool.normalize_signature(**a_frame)
+                normalized_signature = self._normalized_signature(
+                    a_frame,
+                    processor.c_signature_tool
+                )
                 if (current_target_signature in normalized_signature):
                     current_target_signature = target_signatures.pop(0)
                     if not target_signatures:
@@ -522,8 +551,10 @@ class UpdateWindowAttributes(SkunkClassificationRule):
                 return False
 
             try:
-                classification_data = \
-                    processor.c_signature_tool.normalize_signature(**stack[i + 1])
+                classification_data = self._normalized_signature(
+                    stack[i + 1],
+                    processor.c_signature_tool
+                )
             except IndexError:
                 classification_data = None
 
@@ -601,7 +632,7 @@ class SetWindowPos(SkunkClassificationRule):
         stack = self._get_stack(processed_crash, dump_name)
         if stack is False:
             return False
-        truncated_stack = self._get_stack(processed_crash, dump_name)[:5]
+        truncated_stack = stack[:5]
         stack_contains_sentinel = self._stack_contains(
             truncated_stack,
             'NtUserSetWindowPos',
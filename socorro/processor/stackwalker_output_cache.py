@@ -0,0 +1,192 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""a content addressed disk cache for the output of the minidump stackwalker.
+Reprocessing, resubmitted crashes and synthetic test crashes hand the same
+minidump to the stackwalker over and over again.  Keyed by a digest of the
+dump and everything else that determines the stackwalker's output, a previous
+result can be reused without running the external process."""
+
+import errno
+import fcntl
+import hashlib
+import os
+import threading
+import time
+import ujson
+
+
+#------------------------------------------------------------------------------
+def file_digest(pathname, block_size=1024 * 1024):
+    """return the hex sha256 digest of the contents of a file"""
+    digest = hashlib.sha256()
+    with open(pathname, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+
+#==============================================================================
+class StackwalkerOutputCache(object):
+    """a bounded directory of stackwalker outputs stored as json, one file per
+    key.  Any number of threads and processes on a host may share the same
+    directory: entries are written to a temporary file and renamed into place,
+    so a reader sees either a whole entry or none at all.
+
+    Reading an entry touches its modification time, so the modification times
+    order the entries from least to most recently used.  After about a
+    twentieth of 'max_size' bytes has been written, the directory is scanned
+    and the least recently used entries are removed until the cache is back
+    under nine tenths of 'max_size'.  A lock file keeps the processes sharing
+    the cache from scanning it at the same time."""
+
+    # temporary files older than this were left behind by a dead process
+    stale_temporary_age = 3600
+
+    #--------------------------------------------------------------------------
+    def __init__(self, path, max_size, logger):
+        self.path = path
+        self.max_size = max_size
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._written_since_eviction = 0
+        self._eviction_interval = max(max_size // 20, 1)
+        self._makedirs(path)
+
+    #--------------------------------------------------------------------------
+    @staticmethod
+    def _makedirs(path):
+        try:
+            os.makedirs(path)
+        except OSError, x:
+            if x.errno != errno.EEXIST:
+                raise
+
+    #--------------------------------------------------------------------------
+    def _pathname(self, key):
+        return os.path.join(self.path, key[:2], '%s.json' % key)
+
+    #--------------------------------------------------------------------------
+    def get(self, key):
+        """return the output stored under 'key' or None if there is none"""
+        pathname = self._pathname(key)
+        try:
+            with open(pathname) as f:
+                output = ujson.load(f)
+        except IOError, x:
+            if x.errno != errno.ENOENT:
+                self.logger.warning(
+                    'stackwalker output cache: cannot read %s: %s',
+                    pathname,
+                    x
+                )
+            return None
+        except ValueError:
+            self.logger.warning(
+                'stackwalker output cache: %s is corrupt',
+                pathname
+            )
+            return None
+        try:
+            os.utime(pathname, None)
+        except OSError:
+            # evicted by another process since it was read
+            pass
+        return output
+
+    #--------------------------------------------------------------------------
+    def put(self, key, output):
+        """store 'output', which must be serializable as json, under 'key'"""
+        pathname = self._pathname(key)
+        self._makedirs(os.path.dirname(pathname))
+        data = ujson.dumps(output)
+        temporary_pathname = '%s.%d.%s.tmp' % (
+            pathname,
+            os.getpid(),
+            threading.current_thread().ident
+        )
+        try:
+            with open(temporary_pathname, 'w') as f:
+                f.write(data)
+            os.rename(temporary_pathname, pathname)
+        except (IOError, OSError), x:
+            self.logger.warning(
+                'stackwalker output cache: cannot write %s: %s',
+                pathname,
+                x
+            )
+            try:
+                os.unlink(temporary_pathname)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            self._written_since_eviction += len(data)
+            eviction_is_due = (
+                self._written_since_eviction >= self._eviction_interval
+            )
+            if eviction_is_due:
+                self._written_since_eviction = 0
+        if eviction_is_due:
+            self.evict()
+
+    #--------------------------------------------------------------------------
+    def _scan(self):
+        """return the size of the cache and a list of (mtime, size, pathname)
+        for each of its entries.  Abandoned temporary files are removed."""
+        entries = []
+        total_size = 0
+        stale = time.time() - self.stale_temporary_age
+        for directory, subdirectories, filenames in os.walk(self.path):
+            for filename in filenames:
+                pathname = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(pathname)
+                    if filename.endswith('.tmp'):
+                        if stat.st_mtime < stale:
+                            os.unlink(pathname)
+                        continue
+                except OSError:
+                    # renamed or removed by another process
+                    continue
+                if not filename.endswith('.json'):
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, pathname))
+                total_size += stat.st_size
+        return total_size, entries
+
+    #--------------------------------------------------------------------------
+    def evict(self):
+        """remove the least recently used entries until the cache is under
+        nine tenths of its maximum size"""
+        with open(os.path.join(self.path, '.lock'), 'w') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except IOError:
+                # another process is already evicting
+                return
+            total_size, entries = self._scan()
+            if total_size <= self.max_size:
+                return
+            target_size = self.max_size * 9 // 10
+            entries.sort()
+            removed = 0
+            for mtime, size, pathname in entries:
+                if total_size <= target_size:
+                    break
+                try:
+                    os.unlink(pathname)
+                except OSError:
+                    pass
+                total_size -= size
+                removed += 1
+            self.logger.info(
+                'stackwalker output cache: evicted %d entries, '
+                '%d bytes remain',
+                removed,
+                total_size
+            )
@@ -15,6 +15,7 @@ from socorro.app.socorro_app import (
     SocorroWelcomeApp,
     main,
     klass_to_pypath,
+    setup_sampling_profiler,
 )
 from socorro.app.for_application_defaults import ApplicationDefaultsProxy
 
@@ -269,3 +270,30 @@ def test_klass_to_pypath_a_faked_out_main():
                 klass_to_pypath(ProcessorApp),
                 'socorro.processor.processor_app.ProcessorApp'
             )
+
+
+#--------------------------------------------------------------------------
+def test_setup_sampling_profiler():
+    eq_(setup_sampling_profiler(DotDict(), 'an_app'), None)
+
+    config = DotDict()
+    config.logger = mock.Mock()
+    config.profiler = DotDict()
+    config.profiler.toggle_signal = 'SIGUSR2'
+    config.profiler.sampling_interval = 0.5
+    config.profiler.output_pathname = '/tmp/{app_name}.{pid}.collapsed'
+    config.profiler.start_enabled = False
+
+    with mock.patch('socorro.app.socorro_app.signal') as mocked_signal:
+        profiler = setup_sampling_profiler(config, 'an_app')
+
+        eq_(profiler.interval, 0.5)
+        eq_(profiler.pathname_template, '/tmp/an_app.{pid}.collapsed')
+        ok_(not profiler.running)
+        eq_(mocked_signal.signal.call_count, 1)
+        signal_number, handler = mocked_signal.signal.call_args[0]
+        ok_(signal_number is mocked_signal.SIGUSR2)
+
+    with mock.patch.object(profiler, 'toggle') as mocked_toggle:
+        handler(signal_number, None)
+        mocked_toggle.assert_called_once_with()
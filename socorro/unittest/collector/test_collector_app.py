@@ -6,6 +6,7 @@ import mock
 from nose.tools import eq_, ok_
 
 from socorro.collector.collector_app import CollectorApp, Collector2015App
+from socorro.collector.duplicates import DuplicateIndex
 from socorro.collector.wsgi_breakpad_collector import BreakpadCollector2015
 from socorro.unittest.testbase import TestCase
 from configman.dotdict import DotDict
@@ -23,6 +24,7 @@ class TestCollectorApp(TestCase):
         config.collector.dump_id_prefix = 'bp-'
         config.collector.dump_field = 'dump'
         config.collector.accept_submitted_crash_id = False
+        config.collector.duplicate_window = 0
 
         config.throttler = DotDict()
         self.mocked_throttler = mock.MagicMock()
@@ -55,6 +57,19 @@ class TestCollectorApp(TestCase):
             config,
             (BreakpadCollector2015, )
         )
+        eq_(config.duplicate_index, None)
+
+    def test_main_with_duplicate_detection(self):
+        config = self.get_standard_config()
+        config.collector.duplicate_window = 3600
+        config.collector.duplicate_max_entries = 100
+        config.collector.duplicate_digest_bytes = 8
+        c = CollectorApp(config)
+        c.main()
+
+        ok_(isinstance(config.duplicate_index, DuplicateIndex))
+        eq_(config.duplicate_index.window, 3600)
+        eq_(config.duplicate_index.max_entries, 100)
 
 
 class TestCollector2015App(TestCase):
@@ -76,6 +91,9 @@ class TestCollector2015App(TestCase):
             pass
         config.services.service2 = DotDict()
         config.services.service2.service_implementation_class = Service2
+        config.services.service2.duplicate_window = 3600
+        config.services.service2.duplicate_max_entries = 100
+        config.services.service2.duplicate_digest_bytes = 8
 
         config.services.services_controller.service_list = [
             ('service1', '/submit', Service1),
@@ -109,3 +127,10 @@ class TestCollector2015App(TestCase):
         service2_uri, service2_impl = args[1][1]
         eq_(service2_uri, '/unsubmit')
         ok_(hasattr(service2_impl, 'wrapped_partial'))
+
+        # only the services offering duplicate detection get an index
+        ok_('duplicate_index' not in config.services.service1)
+        ok_(isinstance(
+            config.services.service2.duplicate_index,
+            DuplicateIndex
+        ))
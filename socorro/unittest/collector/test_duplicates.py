@@ -0,0 +1,50 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import mock
+from nose.tools import eq_, ok_
+
+from socorro.collector.duplicates import DuplicateIndex
+from socorro.unittest.testbase import TestCase
+
+
+class TestDuplicateIndex(TestCase):
+
+    def test_original_crash_id(self):
+        index = DuplicateIndex(3600, 100, 4, mock.Mock())
+        eq_(index.original_crash_id('abcdefgh'), None)
+        index.add('abcdefgh', 'crash1')
+        eq_(index.original_crash_id('abcdefgh'), 'crash1')
+        # only the first digest_bytes count
+        eq_(index.original_crash_id('abcdXXXX'), 'crash1')
+        eq_(index.original_crash_id('Xbcdefgh'), None)
+        eq_((index.submissions, index.duplicates), (4, 2))
+
+    @mock.patch('socorro.collector.duplicates.time')
+    def test_window(self, mocked_time):
+        mocked_time.time.return_value = 1000.0
+        logger = mock.Mock()
+        index = DuplicateIndex(60, 100, 8, logger)
+        index.add('one', 'crash1')
+
+        mocked_time.time.return_value = 1061.0
+        index.add('two', 'crash2')
+        # a window later the crash is still remembered
+        eq_(index.original_crash_id('one'), 'crash1')
+        eq_(logger.info.call_count, 1)
+
+        mocked_time.time.return_value = 1122.0
+        eq_(index.original_crash_id('one'), None)
+        eq_(index.original_crash_id('two'), 'crash2')
+        eq_(logger.info.call_count, 2)
+        # one duplicate in one submission, two crashes remembered until now
+        eq_(logger.info.call_args[0][1:], (1, 1, 2))
+
+    def test_max_entries(self):
+        index = DuplicateIndex(3600, 4, 8, mock.Mock())
+        for i in range(10):
+            index.add('digest%d' % i, 'crash%d' % i)
+            ok_(len(index._current) + len(index._previous) <= 4)
+        eq_(index.original_crash_id('digest9'), 'crash9')
+        eq_(index.original_crash_id('digest0'), None)
@@ -18,6 +18,7 @@ from socorro.collector.wsgi_breakpad_collector import (
     BreakpadCollector2015
 )
 from socorro.collector.throttler import ACCEPT, IGNORE, DEFER
+from socorro.collector.duplicates import DuplicateIndex
 from socorro.unittest.testbase import TestCase
 
 
@@ -42,8 +43,10 @@ class TestWSGIBreakpadCollector(TestCase):
         config.collector.accept_submitted_crash_id = False
         config.collector.accept_submitted_legacy_processing = False
         config.collector.checksum_method = hashlib.md5
+        config.collector.duplicate_window = 0
 
         config.crash_storage = mock.MagicMock()
+        config.duplicate_index = None
 
         return config
 
@@ -521,6 +524,8 @@ class TestWSGIBreakpadCollector2015(TestCase):
         config.accept_submitted_crash_id = False
         config.accept_submitted_legacy_processing = False
         config.checksum_method = hashlib.md5
+        config.duplicate_window = 0
+        config.duplicate_index = None
 
         config.storage = DotDict()
         config.storage.crashstorage_class = mock.MagicMock()
@@ -991,3 +996,40 @@ aux_dump contents
         eq_(c._no_x00_character('\x00hello'), 'hello')
         eq_(c._no_x00_character(u'\u0000bye'), 'bye')
         eq_(c._no_x00_character(u'\u0000\x00bye'), 'bye')
+
+    @mock.patch('socorro.collector.wsgi_breakpad_collector.utc_now')
+    @mock.patch('socorro.collector.wsgi_generic_collector.web.webapi')
+    @mock.patch('socorro.collector.wsgi_generic_collector.web')
+    def test_POST_duplicate(self, mocked_web, mocked_webapi, mocked_utc_now):
+        config = self.get_standard_config()
+        config.duplicate_index = DuplicateIndex(3600, 100, 8, config.logger)
+        config.duplicate_key_fields = 'ProductName, Version, CrashTime'
+        rawform = DotDict()
+        rawform.ProductName = 'FireSquid'
+        rawform.Version = '99'
+        rawform.CrashTime = '1336144200'
+        rawform.dump = DotDict({'value': 'fake dump', 'file': 'faked file'})
+        mocked_webapi.rawinput.return_value = rawform
+        mocked_utc_now.return_value = datetime(2012, 5, 4, 15, 10)
+
+        c = BreakpadCollector2015(config)
+        c.throttler.throttle.return_value = (ACCEPT, 100)
+        first = c.POST()
+        ok_(first.startswith('CrashID=bp-'))
+
+        # the client retries, web.py makes a new collector for the request
+        c = BreakpadCollector2015(config)
+        eq_(c.POST(), first)
+        eq_(c.crash_storage.save_raw_crash.call_count, 1)
+        eq_(c.throttler.throttle.call_count, 1)
+        eq_(c.duplicate_index.duplicates, 1)
+
+        # the same crash with a different dump is not a duplicate
+        rawform.dump = DotDict({'value': 'other dump', 'file': 'faked file'})
+        second = c.POST()
+        ok_(second != first)
+        eq_(c.crash_storage.save_raw_crash.call_count, 2)
+        # nor is a crash from another time
+        rawform.dump = DotDict({'value': 'fake dump', 'file': 'faked file'})
+        rawform.CrashTime = '1336144201'
+        ok_(c.POST() not in (first, second))
@@ -5,18 +5,226 @@
 
 import datetime
 import contextlib
+import threading
 
 import mock
 from nose.plugins.attrib import attr
 from nose.tools import eq_, ok_
 
 from crontabber.app import CronTabber
+from socorro.cron.jobs.fetch_adi_from_hive import (
+    CopyStream,
+    FetchADIFromHiveCronApp,
+)
+from socorro.lib.util import DotDict
+from socorro.unittest.testbase import TestCase
 from socorro.unittest.cron.jobs.base import IntegrationTestBase
 from socorro.unittest.cron.setup_configman import (
     get_config_manager_for_crontabber,
 )
 
 
+_HIVE_ROWS = [
+    [
+        datetime.date(2015, 6, 1),
+        'WinterWolf',
+        'Ginko',
+        '2.3.1',
+        '10.0.4',
+        'nightly-ww3v20',
+        'nightly',
+        'a-guid',
+        1
+    ],
+    [
+        '2015-06-01',
+        'Missing',
+        'Ginko',
+        '2.3.2',
+        '',
+        None,
+        'release',
+        '%7Ba-guid%7D',
+        2
+    ],
+    [
+        '2015-06-01',
+        'NothingMuch',
+        u'Ginko\u2622\0',
+        '2.3.2',
+        '10.0.5a',
+        'release',
+        'release-cck-\\',
+        '%7Ba-guid%7D',
+        2
+    ],
+]
+
+_COPY_LINES = (
+    '2015-06-01\tWinterWolf\tGinko\t2.3.1\t10.0.4\tnightly-ww3v20\t'
+    'nightly\ta-guid\t1\n'
+    '2015-06-01\tNothingMuch\tGinko\xe2\x98\xa2\t2.3.2\t10.0.5a\trelease\t'
+    'release-cck-\\\\\t{a-guid}\t2\n'
+)
+
+
+class TestFetchADIFromHiveStreaming(TestCase):
+
+    def test_clean_rows(self):
+        eq_(
+            ''.join(FetchADIFromHiveCronApp.clean_rows(_HIVE_ROWS)),
+            _COPY_LINES
+        )
+
+    def test_copy_stream(self):
+        stream = CopyStream(2)
+        lines = ['line %d\n' % i for i in range(100)]
+
+        def produce():
+            for line in lines:
+                stream.put(line)
+            stream.finish()
+
+        producer = threading.Thread(target=produce)
+        producer.start()
+        chunks = []
+        while True:
+            chunk = stream.read(13)
+            if not chunk:
+                break
+            ok_(len(chunk) <= 13)
+            chunks.append(chunk)
+        producer.join()
+        eq_(''.join(chunks), ''.join(lines))
+
+    def test_copy_stream_abandoned(self):
+        stream = CopyStream(1)
+        stream.put('one\n')
+        stream.abandoned = True
+        # does not block even though the queue is full
+        stream.put('two\n')
+        stream.finish()
+
+    def _get_app(self, transaction_executor_class):
+        config = DotDict()
+        config.logger = mock.Mock()
+        config.query = '%s'
+        config.hive_host = 'localhost'
+        config.hive_port = 10000
+        config.hive_user = 'socorro'
+        config.hive_password = 'ignored'
+        config.hive_database = 'default'
+        config.hive_auth_mechanism = 'PLAIN'
+        config.timeout = 1
+        config.stream_buffer_size = 1
+        config.progress_interval = 1
+        for name in ('primary_destination', 'secondary_destination'):
+            config[name] = DotDict()
+            config[name].database_class = mock.Mock(
+                side_effect=lambda config: mock.Mock(config=config)
+            )
+            config[name].transaction_executor_class = (
+                transaction_executor_class
+            )
+            # so that the secondary destination is not the primary one
+            config[name].name = name
+        return FetchADIFromHiveCronApp(config, {})
+
+    def _get_connection(self, copied, fail_after=None):
+        connection = mock.MagicMock()
+
+        def copy_from(source, *args, **kwargs):
+            data = []
+            while True:
+                chunk = source.read(7)
+                if not chunk:
+                    break
+                data.append(chunk)
+                if fail_after and len(data) == fail_after:
+                    raise IOError('connection lost')
+            copied.append(''.join(data))
+
+        connection.cursor.return_value.copy_from.side_effect = copy_from
+        return connection
+
+    @mock.patch('socorro.cron.jobs.fetch_adi_from_hive.pyhs2')
+    def test_run_streams_to_every_destination(self, fake_hive):
+        fake_hive.connect.return_value.cursor.return_value.__iter__ = (
+            lambda fake: iter(_HIVE_ROWS)
+        )
+        copied = []
+
+        def transaction_executor_class(config, database):
+            def transaction(function, *args):
+                function(self._get_connection(copied), *args)
+            return transaction
+
+        app = self._get_app(transaction_executor_class)
+        app.run(datetime.datetime(2015, 6, 2))
+
+        eq_(copied, [_COPY_LINES, _COPY_LINES])
+        fake_hive.connect.return_value.cursor.return_value \
+            .execute.assert_called_once_with('2015-06-01')
+
+    @mock.patch('socorro.cron.jobs.fetch_adi_from_hive.pyhs2')
+    def test_run_resumes_from_spool_on_retry(self, fake_hive):
+        fake_hive.connect.return_value.cursor.return_value.__iter__ = (
+            lambda fake: iter(_HIVE_ROWS)
+        )
+        copied = []
+
+        def transaction_executor_class(config, database):
+            def transaction(function, *args):
+                # like the backoff executors: retry after a failure
+                try:
+                    function(
+                        self._get_connection(copied, fail_after=2),
+                        *args
+                    )
+                except IOError:
+                    function(self._get_connection(copied), *args)
+            return transaction
+
+        app = self._get_app(transaction_executor_class)
+        app.run(datetime.datetime(2015, 6, 2))
+
+        # the retries read the spool file, the data was fetched once
+        eq_(len(copied), 2)
+        for data in copied:
+            eq_(data.encode('utf-8'), _COPY_LINES)
+        eq_(fake_hive.connect.call_count, 1)
+
+    @mock.patch('socorro.cron.jobs.fetch_adi_from_hive.pyhs2')
+    def test_run_resumes_from_spool_when_commit_fails(self, fake_hive):
+        fake_hive.connect.return_value.cursor.return_value.__iter__ = (
+            lambda fake: iter(_HIVE_ROWS)
+        )
+        copied = []
+
+        def transaction_executor_class(config, database):
+            def transaction(function, *args):
+                # the stream is drained but the commit fails, the retry
+                # must not read the empty stream
+                connection = self._get_connection(copied)
+                connection.commit.side_effect = IOError('connection lost')
+                try:
+                    function(connection, *args)
+                    connection.commit()
+                except IOError:
+                    function(self._get_connection(copied), *args)
+            return transaction
+
+        app = self._get_app(transaction_executor_class)
+        app.run(datetime.datetime(2015, 6, 2))
+
+        # the first attempts read the streams, the retries the spool file
+        eq_(
+            [x if isinstance(x, str) else x.encode('utf-8') for x in copied],
+            [_COPY_LINES] * 4
+        )
+        eq_(fake_hive.connect.call_count, 1)
+
+
 @attr(integration='postgres')
 class TestFetchADIFromHive(IntegrationTestBase):
 
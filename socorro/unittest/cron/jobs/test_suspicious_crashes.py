@@ -5,11 +5,18 @@
 import datetime
 import random
 
+import mock
 from nose.plugins.attrib import attr
-from nose.tools import eq_
+from nose.tools import eq_, ok_
 
 from crontabber.app import CronTabber
+from socorro.cron.jobs.suspicious_crashes import (
+    SlopeBased,
+    SuspiciousCrashesApp,
+)
 from socorro.lib.datetimeutil import utc_now
+from socorro.lib.util import DotDict
+from socorro.unittest.testbase import TestCase
 from socorro.unittest.cron.jobs.base import IntegrationTestBase
 
 from socorro.unittest.cron.setup_configman import (
@@ -28,6 +35,65 @@ VALUES
 """
 
 
+class TestSlopeBased(TestCase):
+
+    def test_find_explosive_matches_model(self):
+        rand = random.Random(42)
+        series = []
+        for i in xrange(2000):
+            data = [
+                max(0.00001, rand.choice([0, rand.randint(1, 2000)]))
+                for day in range(10)
+            ]
+            series.append((i, data, rand.randint(1, 4000)))
+
+        expected = [
+            key for key, data, observed in series
+            if SlopeBased(data).is_explosive(observed)
+        ]
+        ok_(expected)
+        eq_(SlopeBased.find_explosive(series), expected)
+
+
+class TestSuspiciousCrashesApp(TestCase):
+
+    def test_run(self):
+        config = DotDict()
+        config.logger = mock.Mock()
+        config.training_data_length = 10
+        config.model = 'SlopeBased'
+        config.min_count = 5
+        config.database = DotDict()
+        config.database.database_class = mock.Mock()
+        config.database.database_transaction_executor_class = mock.Mock()
+        app = SuspiciousCrashesApp(config, {})
+
+        date = datetime.datetime(2015, 6, 11, 12, 0)
+        today = datetime.date(2015, 6, 10)
+        rows = []
+        for days_ago in range(1, 11):
+            day = today - datetime.timedelta(days_ago)
+            rows.append((1, day, 10 + days_ago % 2))
+            rows.append((2, day, 10 + days_ago % 2))
+        rows.append((1, today, 30))
+        rows.append((2, today, 11))
+        # too few crashes today to be looked at
+        rows.append((3, today, 4))
+
+        connection = mock.Mock()
+        select_cursor = mock.MagicMock()
+        select_cursor.__iter__.return_value = iter(rows)
+        insert_cursor = mock.Mock()
+        connection.cursor.side_effect = [select_cursor, insert_cursor]
+
+        app.run(connection, date)
+
+        eq_(insert_cursor.execute.call_count, 1)
+        sql, parameters = insert_cursor.execute.call_args[0]
+        ok_('suspicious_crash_signatures' in sql)
+        eq_(parameters, [1, '2015-06-10'])
+
+
 @attr(integration='postgres')  # for nosetests
 class TestSuspiciousCrashAnalysisIntegration(IntegrationTestBase):
 
@@ -0,0 +1,116 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import threading
+import time
+
+import mock
+from nose.tools import eq_, ok_, assert_raises
+
+from crontabber.app import CronTabberBase
+
+from socorro.cron.crontabber_app import ParallelJobsMixin
+from socorro.lib.util import DotDict
+from socorro.unittest.testbase import TestCase
+
+
+def _job(app_name, depends_on=()):
+    return type(
+        app_name.replace('-', '_'),
+        (object,),
+        {'app_name': app_name, 'depends_on': depends_on}
+    )
+
+
+#==============================================================================
+class SerialTabber(object):
+
+    def run_all(self):
+        self.ran_serially = True
+
+
+#==============================================================================
+class FakeTabber(ParallelJobsMixin, SerialTabber):
+
+    _reorder_class_list = staticmethod(CronTabberBase._reorder_class_list)
+    job_state_database = None
+
+    def __init__(self, config):
+        self.config = config
+        self.lock = threading.Lock()
+        self.events = []
+        self.running = set()
+        self.max_running = 0
+
+    def _run_one(self, job_class, config):
+        with self.lock:
+            for dependency in job_class.depends_on:
+                if dependency != 'not-configured':
+                    ok_(('end', dependency) in self.events)
+            self.events.append(('start', job_class.app_name))
+            self.running.add(job_class.app_name)
+            self.max_running = max(self.max_running, len(self.running))
+        time.sleep(0.01)
+        if job_class.app_name == 'broken':
+            raise ValueError('broken')
+        with self.lock:
+            self.running.discard(job_class.app_name)
+            self.events.append(('end', job_class.app_name))
+
+
+#==============================================================================
+class TestParallelJobsMixin(TestCase):
+
+    def _get_config(self, jobs, parallel_jobs):
+        config = DotDict()
+        config.logger = mock.Mock()
+        config.parallel_jobs = parallel_jobs
+        config.crontabber = DotDict()
+        config.crontabber.jobs = DotDict()
+        config.crontabber.jobs.class_list = [
+            (job.__name__, job) for job in jobs
+        ]
+        for job in jobs:
+            config.crontabber['class-%s' % job.__name__] = DotDict()
+        return config
+
+    def test_serial_by_default(self):
+        tabber = FakeTabber(self._get_config([_job('a')], 1))
+        tabber.run_all()
+        ok_(tabber.ran_serially)
+        eq_(tabber.events, [])
+
+    def test_run_all_in_parallel(self):
+        jobs = [
+            _job('c', ('a', 'b')),
+            _job('a'),
+            _job('b'),
+            _job('d', ('c', 'not-configured')),
+            _job('e'),
+        ]
+        tabber = FakeTabber(self._get_config(jobs, 3))
+        tabber.run_all()
+
+        ok_(not hasattr(tabber, 'ran_serially'))
+        eq_(
+            sorted(x[1] for x in tabber.events if x[0] == 'end'),
+            ['a', 'b', 'c', 'd', 'e']
+        )
+        eq_(tabber.max_running, 3)
+        # the report names the critical path
+        report = tabber.config.logger.info.call_args_list[-1][0]
+        ok_(report[-1] in ('a -> c -> d', 'b -> c -> d'))
+
+    def test_run_all_stops_on_error(self):
+        jobs = [
+            _job('broken'),
+            _job('after-broken', ('broken',)),
+            _job('independent'),
+        ]
+        tabber = FakeTabber(self._get_config(jobs, 2))
+
+        assert_raises(ValueError, tabber.run_all)
+        started = [x[1] for x in tabber.events if x[0] == 'start']
+        ok_('after-broken' not in started)
+        ok_('independent' in started)
@@ -247,6 +247,7 @@ class TestTransactionExecutor(TestCase):
                 eq_(rollback_count, 5)
                 ok_(mock_logging.criticals)
                 eq_(len(mock_logging.criticals), 5)
+                eq_(executor.retry_count, 5)
                 ok_(len(_sleep_count) > 10)
             finally:
                 socorro.database.transaction_executor.time.sleep = _orig_sleep
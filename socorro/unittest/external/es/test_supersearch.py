@@ -1529,3 +1529,27 @@ class IntegrationTestSuperSearch(ElasticsearchTestCase):
             _results_number=0,
         )
         eq_(len(res['hits']), 0)
+
+    @minimum_es_version('1.0')
+    def test_get_with_zero_and_facets(self):
+        self.index_crash({
+            'signature': 'js::break_your_browser',
+            'product': 'WaterWolf',
+            'date_processed': self.now,
+        })
+        self.index_crash({
+            'signature': 'js::break_your_browser',
+            'product': 'NightTrain',
+            'date_processed': self.now,
+        })
+        self.refresh_index()
+
+        res = self.api.get(
+            _results_number=0,
+            _facets=['signature'],
+        )
+        eq_(len(res['hits']), 0)
+        eq_(res['total'], 2)
+        eq_(res['facets']['signature'], [
+            {'term': 'js::break_your_browser', 'count': 2},
+        ])
@@ -1,6 +1,6 @@
 import os
 import shutil
-from mock import Mock
+from mock import Mock, patch
 from configman import ConfigurationManager
 from nose.tools import eq_, ok_, assert_raises
 
@@ -252,3 +252,44 @@ class TestFSDatedRadixTreeStorage(TestCase):
         eq_(list(self.fsrts.new_crashes()), [])
         self.fsrts.remove(self.CRASH_ID_1)
         del self.fsrts._current_slot
+
+    def test_new_crashes_shared_by_two_visitors(self):
+        self.fsrts._current_slot = lambda: ['00', '00_00']
+        self._make_test_crash()
+        self.fsrts._current_slot = lambda: ['00', '00_01']
+        first = self.fsrts.new_crashes()
+        second = self.fsrts.new_crashes()
+        eq_(next(first), self.CRASH_ID_1)
+        eq_(next(second), self.CRASH_ID_1)
+        eq_(list(first), [])
+        # the links are gone already, that is not an error
+        eq_(list(second), [])
+        del self.fsrts._current_slot
+
+    def test_save_raw_crash_again_after_visit(self):
+        self.fsrts._current_slot = lambda: ['00', '00_00']
+        self._make_test_crash()
+        self.fsrts._current_slot = lambda: ['00', '00_01']
+        eq_(list(self.fsrts.new_crashes()), [self.CRASH_ID_1])
+        self._make_test_crash()
+        self.fsrts._current_slot = lambda: ['00', '00_02']
+        eq_(list(self.fsrts.new_crashes()), [self.CRASH_ID_1])
+        del self.fsrts._current_slot
+
+    def test_count_new_crashes(self):
+        eq_(self.fsrts.count_new_crashes(), 0)
+        self.fsrts._current_slot = lambda: ['00', '00_00']
+        self._make_test_crash()
+        eq_(self.fsrts.count_new_crashes(), 1)
+        self.fsrts._current_slot = lambda: ['00', '00_01']
+        eq_(list(self.fsrts.new_crashes()), [self.CRASH_ID_1])
+        eq_(self.fsrts.count_new_crashes(), 0)
+        del self.fsrts._current_slot
+
+    def test_save_raw_crash_with_fsync(self):
+        self.fsrts.config.fsync = True
+        with patch('socorro.external.fs.crashstorage.os.fsync') as fsync:
+            self._make_test_crash()
+        # three files, their directory, and the two directories linked
+        eq_(fsync.call_count, 6)
+        eq_(self.fsrts.get_raw_crash(self.CRASH_ID_1), {'test': 'TEST'})
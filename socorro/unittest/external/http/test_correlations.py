@@ -329,21 +329,81 @@ class TestCorrelations(TestCase):
             yesterday_str = yesterday.strftime('%Y%m%d')
             save_directory = os.path.join(tmp_directory, yesterday_str)
             assert os.path.isdir(save_directory)
-            filename, = os.listdir(save_directory)
-            assert filename.endswith('.txt')
-
-            content = open(os.path.join(save_directory, filename)).read()
-            content = content.replace('2551', '3662')
-            open(os.path.join(save_directory, filename), 'w').write(content)
-
-            result = model.get(**params)
+            filename, = [
+                x for x in os.listdir(save_directory)
+                if not x.endswith('.lock')
+            ]
+            assert filename.endswith('.index')
+
+            # the index is used, another signature is a lookup in it
+            result = model.get(**dict(
+                params,
+                signature='js::CompartmentChecker::fail(JSCompartment*, '
+                          'JSCompartment*)',
+                platform='Mac OS X',
+            ))
             assert len(calls) == 1
+            eq_(result['count'], 11)
+
+            # another process with an index of its own that is too old
+            # downloads a fresh one
+            correlations.Correlations._indexes.clear()
+            filepath = os.path.join(save_directory, filename)
+            old = os.stat(filepath).st_mtime - 2000
+            os.utime(filepath, (old, old))
+            rget.side_effect = lambda url, **kwargs: Response(
+                SAMPLE_CORE_COUNTS.replace('2551', '3662')
+            )
+            result = model.get(**params)
+            eq_(result['count'], 3662)
+            # and keeps using it
+            result = model.get(**params)
             eq_(result['count'], 3662)
 
         finally:
             shutil.rmtree(tmp_directory)
 
 
+class TestCorrelationsIndex(TestCase):
+
+    def test_build_index(self):
+        index = correlations.CorrelationsIndex(
+            correlations.build_index(SAMPLE_CORE_COUNTS)
+        )
+        reason, count, load = index.get(
+            'Linux',
+            'js::types::IdToTypeId(long)'
+        )
+        eq_(reason, 'SIGSEGV')
+        eq_(count, 11)
+        eq_(len(load), 8)
+        ok_(load[0].startswith('0% (0/11)'))
+        eq_(index.get('Linux', 'nope'), (None, None, []))
+        eq_(index.get('OS/2', 'nope'), (None, None, []))
+        eq_(
+            index.signatures(['Linux'])[0],
+            'js::types::IdToTypeId(long)'
+        )
+
+    def test_from_file(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            filepath = os.path.join(temp_dir, 'some.index')
+            with open(filepath, 'wb') as f:
+                f.write(correlations.build_index(SAMPLE_CORE_COUNTS))
+            index = correlations.CorrelationsIndex.from_file(filepath)
+            eq_(index.get('Linux', 'js::types::IdToTypeId(long)')[1], 11)
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_not_an_index(self):
+        assert_raises(
+            ValueError,
+            correlations.CorrelationsIndex,
+            'this is not an index at all'
+        )
+
+
 class TestCorrelationsSignatures(TestCase):
 
     @staticmethod
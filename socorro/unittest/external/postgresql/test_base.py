@@ -2,11 +2,19 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import mock
+import psycopg2
+import psycopg2.extensions
 from nose.plugins.attrib import attr
 from nose.tools import eq_, ok_, assert_raises
 
 from socorro.external import DatabaseError
-from socorro.external.postgresql.base import PostgreSQLBase
+from socorro.external.postgresql import base as base_module
+from socorro.external.postgresql.base import (
+    ConnectionPool,
+    PostgreSQLBase,
+    _numbered_placeholders,
+)
 from socorro.lib import search_common, util
 from socorro.external.postgresql.connection_context import ConnectionContext
 from socorro.unittest.testbase import TestCase
@@ -600,6 +608,142 @@ class TestPostgreSQLBase(TestCase):
         eq_(sql_params, sql_params_exp)
 
 
+#==============================================================================
+class TestConnectionPooling(TestCase):
+
+    #--------------------------------------------------------------------------
+    def setUp(self):
+        super(TestConnectionPooling, self).setUp()
+        self.connections = []
+
+    #--------------------------------------------------------------------------
+    def _connect(self):
+        connection = mock.MagicMock()
+        connection.closed = 0
+        connection.get_transaction_status.return_value = (
+            psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        )
+        self.connections.append(connection)
+        return connection
+
+    #--------------------------------------------------------------------------
+    def get_instance(self, pool_size):
+        database = mock.Mock()
+        database.dsn = 'host=%s' % id(self)
+        database.connection.side_effect = self._connect
+        config = util.DotDict({
+            'database_class': mock.Mock(return_value=database),
+            'connection_pool_size': pool_size,
+        })
+        self.addCleanup(base_module._pools.pop, database.dsn, None)
+        return PostgreSQLBase(config=config)
+
+    #--------------------------------------------------------------------------
+    def test_no_pool_by_default(self):
+        pgbase = self.get_instance(0)
+        ok_(pgbase.pool is None)
+        with mock.patch.object(base_module, 'execute_query_fetchall'):
+            pgbase.query('SELECT 1')
+            pgbase.query('SELECT 1')
+        eq_(len(self.connections), 2)
+        eq_(self.connections[0].close.call_count, 1)
+
+    #--------------------------------------------------------------------------
+    def test_connections_are_reused(self):
+        pgbase = self.get_instance(2)
+        # another service of the same process shares the pool
+        ok_(self.get_instance(2).pool is pgbase.pool)
+        with mock.patch.object(base_module, 'execute_query_fetchall'):
+            pgbase.query('SELECT 1')
+            with pgbase.get_connection() as connection:
+                pgbase.query('SELECT 1', connection=connection)
+        eq_(len(self.connections), 1)
+        eq_(self.connections[0].close.call_count, 0)
+
+    #--------------------------------------------------------------------------
+    def test_broken_connections_are_discarded(self):
+        pgbase = self.get_instance(2)
+        with mock.patch.object(
+            base_module,
+            'execute_query_fetchall',
+            side_effect=psycopg2.OperationalError('gone')
+        ):
+            assert_raises(DatabaseError, pgbase.query, 'SELECT 1')
+        eq_(self.connections[0].close.call_count, 1)
+        with mock.patch.object(base_module, 'execute_query_fetchall'):
+            pgbase.query('SELECT 1')
+        eq_(len(self.connections), 2)
+
+    #--------------------------------------------------------------------------
+    def test_pool_is_bounded(self):
+        pool = ConnectionPool(self._connect, 2)
+        first = pool.get()
+        pool.get()
+        ok_(not pool._available.acquire(False))
+        # an unfinished transaction is rolled back when it's put back
+        first.get_transaction_status.side_effect = [
+            psycopg2.extensions.TRANSACTION_STATUS_INTRANS,
+            psycopg2.extensions.TRANSACTION_STATUS_IDLE,
+        ]
+        pool.put(first)
+        eq_(first.rollback.call_count, 1)
+        ok_(pool.get() is first)
+        eq_(len(self.connections), 2)
+
+    #--------------------------------------------------------------------------
+    def test_numbered_placeholders(self):
+        eq_(
+            _numbered_placeholders(
+                "SELECT 100%% WHERE a = %s AND b = ANY(%s)"
+            ),
+            "SELECT 100% WHERE a = $1 AND b = ANY($2)"
+        )
+
+    #--------------------------------------------------------------------------
+    def test_prepared_query(self):
+        pgbase = self.get_instance(1)
+        executed = []
+
+        def execute(connection, sql, parameters=None):
+            executed.append((sql, parameters))
+
+        with mock.patch.object(base_module, 'execute_no_results') as prepare:
+            with mock.patch.object(
+                base_module,
+                'execute_query_fetchall',
+                side_effect=execute
+            ):
+                for signature in ('a', 'b'):
+                    pgbase.prepared_query(
+                        'SELECT * FROM signatures WHERE signature = %s',
+                        (signature,)
+                    )
+        # prepared once, executed twice
+        eq_(prepare.call_count, 1)
+        prepare_sql = prepare.call_args[0][1]
+        ok_(prepare_sql.startswith('PREPARE socorro_'))
+        ok_(prepare_sql.endswith(
+            'AS SELECT * FROM signatures WHERE signature = $1'
+        ))
+        name = prepare_sql.split()[1]
+        eq_(executed, [
+            ('EXECUTE %s (%%s)' % name, ('a',)),
+            ('EXECUTE %s (%%s)' % name, ('b',)),
+        ])
+
+    #--------------------------------------------------------------------------
+    def test_latencies_by_service_method(self):
+        pgbase = self.get_instance(0)
+        base_module.query_latencies(reset=True)
+        with mock.patch.object(base_module, 'execute_query_fetchall'):
+            pgbase.query('SELECT 1')
+            pgbase.query('SELECT 1')
+        latencies = base_module.query_latencies()
+        name = 'TestConnectionPooling.test_latencies_by_service_method'
+        eq_(latencies.keys(), [name])
+        eq_(latencies[name]['count'], 2)
+
+
 #==============================================================================
 @attr(integration='postgres')  # for nosetests
 class IntegrationTestBase(PostgreSQLTestCase):
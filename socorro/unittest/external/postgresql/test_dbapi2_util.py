@@ -159,6 +159,47 @@ class TestDBAPI2Helper(TestCase):
         m_cursor.execute.assert_called_once_with("select * from somewhere",
                                                  None)
 
+    def test_execute_query_iter_server_side(self):
+        m_cursor = MagicMock()
+        m_cursor.fetchmany.side_effect = [[(1,), (2,)], [(3,)], []]
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = m_cursor
+
+        eq_(
+            list(dbapi2_util.execute_query_iter_server_side(
+                conn,
+                "select * from somewhere where x > %s",
+                (0,),
+                fetch_size=2
+            )),
+            [(1,), (2,), (3,)]
+        )
+        # a named cursor keeps the result set on the server
+        cursor_name = conn.cursor.call_args[0][0]
+        ok_(cursor_name.startswith('socorro_'))
+        m_cursor.execute.assert_called_once_with(
+            "select * from somewhere where x > %s",
+            (0,)
+        )
+        m_cursor.fetchmany.assert_called_with(2)
+
+    def test_execute_query_zipped_iter_server_side(self):
+        m_cursor = MagicMock()
+        m_cursor.fetchmany.side_effect = [[(1, 'a'), (2, 'b')], []]
+        m_cursor.description = [Mock(), Mock()]
+        m_cursor.description[0].name = 'id'
+        m_cursor.description[1].name = 'name'
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = m_cursor
+
+        rows = list(dbapi2_util.execute_query_zipped_iter_server_side(
+            conn,
+            "select id, name from somewhere"
+        ))
+        eq_(rows, [{'id': 1, 'name': 'a'}, {'id': 2, 'name': 'b'}])
+        eq_(rows[1].name, 'b')
+        ok_(conn.cursor.call_args[0][0].startswith('socorro_'))
+
     def test_execute_no_results(self):
         m_execute = Mock()
         m_cursor = MagicMock()
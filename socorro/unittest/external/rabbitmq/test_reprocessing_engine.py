@@ -0,0 +1,259 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import json
+import os
+import shutil
+import tempfile
+
+from mock import Mock, patch
+from nose.tools import eq_, ok_, assert_raises
+
+from socorro.external.rabbitmq.reprocessing_engine import (
+    ReprocessingPublisher,
+    ReprocessingEngineApp,
+)
+from socorro.lib.util import DotDict
+from socorro.unittest.testbase import TestCase
+
+
+#==============================================================================
+class TestReprocessingPublisher(TestCase):
+
+    def test_publish_one_transaction_per_batch(self):
+        channel = Mock()
+        publisher = ReprocessingPublisher('socorro.reprocessing', Mock())
+
+        publisher.publish(channel, ['a', 'b', 'c'])
+
+        eq_(channel.tx_select.call_count, 1)
+        eq_(
+            [x[1]['body'] for x in channel.basic_publish.call_args_list],
+            ['a', 'b', 'c']
+        )
+        eq_(
+            channel.basic_publish.call_args[1]['routing_key'],
+            'socorro.reprocessing'
+        )
+        eq_(channel.tx_commit.call_count, 1)
+        # no headroom configured, the queue depth is never checked
+        eq_(channel.queue_declare.call_count, 0)
+
+    @patch('socorro.external.rabbitmq.reprocessing_engine.time')
+    def test_wait_for_headroom(self, mocked_time):
+        channel = Mock()
+        depths = [150, 120, 20]
+        channel.queue_declare.side_effect = lambda **kwargs: Mock(
+            method=Mock(message_count=depths.pop(0))
+        )
+        logger = Mock()
+        publisher = ReprocessingPublisher(
+            'socorro.reprocessing',
+            logger,
+            max_queue_depth=100,
+            headroom_check_interval=7
+        )
+
+        publisher.publish(channel, ['a'])
+
+        eq_(channel.queue_declare.call_count, 3)
+        ok_(channel.queue_declare.call_args[1]['passive'])
+        eq_(mocked_time.sleep.call_count, 2)
+        mocked_time.sleep.assert_called_with(7)
+        eq_(logger.info.call_count, 2)
+        eq_(channel.basic_publish.call_count, 1)
+
+    @patch('socorro.external.rabbitmq.reprocessing_engine.time')
+    def test_max_rate(self, mocked_time):
+        mocked_time.time.return_value = 100.0
+        publisher = ReprocessingPublisher(
+            'socorro.reprocessing',
+            Mock(),
+            max_rate=10
+        )
+
+        publisher.publish(Mock(), ['a'] * 20)
+        eq_(mocked_time.sleep.call_count, 0)
+        # twenty crash_ids at ten a second take two seconds, half a second
+        # later the next batch waits for the remaining one and a half
+        mocked_time.time.return_value = 100.5
+        publisher.publish(Mock(), ['a'] * 20)
+        mocked_time.sleep.assert_called_once_with(1.5)
+
+
+#==============================================================================
+class TestReprocessingEngineApp(TestCase):
+
+    def setUp(self):
+        super(TestReprocessingEngineApp, self).setUp()
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        super(TestReprocessingEngineApp, self).tearDown()
+        shutil.rmtree(self.tempdir)
+
+    def _get_config(self, **kwargs):
+        config = DotDict()
+        config.logger = Mock()
+        config.database = DotDict()
+        config.database.database_class = Mock()
+        config.database.transaction_executor_class = Mock()
+        config.queue = DotDict()
+        config.queue.rabbitmq_class = Mock()
+        config.queue.transaction_executor_class = Mock()
+        config.queue.routing_key = 'socorro.reprocessing'
+        config.reprocessing = DotDict()
+        config.reprocessing.start_date = '2015-01-01'
+        config.reprocessing.end_date = '2015-01-08'
+        config.reprocessing.signature = ''
+        config.reprocessing.page_size = 4
+        config.reprocessing.fetch_size = 2
+        config.reprocessing.batch_size = 3
+        config.reprocessing.max_rate = 0
+        config.reprocessing.max_queue_depth = 0
+        config.reprocessing.headroom_check_interval = 10
+        config.reprocessing.checkpoint_pathname = os.path.join(
+            self.tempdir,
+            'checkpoint.json'
+        )
+        config.reprocessing.estimate_total = True
+        config.reprocessing.progress_interval = 0
+        config.reprocessing.update(kwargs)
+        return config
+
+    def _set_up_transactions(self, app, rows):
+        """make the database transaction executor page through 'rows' the
+        way Postgres would and the queue transaction record what is
+        published"""
+        published = []
+
+        def execute_query(connection, sql, parameters, fetch_size):
+            start = 0
+            if 'last_uuid' in parameters:
+                start = [x[1] for x in rows].index(parameters['last_uuid'])
+                start += 1
+            return iter(rows[start:start + parameters['page_size']])
+
+        def database_transaction(function, *args):
+            return function(Mock(), *args)
+
+        def queue_transaction(function, crash_ids):
+            published.append(crash_ids)
+
+        app.database_transaction = Mock(side_effect=database_transaction)
+        app.queue_transaction = Mock(side_effect=queue_transaction)
+        return published, execute_query
+
+    def test_page_sql(self):
+        config = self._get_config(signature='js::GCThing')
+        app = ReprocessingEngineApp(config)
+
+        sql, parameters = app._page_sql(None)
+        ok_('signature = %(signature)s' in sql)
+        ok_('last_uuid' not in sql)
+        eq_(parameters['signature'], 'js::GCThing')
+        eq_(parameters['page_size'], 4)
+
+        sql, parameters = app._page_sql(('2015-01-02', 'some-uuid'))
+        ok_(
+            '(date_processed, uuid) > '
+            '(%(last_date_processed)s, %(last_uuid)s)' in sql
+        )
+        ok_(sql.endswith('ORDER BY date_processed, uuid LIMIT %(page_size)s'))
+        eq_(parameters['last_uuid'], 'some-uuid')
+
+    @patch(
+        'socorro.external.rabbitmq.reprocessing_engine.single_value_sql',
+        Mock(return_value=10)
+    )
+    def test_main(self):
+        rows = [('2015-01-0%d' % (x % 7 + 1), 'uuid-%02d' % x)
+                for x in range(10)]
+        config = self._get_config()
+        app = ReprocessingEngineApp(config)
+        published, execute_query = self._set_up_transactions(app, rows)
+
+        with patch(
+            'socorro.external.rabbitmq.reprocessing_engine.'
+            'execute_query_iter_server_side',
+            side_effect=execute_query
+        ):
+            app.main()
+
+        eq_(
+            [uuid for batch in published for uuid in batch],
+            [x[1] for x in rows]
+        )
+        # batches never span pages, so a page of four is 3 + 1
+        eq_([len(x) for x in published], [3, 1, 3, 1, 2])
+        with open(config.reprocessing.checkpoint_pathname) as f:
+            checkpoint = json.load(f)
+        eq_(checkpoint['published'], 10)
+        eq_(checkpoint['last_uuid'], 'uuid-09')
+        ok_(checkpoint['complete'])
+        report = config.logger.info.call_args[0]
+        eq_(report[1:3], (10, 10))
+
+        # a completed run is not repeated
+        published[:] = []
+        app.main()
+        eq_(published, [])
+
+    @patch(
+        'socorro.external.rabbitmq.reprocessing_engine.single_value_sql',
+        Mock(return_value=10)
+    )
+    def test_resume_from_checkpoint(self):
+        rows = [('2015-01-01', 'uuid-%02d' % x) for x in range(10)]
+        config = self._get_config()
+        with open(config.reprocessing.checkpoint_pathname, 'w') as f:
+            json.dump(
+                {
+                    'key': {
+                        'start_date': '2015-01-01',
+                        'end_date': '2015-01-08',
+                        'signature': '',
+                    },
+                    'last_date_processed': '2015-01-01',
+                    'last_uuid': 'uuid-05',
+                    'published': 6,
+                    'complete': False,
+                },
+                f
+            )
+        app = ReprocessingEngineApp(config)
+        published, execute_query = self._set_up_transactions(app, rows)
+
+        with patch(
+            'socorro.external.rabbitmq.reprocessing_engine.'
+            'execute_query_iter_server_side',
+            side_effect=execute_query
+        ):
+            app.main()
+
+        eq_(
+            [uuid for batch in published for uuid in batch],
+            ['uuid-06', 'uuid-07', 'uuid-08', 'uuid-09']
+        )
+        with open(config.reprocessing.checkpoint_pathname) as f:
+            eq_(json.load(f)['published'], 10)
+
+    def test_checkpoint_for_other_crashes_is_ignored(self):
+        config = self._get_config()
+        with open(config.reprocessing.checkpoint_pathname, 'w') as f:
+            json.dump({'key': {'signature': 'other'}, 'complete': True}, f)
+        app = ReprocessingEngineApp(config)
+        eq_(app._load_checkpoint(), None)
+        eq_(config.logger.warning.call_count, 1)
+
+    def test_reader_failure_is_raised(self):
+        config = self._get_config(estimate_total=False)
+        app = ReprocessingEngineApp(config)
+        app.database_transaction = Mock(side_effect=IOError('db is gone'))
+        assert_raises(IOError, app.main)
+
+    def test_dates_are_required(self):
+        config = self._get_config(start_date='')
+        app = ReprocessingEngineApp(config)
+        assert_raises(ValueError, app.main)
@@ -2,6 +2,10 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import json
+import tempfile
+import time
+
 import mock
 from nose.tools import eq_, ok_, assert_raises
 
@@ -15,6 +19,9 @@ from socorro.external.crashstorage_base import (
     PrimaryDeferredProcessedStorage,
     Redactor,
     BenchmarkingCrashStorage,
+    MetricsCrashStorage,
+    SpoolingCrashStorage,
+    CrashIDNotFound,
     MemoryDumpsMapping,
     FileDumpsMapping
 )
@@ -858,6 +865,296 @@ class TestBench(TestCase):
             mock_logging.debug.reset_mock()
 
 
+class TestMetricsCrashStorage(TestCase):
+
+    def _get_config(self, **kwargs):
+        config = DotDict()
+        config.logger = Mock()
+        config.redactor_class = Mock()
+        config.wrapped_crashstore = Mock(
+            return_value=Mock(spec=CrashStorageBase)
+        )
+        config.metrics_tag = ''
+        config.metrics_flush_interval = 60
+        config.metrics_pathname = ''
+        config.count_document_bytes = False
+        config.statsd_class = Mock()
+        config.statsd_host = ''
+        config.statsd_port = 8125
+        config.metrics_statsd_prefix = 'crashstorage'
+        config.update(kwargs)
+        return config
+
+    def test_outcomes_bytes_and_retries(self):
+        config = self._get_config(
+            metrics_tag='s3',
+            count_document_bytes=True,
+        )
+        wrapped = config.wrapped_crashstore.return_value
+        wrapped.transaction = Mock(retry_count=0)
+        crashstorage = MetricsCrashStorage(config)
+        eq_(crashstorage.store_name, 's3')
+
+        def save_with_two_retries(raw_crash, dumps, crash_id):
+            wrapped.transaction.retry_count += 2
+        wrapped.save_raw_crash.side_effect = save_with_two_retries
+
+        crashstorage.save_raw_crash(
+            {'a': 1},
+            MemoryDumpsMapping({'upload_file_minidump': 'x' * 100}),
+            'ooid'
+        )
+        wrapped.save_raw_crash.assert_called_with(
+            {'a': 1},
+            {'upload_file_minidump': 'x' * 100},
+            'ooid'
+        )
+
+        wrapped.get_raw_dump.return_value = 'y' * 10
+        eq_(crashstorage.get_raw_dump('ooid', 'a_dump'), 'y' * 10)
+        wrapped.get_raw_dump.assert_called_with('ooid', 'a_dump')
+
+        wrapped.get_raw_crash.side_effect = CrashIDNotFound('ooid')
+        assert_raises(CrashIDNotFound, crashstorage.get_raw_crash, 'ooid')
+        wrapped.remove.side_effect = ValueError('boom')
+        assert_raises(ValueError, crashstorage.remove, 'ooid')
+
+        report = crashstorage.flush()
+        eq_(report['store'], 's3')
+        operations = report['operations']
+        eq_(operations['save_raw_crash']['bytes'], len('{"a": 1}') + 100)
+        eq_(operations['save_raw_crash']['retries'], 2)
+        eq_(operations['save_raw_crash']['success']['count'], 1)
+        eq_(operations['get_raw_dump']['bytes'], 10)
+        eq_(operations['get_raw_crash']['not_found']['count'], 1)
+        ok_('success' not in operations['get_raw_crash'])
+        eq_(operations['remove']['error']['count'], 1)
+        eq_(config.logger.info.call_count, 4)
+
+        # the aggregates start over after a flush
+        eq_(crashstorage.flush()['operations'], {})
+
+    def test_periodic_flush_to_statsd_and_file(self):
+        with tempfile.NamedTemporaryFile() as stats_file:
+            config = self._get_config(
+                metrics_flush_interval=0,
+                metrics_pathname=stats_file.name,
+                statsd_host='localhost',
+            )
+            crashstorage = MetricsCrashStorage(config)
+            statsd = config.statsd_class.return_value
+            config.statsd_class.assert_called_with(
+                'localhost',
+                8125,
+                'crashstorage'
+            )
+
+            crashstorage.save_processed({'uuid': 'ooid'})
+            crashstorage.save_processed({'uuid': 'ooid'})
+
+            lines = open(stats_file.name).readlines()
+            eq_(len(lines), 2)
+            report = json.loads(lines[0])
+            eq_(report['store'], 'CrashStorageBase')
+            eq_(report['operations']['save_processed']['success']['count'], 1)
+
+            gauges = dict(x[0] for x in statsd.gauge.call_args_list)
+            name = 'crashstorage.CrashStorageBase.save_processed.%s'
+            ok_(name % 'success.p99' in gauges)
+            eq_(gauges[name % 'success.count'], 1)
+            eq_(gauges[name % 'bytes'], 0)
+
+        crashstorage.close()
+        crashstorage.wrapped_crashstore.close.assert_called_once_with()
+
+
+class MemorySpool(CrashStorageBase):
+    """keeps crashes in a dict and offers them as new until they are
+    visited, like the dated file system storage"""
+
+    def __init__(self, config, quit_check_callback=None):
+        super(MemorySpool, self).__init__(config, quit_check_callback)
+        self.crashes = {}
+        self.new = []
+        self.visiting = None
+
+    def save_raw_crash(self, raw_crash, dumps, crash_id):
+        if crash_id == self.visiting:
+            # the dated file system storage still has its links
+            raise OSError(17, 'File exists')
+        self.crashes[crash_id] = (raw_crash, dumps)
+        self.new.append(crash_id)
+
+    def get_raw_crash(self, crash_id):
+        try:
+            return self.crashes[crash_id][0]
+        except KeyError:
+            raise CrashIDNotFound(crash_id)
+
+    def get_raw_dumps(self, crash_id):
+        return self.crashes[crash_id][1]
+
+    def remove(self, crash_id):
+        del self.crashes[crash_id]
+
+    def count_new_crashes(self):
+        return len(self.new)
+
+    def new_crashes(self):
+        new, self.new = self.new, []
+        for crash_id in new:
+            self.visiting = crash_id
+            yield crash_id
+            self.visiting = None
+
+
+class TestSpoolingCrashStorage(TestCase):
+
+    def _get_config(self, **kwargs):
+        config = DotDict()
+        config.logger = Mock()
+        config.redactor_class = Mock()
+        config.spool = DotDict()
+        config.spool.logger = config.logger
+        config.spool.redactor_class = Mock()
+        config.spool.storage_class = MemorySpool
+        config.destination = DotDict()
+        config.destination.storage_class = Mock(
+            return_value=Mock(spec=CrashStorageBase)
+        )
+        config.mover_interval = 5.0
+        config.statsd_class = Mock()
+        config.statsd_host = ''
+        config.statsd_port = 8125
+        config.spool_depth_statsd_name = 'collector.spool_depth'
+        config.update(kwargs)
+        return config
+
+    @mock.patch('socorro.external.crashstorage_base.threading.Thread')
+    def test_save_spools_and_mover_drains(self, mocked_thread):
+        config = self._get_config(statsd_host='localhost')
+        crashstorage = SpoolingCrashStorage(config)
+        ok_(mocked_thread.return_value.start.called)
+        spool = crashstorage.spool_store
+        destination = crashstorage.destination_store
+
+        crashstorage.save_raw_crash({'a': 1}, {'dump': 'x'}, 'crash1')
+        crashstorage.save_raw_crash({'b': 2}, {'dump': 'y'}, 'crash2')
+        eq_(crashstorage.spool_depth, 2)
+        # nothing reaches the destination while the request is served
+        eq_(destination.save_raw_crash.call_count, 0)
+        eq_(crashstorage.get_raw_crash('crash1'), {'a': 1})
+
+        def fail_once(raw_crash, dumps, crash_id):
+            if crash_id == 'crash2':
+                destination.save_raw_crash.side_effect = None
+                raise IOError('S3 is slow today')
+        destination.save_raw_crash.side_effect = fail_once
+
+        eq_(crashstorage.move_spooled_crashes(), 1)
+        destination.save_raw_crash.assert_any_call(
+            {'a': 1},
+            {'dump': 'x'},
+            'crash1'
+        )
+        # the failed crash went back into the spool
+        eq_(sorted(spool.crashes), ['crash2'])
+        eq_(spool.new, ['crash2'])
+        eq_(crashstorage.spool_depth, 1)
+        crashstorage._report_depth(2)
+        config.statsd_class.return_value.gauge.assert_called_with(
+            'collector.spool_depth',
+            1
+        )
+
+        eq_(crashstorage.move_spooled_crashes(), 1)
+        eq_(spool.crashes, {})
+        eq_(crashstorage.spool_depth, 0)
+        destination.get_raw_crash.return_value = {'b': 2}
+        eq_(crashstorage.get_raw_crash('crash2'), {'b': 2})
+
+        crashstorage.close()
+        ok_(mocked_thread.return_value.join.called)
+        ok_(destination.close.called)
+
+    @mock.patch('socorro.external.crashstorage_base.threading.Thread')
+    def test_failed_crash_does_not_block_the_spool(self, mocked_thread):
+        config = self._get_config()
+        crashstorage = SpoolingCrashStorage(config)
+        spool = crashstorage.spool_store
+        destination = crashstorage.destination_store
+
+        def reject_poison(raw_crash, dumps, crash_id):
+            if crash_id == 'poison':
+                raise ValueError('never acceptable')
+        destination.save_raw_crash.side_effect = reject_poison
+
+        for crash_id in ('poison', 'crash1', 'crash2'):
+            crashstorage.save_raw_crash({}, {}, crash_id)
+        eq_(crashstorage.move_spooled_crashes(), 2)
+        eq_(spool.new, ['poison'])
+        eq_(crashstorage.move_spooled_crashes(), 0)
+        eq_(spool.new, ['poison'])
+        eq_(crashstorage.spool_depth, 1)
+        eq_(
+            [x[0][2] for x in destination.save_raw_crash.call_args_list],
+            ['poison', 'crash1', 'crash2', 'poison']
+        )
+
+    @mock.patch('socorro.external.crashstorage_base.threading.Thread')
+    def test_unreadable_crash_stays_spooled(self, mocked_thread):
+        config = self._get_config()
+        crashstorage = SpoolingCrashStorage(config)
+        spool = crashstorage.spool_store
+        destination = crashstorage.destination_store
+
+        for crash_id in ('crash1', 'crash2'):
+            crashstorage.save_raw_crash({}, {}, crash_id)
+        get_raw_dumps = spool.get_raw_dumps
+
+        def fail_once(crash_id):
+            if crash_id == 'crash1':
+                spool.get_raw_dumps = get_raw_dumps
+                raise IOError('too many open files')
+            return get_raw_dumps(crash_id)
+        spool.get_raw_dumps = fail_once
+
+        # the crash that could not be read is neither counted as moved nor
+        # lost, it is offered again by the next pass
+        eq_(crashstorage.move_spooled_crashes(), 1)
+        eq_(spool.new, ['crash1'])
+        eq_(crashstorage.spool_depth, 1)
+        eq_(config.logger.error.call_count, 1)
+        eq_(crashstorage.move_spooled_crashes(), 1)
+        eq_(spool.crashes, {})
+        eq_(crashstorage.spool_depth, 0)
+        eq_(
+            [x[0][2] for x in destination.save_raw_crash.call_args_list],
+            ['crash2', 'crash1']
+        )
+
+    @mock.patch('socorro.external.crashstorage_base.threading.Thread')
+    def test_depth_counts_crashes_left_by_earlier_runs(self, mocked_thread):
+        config = self._get_config()
+        with mock.patch.object(MemorySpool, 'count_new_crashes') as count:
+            count.return_value = 17
+            crashstorage = SpoolingCrashStorage(config)
+        eq_(crashstorage.spool_depth, 17)
+
+    def test_mover_thread(self):
+        config = self._get_config(mover_interval=0.01)
+        crashstorage = SpoolingCrashStorage(config)
+        crashstorage.save_raw_crash({'a': 1}, {}, 'crash1')
+        destination = crashstorage.destination_store
+        for i in range(100):
+            if destination.save_raw_crash.called:
+                break
+            time.sleep(0.01)
+        crashstorage.close()
+        destination.save_raw_crash.assert_called_with({'a': 1}, {}, 'crash1')
+        eq_(crashstorage.spool_depth, 0)
+
+
 class TestDumpsMappings(TestCase):
 
     def test_simple(self):
@@ -96,5 +96,63 @@ class TestOoid(TestCase):
     assert (None,None) == oo.dateAndDepthFromOoid(self.badooid0)
     assert (None,None) == oo.dateAndDepthFromOoid(self.badooid1)
 
+  def testDateAndDepthAreCached(self):
+    ooid = self.dyyoids[0]
+    oo._cachedTails.clear()
+    expected = oo.dateAndDepthFromOoid(ooid)
+    assert ooid[-7:] in oo._cachedTails
+    assert expected == oo.dateAndDepthFromOoid(ooid)
+    assert (None,None) == oo.dateAndDepthFromOoid(None)
+    assert (None,None) == oo.dateAndDepthFromOoid('')
+
+  def testOoid(self):
+    for i in range(len(self.dyyoids)):
+      ooid = oo.Ooid(self.dyyoids[i])
+      assert ooid == self.dyyoids[i]
+      assert self.baseDate == ooid.date, 'Expect %s, got %s' %(self.baseDate, ooid.date)
+      assert self.depths[i] == ooid.depth
+      expected = tuple(self.dyyoids[i][j * 2:(j + 1) * 2] for j in range(self.depths[i]))
+      assert expected == ooid.radix, 'Expect %s, got %s' %(expected, ooid.radix)
+      assert ooid is oo.Ooid(ooid)
+    ooid = oo.Ooid(self.badooid0)
+    assert (None,None,()) == (ooid.date,ooid.depth,ooid.radix)
+
+  def testGroupByDate(self):
+    ooids = [
+      oo.uuidToOoid(self.rawuuids[0],timestamp=self.xmas05),
+      self.dyyoids[0],
+      self.badooid0,
+      oo.uuidToOoid(self.rawuuids[1],timestamp=self.xmas05,depth=4),
+      self.yyyyoids[0],
+    ]
+    groups = oo.groupByDate(ooids)
+    assert 3 == len(groups), groups
+    assert [ooids[0],ooids[3]] == groups[self.xmas05]
+    assert [ooids[1],ooids[4]] == groups[self.baseDate]
+    assert [self.badooid0] == groups[None]
+
+    seen = []
+    def year(date):
+      seen.append(date)
+      return date.year
+    groups = oo.groupByDate(ooids * 3, key=year)
+    assert set([2005,2008,None]) == set(groups)
+    assert 6 == len(groups[2005])
+    # once for each distinct date and depth
+    assert 4 == len(seen), seen
+
+  def testGroupByRadix(self):
+    ooids = ['abcdef' + self.dyyoids[0][6:], 'abcd00' + self.dyyoids[0][6:]]
+    groups = oo.groupByRadix(ooids, depth=2)
+    assert {('ab','cd'): ooids} == groups
+    groups = oo.groupByRadix(ooids + [self.badooid0], depth=3)
+    assert [ooids[0]] == groups[('ab','cd','ef')]
+    assert [ooids[1]] == groups[('ab','cd','00')]
+    assert 3 == len(groups)
+    groups = oo.groupByRadix(self.dyyoids + [self.badooid0])
+    for i in range(len(self.dyyoids)):
+      assert self.dyyoids[i] in groups[oo.Ooid(self.dyyoids[i]).radix]
+    assert [self.badooid0] == groups[()]
+
 if __name__ == "__main__":
   unittest.main()
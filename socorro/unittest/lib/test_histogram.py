@@ -0,0 +1,63 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+from nose.tools import eq_, ok_
+
+from socorro.lib.histogram import Histogram
+from socorro.unittest.testbase import TestCase
+
+
+#==============================================================================
+class TestHistogram(TestCase):
+
+    def test_empty(self):
+        histogram = Histogram()
+        eq_(histogram.percentile(50), None)
+        summary = histogram.summary()
+        eq_(summary['count'], 0)
+        eq_(summary['p99'], None)
+
+    def test_small_values_are_exact(self):
+        histogram = Histogram()
+        for value in range(1, 51):
+            histogram.record(value)
+        eq_(histogram.percentile(50), 25)
+        eq_(histogram.percentile(90), 45)
+        eq_(histogram.percentile(100), 50)
+        eq_(histogram.min, 1)
+        eq_(histogram.summary()['mean'], 25.5)
+
+    def test_relative_error_is_bounded(self):
+        histogram = Histogram()
+        values = [x * 997 for x in range(1, 10001)]
+        for value in values:
+            histogram.record(value)
+        for percent in (50, 90, 99, 99.9):
+            exact = values[int(len(values) * percent / 100.0) - 1]
+            reported = histogram.percentile(percent)
+            ok_(reported >= exact)
+            ok_((reported - exact) / float(exact) < 0.02)
+        eq_(histogram.percentile(100), values[-1])
+        # about a thousand buckets cover four orders of magnitude
+        ok_(len(histogram.buckets) < 1000)
+
+    def test_merge(self):
+        first = Histogram()
+        second = Histogram()
+        for value in range(100):
+            first.record(value)
+            second.record(value + 100)
+        first.merge(second)
+        eq_(first.count, 200)
+        eq_(first.min, 0)
+        eq_(first.max, 199)
+        eq_(first.percentile(50), 99)
+
+    def test_summary_names(self):
+        histogram = Histogram()
+        histogram.record(10, count=3)
+        summary = histogram.summary()
+        eq_(summary['count'], 3)
+        eq_(summary['p99_9'], 10)
+        eq_(summary['mean'], 10.0)
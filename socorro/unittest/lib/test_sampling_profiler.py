@@ -0,0 +1,93 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import os
+import shutil
+import tempfile
+import threading
+
+from nose.tools import eq_, ok_
+
+from socorro.lib.sampling_profiler import SamplingProfiler
+from socorro.unittest.testbase import TestCase
+
+
+#------------------------------------------------------------------------------
+def busy_function(stop_event, started_event):
+    started_event.set()
+    stop_event.wait()
+
+
+#==============================================================================
+class TestSamplingProfiler(TestCase):
+
+    #--------------------------------------------------------------------------
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.stop_event = threading.Event()
+        started_event = threading.Event()
+        self.busy_thread = threading.Thread(
+            target=busy_function,
+            args=(self.stop_event, started_event),
+            name='busy thread'
+        )
+        self.busy_thread.start()
+        started_event.wait()
+
+    #--------------------------------------------------------------------------
+    def tearDown(self):
+        self.stop_event.set()
+        self.busy_thread.join()
+        shutil.rmtree(self.tempdir)
+
+    #--------------------------------------------------------------------------
+    def test_sample(self):
+        profiler = SamplingProfiler()
+        profiler.sample()
+        profiler.sample()
+
+        eq_(profiler.sample_count, 2)
+        busy_stacks = [
+            (stack, count) for stack, count in profiler.stacks.items()
+            if stack.startswith('busy_thread;')
+        ]
+        eq_(len(busy_stacks), 1)
+        stack, count = busy_stacks[0]
+        eq_(count, 2)
+        ok_('busy_function_(' in stack)
+        ok_(' ' not in stack)
+        # the thread taking the sample is left out
+        ok_(not any('test_sample' in x for x in profiler.stacks))
+
+    #--------------------------------------------------------------------------
+    def test_toggle(self):
+        profiler = SamplingProfiler(
+            interval=0.001,
+            pathname_template=os.path.join(
+                self.tempdir,
+                'profile.{pid}.collapsed'
+            )
+        )
+        eq_(profiler.toggle(), None)
+        ok_(profiler.running)
+        while profiler.sample_count < 3:
+            self.stop_event.wait(0.01)
+        pathname = profiler.toggle()
+        ok_(not profiler.running)
+
+        eq_(pathname, os.path.join(
+            self.tempdir,
+            'profile.%d.collapsed' % os.getpid()
+        ))
+        with open(pathname) as f:
+            lines = f.readlines()
+        ok_(lines)
+        total = 0
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            total += int(count)
+        ok_(total >= 3)
+        # the next session starts from scratch
+        eq_(profiler.stacks, {})
+        eq_(os.listdir(self.tempdir), [os.path.basename(pathname)])
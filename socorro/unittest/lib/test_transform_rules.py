@@ -287,6 +287,14 @@ class TestTransformRules(TestCase):
                                                     False, (), {}))]
         assert_expected_same(rules.rules, expected)
 
+    def test_TransformRuleSystem_close(self):
+        rules = transform_rules.TransformRuleSystem()
+        a_rule = Mock()
+        rule_without_close = object()
+        rules.rules = [a_rule, rule_without_close]
+        rules.close()
+        a_rule.close.assert_called_once_with()
+
     def test_TransformRuleSystem_apply_all_rules(self):
 
         quit_check_mock = Mock()
@@ -0,0 +1,155 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import mock
+from nose.tools import eq_, ok_
+
+from socorro.monitor.monitor_app import MonitorApp
+from socorro.lib.util import DotDict, SilentFakeLogger
+from socorro.unittest.testbase import TestCase
+
+
+class TestMonitorApp(TestCase):
+
+    def _get_config(self, new_crashes=()):
+        config = DotDict()
+        config.logger = SilentFakeLogger()
+        config.registrar = DotDict()
+        config.registrar.database_class = mock.MagicMock()
+        config.registrar.transaction_executor_class = mock.MagicMock()
+        config.registrar.check_in_frequency = 60
+        config.registrar.quit_if_no_processors = False
+        config.job_manager = DotDict()
+        config.job_manager.database_class = mock.MagicMock()
+        config.job_manager.transaction_executor_class = mock.MagicMock()
+        config.job_manager.standard_job_batch_size = 2
+        config.new_crash_source = DotDict()
+        config.new_crash_source.new_crash_source_class = mock.MagicMock(
+            return_value=lambda: iter(new_crashes)
+        )
+        return config
+
+    @mock.patch('socorro.monitor.monitor_app.signal')
+    def test_balanced_processor_iter(self, mocked_signal):
+        config = self._get_config()
+        app = MonitorApp(config)
+        app.job_manager_transaction = mock.Mock(return_value=[
+            [1, 5, 'one'],
+            [2, 0, 'two'],
+            [3, 2, 'three'],
+        ])
+
+        processor_iter = app._balanced_processor_iter()
+        assigned = [processor_iter.next() for x in range(7)]
+
+        eq_(assigned[:2], [(2, 'two'), (2, 'two')])
+        # after seven assignments, every processor is loaded evenly
+        loads = {1: 5, 2: 0, 3: 2}
+        for processor_id, processor_name in assigned:
+            loads[processor_id] += 1
+        eq_(sorted(loads.values()), [4, 5, 5])
+
+    @mock.patch('socorro.monitor.monitor_app.signal')
+    def test_new_crash_id_batches(self, mocked_signal):
+        config = self._get_config(new_crashes=['a', 'b', 'c', 'd', 'e'])
+        app = MonitorApp(config)
+
+        eq_(
+            list(app._new_crash_id_batches()),
+            [['a', 'b'], ['c', 'd'], ['e']]
+        )
+
+    @mock.patch('socorro.monitor.monitor_app.execute_no_results')
+    @mock.patch('socorro.monitor.monitor_app.signal')
+    def test_queue_standard_jobs_batch_transaction(
+        self,
+        mocked_signal,
+        mocked_execute_no_results
+    ):
+        config = self._get_config()
+        app = MonitorApp(config)
+        connection = mock.Mock()
+        processor_iter = iter([(1, 'one'), (2, 'two')])
+
+        result = app._queue_standard_jobs_batch_transaction(
+            connection,
+            ['crash_a', 'crash_b'],
+            processor_iter
+        )
+
+        eq_(result, [1, 2])
+        eq_(mocked_execute_no_results.call_count, 1)
+        sql, parameters = mocked_execute_no_results.call_args[0][1:]
+        ok_(sql.endswith(
+            'values (%s, %s, %s, %s, %s), (%s, %s, %s, %s, %s)'
+        ))
+        eq_(parameters[:4], ['', 'crash_a', 1, 1])
+        eq_(parameters[5:9], ['', 'crash_b', 2, 1])
+
+    @mock.patch('socorro.monitor.monitor_app.signal')
+    def test_balanced_processor_iter_counts_only_committed_jobs(
+        self,
+        mocked_signal
+    ):
+        config = self._get_config()
+        app = MonitorApp(config)
+        app.job_manager_transaction = mock.Mock(return_value=[
+            [1, 0, 'one'],
+            [2, 1, 'two'],
+        ])
+
+        processor_iter = app._balanced_processor_iter()
+        eq_([processor_iter.next() for x in range(2)], [(1, 'one')] * 2)
+        # the jobs were never inserted
+        processor_iter.rollback()
+        eq_([processor_iter.next() for x in range(2)], [(1, 'one')] * 2)
+        processor_iter.commit()
+        eq_(processor_iter.next(), (2, 'two'))
+        processor_iter.rollback()
+        eq_(processor_iter.next(), (2, 'two'))
+        eq_(app.job_manager_transaction.call_count, 1)
+
+    @mock.patch('socorro.monitor.monitor_app.signal')
+    def test_balanced_processor_iter_without_processors(self, mocked_signal):
+        config = self._get_config()
+        app = MonitorApp(config)
+        app.job_manager_transaction = mock.Mock(return_value=[])
+
+        processor_iter = app._balanced_processor_iter()
+        eq_(processor_iter.next(), None)
+        eq_(
+            app._queue_standard_job_transaction(
+                mock.Mock(),
+                'crash_a',
+                processor_iter
+            ),
+            None
+        )
+
+    @mock.patch('socorro.monitor.monitor_app.signal')
+    def test_queue_standard_jobs_singly(self, mocked_signal):
+        config = self._get_config(new_crashes=['c'])
+        config.logger = mock.Mock()
+        app = MonitorApp(config)
+        processor_iter = mock.Mock()
+
+        def queue(transaction, crash_id, candidate_processor_iter):
+            if crash_id == 'bad':
+                raise Exception('bad crash_id')
+            if crash_id == 'unassigned':
+                return None
+            return 1
+        app.job_manager_transaction = mock.Mock(side_effect=queue)
+
+        app._queue_standard_jobs_singly(
+            ['a', 'bad', 'unassigned'],
+            processor_iter
+        )
+        eq_(processor_iter.commit.call_count, 2)
+        eq_(processor_iter.rollback.call_count, 1)
+        eq_(config.logger.error.call_count, 1)
+        eq_(config.logger.warning.call_count, 1)
+        # the crash that found no processor is queued again
+        eq_(list(app._new_crash_id_batches()), [['unassigned', 'c']])
+        eq_(list(app._new_crash_id_batches()), [['c']])
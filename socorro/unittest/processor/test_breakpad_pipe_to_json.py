@@ -2,7 +2,8 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
-from nose.tools import eq_, ok_
+from mock import patch
+from nose.tools import eq_, ok_, assert_raises
 
 import socorro.processor.breakpad_pipe_to_json as bpj
 
@@ -247,6 +248,34 @@ cannonical_json_dump = {
 }
 
 
+cannonical_pipe_dump = [
+    "OS|Windows NT|5.1.2600 Service Pack 2",
+    "CPU|x86|GenuineIntel family 6 model 22 stepping 1|4",
+    "Crash|EXCEPTION_ACCESS_VIOLATION_READ|0x676c|0",
+    "Module|firefox.exe|24.0.0.4925|firefox.pdb|9FFDDF56AADE45988C759EF5ABAE53862|0x00400000|0x004e0fff|1",
+    "Module|nss3.dll|24.0.0.4925|nss3.pdb|30EAD90FEEBD495398D46EFA41814E261|0x00a00000|0x00bb5fff|0",
+    "Module|mozjs.dll||mozjs.pdb|CC7AA5DA1FB144C4B40C2DF1B08709232|0x00bd0000|0x00ef9fff|0",
+    "Module|mozalloc.dll|24.0.0.4925|mozalloc.pdb|F4C1BFD2BA3A487CA37EBF3D7E543F7B1|0x01000000|0x01005fff|0",
+    "Module|gkmedias.dll|24.0.0.4925|gkmedias.pdb|02FE96BEFEAE4570AA12E766CF2C8A361|0x01010000|0x01337fff|0",
+    "",
+    "0|0|mozjs.dll|bogus_sig_1|jsinferinlines.h:17666746e8cc|1321|0x0",
+    "0|1|mozjs.dll|bogus_sig_2|jsobj.cpp:17666746e8cc|1552|0x2d",
+    "0|2|mozjs.dll|bogus_sig_3|CodeGenerator.cpp:17666746e8cc|3119|0x13",
+    "0|3|mozjs.dll||||0xcc9d0",
+    "0|4|||||0x80b6fe0",
+    "0|5|||||0x3cf5ee6",
+    "0|6|mozjs.dll|bogus_sig_7|BaselineJIT.cpp:17666746e8cc|105|0x20",
+    "0|7|mozjs.dll|bogus_sig_8|BaselineCompiler-shared.cpp:17666746e8cc|71|0x3d",
+    "0|8|mozjs.dll|bogus_sig_9|Ion.cpp:17666746e8cc|1708|0x1b",
+    "0|9|mozjs.dll|bogus_sig_10|Interpreter.cpp:17666746e8cc|2586|0x26",
+    "0|10|mozjs.dll|bogus_sig_11|Interpreter.cpp:17666746e8cc|438|0x9",
+    "0|11|mozjs.dll|bogus_sig_12|Interpreter.cpp:17666746e8cc|622|0x37",
+    "0|12|mozjs.dll|bogus_sig_13|Interpreter.cpp:17666746e8cc|659|0x1b",
+    "1|0|lars_crash.dll|ha_ha|no source|0|0x3|0x2|0x1",
+    "1|1|lars_crash.dll|ha_ha2|no source|0|0x5|0x1|0x3",
+]
+
+
 class TestCase(TestCase):
     def test_get(self):
         a_list = ['a', 'b', 'c']
@@ -422,31 +451,43 @@ class TestCase(TestCase):
 
 
     def test_pipe_dump_to_json_dump(self):
-        pipe_dump = [
-            "OS|Windows NT|5.1.2600 Service Pack 2",
-            "CPU|x86|GenuineIntel family 6 model 22 stepping 1|4",
-            "Crash|EXCEPTION_ACCESS_VIOLATION_READ|0x676c|0",
-            "Module|firefox.exe|24.0.0.4925|firefox.pdb|9FFDDF56AADE45988C759EF5ABAE53862|0x00400000|0x004e0fff|1",
-            "Module|nss3.dll|24.0.0.4925|nss3.pdb|30EAD90FEEBD495398D46EFA41814E261|0x00a00000|0x00bb5fff|0",
-            "Module|mozjs.dll||mozjs.pdb|CC7AA5DA1FB144C4B40C2DF1B08709232|0x00bd0000|0x00ef9fff|0",
-            "Module|mozalloc.dll|24.0.0.4925|mozalloc.pdb|F4C1BFD2BA3A487CA37EBF3D7E543F7B1|0x01000000|0x01005fff|0",
-            "Module|gkmedias.dll|24.0.0.4925|gkmedias.pdb|02FE96BEFEAE4570AA12E766CF2C8A361|0x01010000|0x01337fff|0",
-            "",
-            "0|0|mozjs.dll|bogus_sig_1|jsinferinlines.h:17666746e8cc|1321|0x0",
-            "0|1|mozjs.dll|bogus_sig_2|jsobj.cpp:17666746e8cc|1552|0x2d",
-            "0|2|mozjs.dll|bogus_sig_3|CodeGenerator.cpp:17666746e8cc|3119|0x13",
-            "0|3|mozjs.dll||||0xcc9d0",
-            "0|4|||||0x80b6fe0",
-            "0|5|||||0x3cf5ee6",
-            "0|6|mozjs.dll|bogus_sig_7|BaselineJIT.cpp:17666746e8cc|105|0x20",
-            "0|7|mozjs.dll|bogus_sig_8|BaselineCompiler-shared.cpp:17666746e8cc|71|0x3d",
-            "0|8|mozjs.dll|bogus_sig_9|Ion.cpp:17666746e8cc|1708|0x1b",
-            "0|9|mozjs.dll|bogus_sig_10|Interpreter.cpp:17666746e8cc|2586|0x26",
-            "0|10|mozjs.dll|bogus_sig_11|Interpreter.cpp:17666746e8cc|438|0x9",
-            "0|11|mozjs.dll|bogus_sig_12|Interpreter.cpp:17666746e8cc|622|0x37",
-            "0|12|mozjs.dll|bogus_sig_13|Interpreter.cpp:17666746e8cc|659|0x1b",
-            "1|0|lars_crash.dll|ha_ha|no source|0|0x3|0x2|0x1",
-            "1|1|lars_crash.dll|ha_ha2|no source|0|0x5|0x1|0x3",
-        ]
-        json_dump = bpj.pipe_dump_to_json_dump(pipe_dump)
+        json_dump = bpj.pipe_dump_to_json_dump(cannonical_pipe_dump)
+        eq_(json_dump, cannonical_json_dump)
+
+    def test_lazy_json_dump(self):
+        lazy_json_dump = bpj.LazyJsonDump('\n'.join(cannonical_pipe_dump))
+        ok_(not lazy_json_dump.is_materialized)
+
+        eq_(lazy_json_dump['crash_info']['crashing_thread'], 0)
+        ok_(lazy_json_dump.is_materialized)
+        eq_(lazy_json_dump.system_info.cpu_count, 4)
+        eq_(lazy_json_dump, cannonical_json_dump)
+
+        json_dump = lazy_json_dump.materialize()
+        ok_(isinstance(json_dump, DotDict))
         eq_(json_dump, cannonical_json_dump)
+
+    def test_lazy_json_dump_failure_is_remembered(self):
+        lazy_json_dump = bpj.LazyJsonDump('\n'.join(cannonical_pipe_dump))
+        eq_(lazy_json_dump.conversion_error, None)
+        with patch.object(
+            bpj,
+            'pipe_dump_to_json_dump',
+            side_effect=ValueError('bad dump')
+        ) as mocked_conversion:
+            assert_raises(ValueError, lazy_json_dump.materialize)
+            assert_raises(ValueError, lambda: lazy_json_dump['threads'])
+            assert_raises(ValueError, lambda: lazy_json_dump.threads)
+        eq_(mocked_conversion.call_count, 1)
+        ok_(isinstance(lazy_json_dump.conversion_error, ValueError))
+        ok_(not lazy_json_dump.is_materialized)
+
+    def test_lazy_json_dump_modification(self):
+        lazy_json_dump = bpj.LazyJsonDump('\n'.join(cannonical_pipe_dump))
+        lazy_json_dump.sensitive = {'exploitability': 'high'}
+        del lazy_json_dump['modules']
+
+        json_dump = lazy_json_dump.materialize()
+        eq_(json_dump.sensitive, {'exploitability': 'high'})
+        ok_('modules' not in json_dump)
+        ok_('threads' in json_dump)
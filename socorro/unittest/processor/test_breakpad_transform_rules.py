@@ -3,6 +3,9 @@
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 import copy
+import os
+import shutil
+import tempfile
 import ujson
 
 from mock import Mock, patch
@@ -734,6 +737,96 @@ class TestBreakpadTransformRule2015(TestCase):
             ]
         )
 
+    #--------------------------------------------------------------------------
+    @patch('socorro.processor.breakpad_transform_rules.subprocess')
+    def test_output_cache(self, mocked_subprocess_module):
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        config = self.get_basic_config()
+        config.stackwalker_output_cache_path = os.path.join(tempdir, 'cache')
+        config.stackwalker_output_cache_size = 1024 ** 2
+        config.symbols_version = '1'
+        dumps = {}
+        for name, contents in (('a', 'MDMP-a'), ('b', 'MDMP-b')):
+            dumps[name] = os.path.join(tempdir, name + '.dump')
+            with open(dumps[name], 'wb') as f:
+                f.write(contents)
+
+        mocked_subprocess_handle = (
+            mocked_subprocess_module.Popen.return_value
+        )
+        mocked_subprocess_handle.stdout.read.return_value = (
+            cannonical_stackwalker_output_str
+        )
+        mocked_subprocess_handle.wait.return_value = 0
+
+        def process(rule, dump_pathname):
+            raw_crash = copy.copy(canonical_standard_raw_crash)
+            raw_dumps = {config.dump_field: dump_pathname}
+            processed_crash = DotDict()
+            processor_meta = self.get_basic_processor_meta()
+            rule.act(raw_crash, raw_dumps, processed_crash, processor_meta)
+            eq_(processed_crash.json_dump, cannonical_stackwalker_output)
+            eq_(processed_crash.mdsw_return_code, 0)
+            ok_(processed_crash.success)
+            eq_(processor_meta.processor_notes, [])
+
+        rule = BreakpadStackwalkerRule2015(config)
+        process(rule, dumps['a'])
+        eq_(mocked_subprocess_module.Popen.call_count, 1)
+        # the same dump is not stackwalked again, not even by another rule
+        # sharing the cache
+        process(rule, dumps['a'])
+        process(BreakpadStackwalkerRule2015(config), dumps['a'])
+        eq_(mocked_subprocess_module.Popen.call_count, 1)
+        # a different dump is
+        process(rule, dumps['b'])
+        eq_(mocked_subprocess_module.Popen.call_count, 2)
+        # and so is the same dump with different symbols
+        config.symbols_version = '2'
+        process(BreakpadStackwalkerRule2015(config), dumps['a'])
+        eq_(mocked_subprocess_module.Popen.call_count, 3)
+
+        # failures are not cached
+        mocked_subprocess_handle.wait.return_value = 124
+        rule = BreakpadStackwalkerRule2015(config)
+        processed_crash = DotDict()
+        rule.act(
+            copy.copy(canonical_standard_raw_crash),
+            {config.dump_field: dumps['b']},
+            processed_crash,
+            self.get_basic_processor_meta()
+        )
+        eq_(processed_crash.mdsw_return_code, 124)
+        mocked_subprocess_handle.wait.return_value = 0
+        process(rule, dumps['b'])
+        eq_(mocked_subprocess_module.Popen.call_count, 5)
+
+        # neither is output missing symbols, they may be uploaded before
+        # the crash is reprocessed
+        missing_symbols_output = dict(
+            cannonical_stackwalker_output,
+            modules=[
+                {'filename': 'a.dll', 'missing_symbols': False},
+                {'filename': 'b.dll', 'missing_symbols': True},
+            ]
+        )
+        mocked_subprocess_handle.stdout.read.return_value = ujson.dumps(
+            missing_symbols_output
+        )
+        config.symbols_version = '3'
+        rule = BreakpadStackwalkerRule2015(config)
+        for i in range(2):
+            processed_crash = DotDict()
+            rule.act(
+                copy.copy(canonical_standard_raw_crash),
+                {config.dump_field: dumps['a']},
+                processed_crash,
+                self.get_basic_processor_meta()
+            )
+            eq_(processed_crash.json_dump, missing_symbols_output)
+        eq_(mocked_subprocess_module.Popen.call_count, 7)
+
 #==============================================================================
 class TestJitCrashCategorizeRule(TestCase):
 
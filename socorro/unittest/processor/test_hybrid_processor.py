@@ -5,7 +5,7 @@
 import copy
 
 import mock
-from nose.tools import eq_, ok_
+from nose.tools import eq_, ok_, assert_raises
 
 from datetime import datetime
 
@@ -13,6 +13,7 @@ from configman.dotdict import DotDict
 
 from socorro.processor.hybrid_processor import (
   HybridCrashProcessor,
+  StackwalkerOutput,
   create_symbol_path_str
 )
 from socorro.lib.datetimeutil import datetimeFromISOdateString, UTC
@@ -885,11 +886,10 @@ class TestHybridProcessor(TestCase):
                 eq_(processor_notes, [])
 
     def test_do_breakpad_stack_dump_analysis(self):
-        m_iter = mock.MagicMock()
-        m_iter.return_value = m_iter
-        m_iter.__iter__.return_value = iter([str(x) for x in xrange(10)])
-        m_iter.cache = ['a', 'b', 'c']
-        m_iter.theIterator = mock.Mock()
+        m_iter = StackwalkerOutput(
+            ''.join('%d\n' % x for x in xrange(10)) +
+            '====PIPE DUMP ENDS===\n'
+        )
 
         m_subprocess = mock.MagicMock()
         m_subprocess.wait = mock.MagicMock(return_value=124)
@@ -956,7 +956,7 @@ class TestHybridProcessor(TestCase):
                 e_pcu = DotDict({
                   'os_name': 'Windows NT',
                   'success': False,
-                  'dump': 'a\nb\nc\n',
+                  'dump': '0\n1\n2\n3\n4\n5\n6\n7\n8\n9\n',
                   'truncated': False,
                   'crashedThread': 17,
                   'signature': 'signature',
@@ -1242,34 +1242,48 @@ class TestHybridProcessor(TestCase):
                     processor_notes
                 )
 
-    def test_create_pipe_dump_entry(self):
-        # case where there are line feeds on the end of the lines
-        t1 = [
-            'a\n',
-            'b\n',
-            'c\n',
-            '\n',
-            'e\n',
-            'f\n',
-        ]
-        eq_(
-            'a\nb\nc\n\ne\nf\n',
-            HybridCrashProcessor._create_pipe_dump_entry(t1)
+    def test_stackwalker_output(self):
+        # the pipe dump, the sentinel and a json dump
+        output = StackwalkerOutput(
+            'OS|Windows NT|6.1\n'
+            '\n'
+            '0|0|a.dll|f|||0x1\n'
+            '====PIPE DUMP ENDS===\n'
+            '{"status": "OK",\n'
+            ' "threads": []}\n'
         )
-
-        # case where there are no line feeds on the end of the lines
-        t2 = [
-            'a',
-            'b',
-            'c',
-            '',
-            'e',
-            'f',
-        ]
         eq_(
-            'a\nb\nc\n\ne\nf\n',
-            HybridCrashProcessor._create_pipe_dump_entry(t2)
+            list(output),
+            ['OS|Windows NT|6.1', '', '0|0|a.dll|f|||0x1']
         )
+        eq_(output.pipe_dump, 'OS|Windows NT|6.1\n\n0|0|a.dll|f|||0x1\n')
+        eq_(output.json_dump(), {'status': 'OK', 'threads': []})
+
+        # the json dump follows the pipe dump without a sentinel
+        output = StackwalkerOutput('a\nb\n{"status": "OK"}')
+        eq_(output.next(), 'a')
+        # like a file, a second loop continues where the first stopped
+        eq_(list(output), ['b'])
+        eq_(output.pipe_dump, 'a\nb\n')
+        eq_(output.json_dump(), {'status': 'OK'})
+
+        # no linefeed at the end and no json dump
+        output = StackwalkerOutput('a\nb\nc')
+        eq_(list(output), ['a', 'b', 'c'])
+        eq_(output.pipe_dump, 'a\nb\nc\n')
+        assert_raises(ValueError, output.json_dump)
+
+        # nothing at all
+        output = StackwalkerOutput('')
+        eq_(list(output), [])
+        eq_(output.pipe_dump, '\n')
+        assert_raises(ValueError, output.json_dump)
+
+        # broken json
+        output = StackwalkerOutput('a\n{"status": \n')
+        assert_raises(ValueError, output.json_dump)
+        output = StackwalkerOutput('a\n{"status": "OK"} trailing\n')
+        assert_raises(ValueError, output.json_dump)
 
     def test_temp_file_context(self):
         config = setup_config_with_mocks()
@@ -8,12 +8,13 @@ import copy
 from datetime import datetime
 
 from configman.dotdict import DotDict
-from nose.tools import eq_, ok_
+from nose.tools import eq_, ok_, assert_raises
 
 from socorro.processor.legacy_processor import (
   LegacyCrashProcessor,
   create_symbol_path_str
 )
+from socorro.processor.breakpad_pipe_to_json import LazyJsonDump
 from socorro.lib.datetimeutil import datetimeFromISOdateString, UTC
 from socorro.unittest.testbase import TestCase
 
@@ -494,6 +495,79 @@ class TestLegacyProcessor(TestCase):
                 )
 
 
+    def test_process_crash_json_dump_conversion_notes(self):
+        config = setup_config_with_mocks()
+        mocked_transform_rules_str = \
+            'socorro.processor.legacy_processor.TransformRuleSystem'
+        mocked_conversion_str = \
+            'socorro.processor.breakpad_pipe_to_json.pipe_dump_to_json_dump'
+        with mock.patch(mocked_transform_rules_str) as m_transform_class:
+            m_transform = mock.Mock()
+            m_transform_class.return_value = m_transform
+            with mock.patch(mocked_conversion_str) as m_conversion:
+                m_conversion.side_effect = ValueError('bad pipe dump')
+
+                raw_crash = DotDict()
+                raw_crash.uuid = '3bc4bcaa-b61d-4d1f-85ae-30cb32120504'
+                raw_crash.submitted_timestamp = '2012-05-04T15:33:33'
+                raw_dump = {'upload_file_minidump': '/some/path/x.dump'}
+
+                conversion_note = (
+                    "Conversion to json dump format has failed for "
+                    "'upload_file_minidump'"
+                )
+                # (save_mdsw_json, a classifier reads the json_dump,
+                #  conversions, the failure is noted)
+                for save, read, conversions, noted in (
+                    (False, False, 0, False),
+                    (False, True, 1, True),
+                    (True, False, 1, True),
+                ):
+                    config.save_mdsw_json = save
+                    m_conversion.reset_mock()
+                    leg_proc = LegacyCrashProcessor(
+                        config,
+                        config.mock_quit_fn
+                    )
+                    leg_proc._log_job_start = mock.Mock()
+                    basic_processed_crash = DotDict()
+                    basic_processed_crash.uuid = raw_crash.uuid
+                    basic_processed_crash.hang_type = 0
+                    basic_processed_crash.java_stack_trace = None
+                    leg_proc._create_basic_processed_crash = mock.Mock(
+                        return_value=basic_processed_crash
+                    )
+                    leg_proc._log_job_end = mock.Mock()
+                    processed_crash_update_dict = DotDict()
+                    processed_crash_update_dict.success = True
+                    processed_crash_update_dict.dump = 'not|a|pipe|dump'
+                    leg_proc._do_breakpad_stack_dump_analysis = mock.Mock(
+                        return_value=processed_crash_update_dict
+                    )
+                    leg_proc._cleanup_temp_file = mock.Mock()
+
+                    def classify(raw_crash, processed_crash, processor):
+                        if read:
+                            processed_crash.json_dump.threads
+                    m_transform.apply_until_action_succeeds.side_effect = \
+                        classify
+
+                    processed_crash = leg_proc.process_crash(
+                        raw_crash,
+                        raw_dump,
+                        {}
+                    )
+
+                    # a json_dump that is dropped unread is never converted,
+                    # so a pipe dump it could not be converted from goes
+                    # unnoticed
+                    eq_(m_conversion.call_count, conversions)
+                    eq_(
+                        conversion_note in processed_crash.processor_notes,
+                        noted
+                    )
+                    ok_('json_dump' not in processed_crash)
+
     def test_create_basic_processed_crash_normal(self):
         config = setup_config_with_mocks()
         config.collect_addon = False
@@ -863,6 +937,78 @@ class TestLegacyProcessor(TestCase):
                 )
                 eq_(processor_notes, [])
 
+    def test_materialize_json_dump(self):
+        config = setup_config_with_mocks()
+        mocked_transform_rules_str = \
+            'socorro.processor.legacy_processor.TransformRuleSystem'
+        with mock.patch(mocked_transform_rules_str):
+            leg_proc = LegacyCrashProcessor(config, config.mock_quit_fn)
+
+            processor_notes = []
+            dump_analysis = DotDict()
+            dump_analysis.json_dump = LazyJsonDump(
+                'OS|Windows NT|6.1\n0|0|xul.dll|f|||0x12'
+            )
+            leg_proc._materialize_json_dump(
+                dump_analysis,
+                'upload_file_minidump',
+                processor_notes
+            )
+            ok_(not isinstance(dump_analysis.json_dump, LazyJsonDump))
+            eq_(dump_analysis.json_dump.system_info.os, 'Windows NT')
+            eq_(dump_analysis.json_dump.thread_count, 1)
+            eq_(processor_notes, [])
+
+            # a json_dump that can't be converted is removed
+            dump_analysis.json_dump = LazyJsonDump(None)
+            leg_proc._materialize_json_dump(
+                dump_analysis,
+                'upload_file_minidump',
+                processor_notes
+            )
+            ok_('json_dump' not in dump_analysis)
+            eq_(
+                processor_notes,
+                [
+                    "Conversion to json dump format has failed for "
+                    "'upload_file_minidump'"
+                ]
+            )
+
+            # a json_dump that is not kept is not converted just to be
+            # dropped
+            processor_notes = []
+            dump_analysis.json_dump = LazyJsonDump(None)
+            leg_proc._materialize_json_dump(
+                dump_analysis,
+                'upload_file_minidump',
+                processor_notes,
+                keep=False
+            )
+            ok_('json_dump' not in dump_analysis)
+            eq_(processor_notes, [])
+
+            # but if reading it has failed, the failure is noted all the same
+            dump_analysis.json_dump = LazyJsonDump(None)
+            assert_raises(
+                AttributeError,
+                lambda: dump_analysis.json_dump.threads
+            )
+            leg_proc._materialize_json_dump(
+                dump_analysis,
+                'upload_file_minidump',
+                processor_notes,
+                keep=False
+            )
+            ok_('json_dump' not in dump_analysis)
+            eq_(
+                processor_notes,
+                [
+                    "Conversion to json dump format has failed for "
+                    "'upload_file_minidump'"
+                ]
+            )
+
     def test_do_breakpad_stack_dump_analysis(self):
         m_iter = mock.MagicMock()
         m_iter.return_value = m_iter
@@ -3,7 +3,13 @@
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 import copy
+import gzip
+import json
+import os
 import re
+import shutil
+import tempfile
+from collections import OrderedDict
 
 from mock import Mock, patch, call
 from nose.tools import eq_, ok_
@@ -970,6 +976,11 @@ class TestOutOfMemoryBinaryRule(TestCase):
         config = CDotDict()
         config.logger = Mock()
         config.chatty = False
+        config.summarize_memory_report = False
+        config.max_full_memory_report_size = 10 * 1024 * 1024
+        config.max_memory_report_size = 200 * 1024 * 1024
+        config.memory_report_top_n = 20
+        config.memory_report_prefix_depth = 2
 
         return config
 
@@ -1077,7 +1088,12 @@ class TestOutOfMemoryBinaryRule(TestCase):
 
         class MyOutOfMemoryBinaryRule(OutOfMemoryBinaryRule):
                 @staticmethod
-                def _extract_memory_info(dump_pathname, processor_notes):
+                def _extract_memory_info(
+                    dump_pathname,
+                    processor_notes,
+                    max_size=None,
+                    summary_options=None
+                ):
                     eq_(dump_pathname, raw_dumps['memory_report'])
                     eq_(processor_notes, [])
                     return 'mysterious-awesome-memory'
@@ -1110,6 +1126,234 @@ class TestOutOfMemoryBinaryRule(TestCase):
 
         ok_('memory_report' not in processed_crash)
 
+    #--------------------------------------------------------------------------
+    def _write_memory_report(self, memory_report):
+        pathname = os.path.join(self.tempdir, 'memory_report.json.gz')
+        f = gzip.open(pathname, 'wb')
+        try:
+            json.dump(memory_report, f)
+        finally:
+            f.close()
+        return pathname
+
+    #--------------------------------------------------------------------------
+    def _get_memory_report(self, n_reports=50):
+        reports = [
+            {
+                'process': 'Main Process (pid %d)' % (i % 2),
+                'path': 'explicit/%s/thing-%d' % (
+                    ('js', 'images', 'heap')[i % 3],
+                    i
+                ),
+                'kind': 1,
+                'units': 0,
+                'amount': i * 1000,
+                'description': 'a description with a ] and a , in it ' * 20,
+            }
+            for i in range(n_reports)
+        ]
+        reports.append({
+            'process': 'Main Process (pid 0)',
+            'path': 'page-faults-hard',
+            'kind': 2,
+            'units': 2,
+            'amount': 999999999,
+            'description': 'not bytes',
+        })
+        # the reports are written after the header, as Firefox does
+        return OrderedDict([
+            ('version', 1),
+            ('hasMozMallocUsableSize', True),
+            ('reports', reports),
+        ])
+
+    #--------------------------------------------------------------------------
+    def test_summarize_memory_info(self):
+        self.tempdir = tempfile.mkdtemp()
+        try:
+            memory_report = self._get_memory_report()
+            pathname = self._write_memory_report(memory_report)
+            processor_notes = []
+
+            with patch.object(OutOfMemoryBinaryRule, '_report_chunk_size', 97):
+                summary = OutOfMemoryBinaryRule._summarize_memory_info(
+                    pathname,
+                    processor_notes,
+                    top_n=3,
+                    prefix_depth=2
+                )
+
+            eq_(processor_notes, [])
+            eq_(summary['version'], 1)
+            eq_(summary['hasMozMallocUsableSize'], True)
+            eq_(summary['report_count'], 51)
+            ok_(not summary['truncated'])
+            eq_(
+                [x['path'] for x in summary['top_reporters']],
+                [
+                    'explicit/images/thing-49',
+                    'explicit/js/thing-48',
+                    'explicit/heap/thing-47',
+                ]
+            )
+            expected_totals = {}
+            for report in memory_report['reports'][:-1]:
+                prefix = '/'.join(report['path'].split('/')[:2])
+                expected_totals[prefix] = (
+                    expected_totals.get(prefix, 0) + report['amount']
+                )
+            eq_(summary['totals_by_path_prefix'], expected_totals)
+        finally:
+            shutil.rmtree(self.tempdir)
+
+    #--------------------------------------------------------------------------
+    def test_summarize_memory_info_truncated(self):
+        self.tempdir = tempfile.mkdtemp()
+        try:
+            pathname = self._write_memory_report(
+                self._get_memory_report(n_reports=500)
+            )
+            processor_notes = []
+
+            summary = OutOfMemoryBinaryRule._summarize_memory_info(
+                pathname,
+                processor_notes,
+                max_size=100000
+            )
+
+            ok_(summary['truncated'])
+            ok_(0 < summary['report_count'] < 500)
+            eq_(len(processor_notes), 1)
+        finally:
+            shutil.rmtree(self.tempdir)
+
+    #--------------------------------------------------------------------------
+    def test_summarize_memory_info_with_json_trouble(self):
+        self.tempdir = tempfile.mkdtemp()
+        try:
+            pathname = os.path.join(self.tempdir, 'memory_report.json.gz')
+            f = gzip.open(pathname, 'wb')
+            f.write('{"version": 1, "reports": [{"amount": 1}, {"amo')
+            f.close()
+            processor_notes = []
+
+            summary = OutOfMemoryBinaryRule._summarize_memory_info(
+                pathname,
+                processor_notes
+            )
+
+            ok_('ERROR' in summary)
+            eq_(len(processor_notes), 1)
+        finally:
+            shutil.rmtree(self.tempdir)
+
+    #--------------------------------------------------------------------------
+    def test_large_reports_are_summarized(self):
+        config = self.get_basic_config()
+        config.summarize_memory_report = False
+        config.max_full_memory_report_size = 1000
+        config.max_memory_report_size = 1000000
+        config.memory_report_top_n = 5
+        config.memory_report_prefix_depth = 2
+        self.tempdir = tempfile.mkdtemp()
+        try:
+            pathname = self._write_memory_report(self._get_memory_report())
+            raw_crash = copy.copy(canonical_standard_raw_crash)
+            raw_dumps = {'memory_report': pathname}
+            processed_crash = DotDict()
+            processor_meta = self.get_basic_processor_meta()
+
+            rule = OutOfMemoryBinaryRule(config)
+            rule.act(raw_crash, raw_dumps, processed_crash, processor_meta)
+
+            ok_(processed_crash.memory_report['summary'])
+            eq_(len(processed_crash.memory_report['top_reporters']), 5)
+            eq_(
+                processed_crash.memory_report['full_report_dump_name'],
+                'memory_report'
+            )
+        finally:
+            shutil.rmtree(self.tempdir)
+
+    #--------------------------------------------------------------------------
+    def test_reports_are_decompressed_once(self):
+        config = self.get_basic_config()
+        config.summarize_memory_report = False
+        config.max_memory_report_size = 1000000
+        config.memory_report_top_n = 5
+        config.memory_report_prefix_depth = 2
+        self.tempdir = tempfile.mkdtemp()
+        try:
+            memory_report = self._get_memory_report()
+            pathname = self._write_memory_report(memory_report)
+            raw_crash = copy.copy(canonical_standard_raw_crash)
+            raw_dumps = {'memory_report': pathname}
+            rule = OutOfMemoryBinaryRule(config)
+
+            for max_full_size, summarized in ((1000000, False), (1000, True)):
+                config.max_full_memory_report_size = max_full_size
+                processed_crash = DotDict()
+                with patch(
+                    'socorro.processor.mozilla_transform_rules.gzip_open',
+                    wraps=gzip.open
+                ) as mocked_gzip_open:
+                    with patch(
+                        'socorro.processor.mozilla_transform_rules'
+                        '.temp_file_context'
+                    ):
+                        rule.act(
+                            raw_crash,
+                            raw_dumps,
+                            processed_crash,
+                            self.get_basic_processor_meta()
+                        )
+                eq_(mocked_gzip_open.call_count, 1)
+                eq_('summary' in processed_crash.memory_report, summarized)
+            eq_(processed_crash.memory_report['report_count'], 51)
+        finally:
+            shutil.rmtree(self.tempdir)
+
+    #--------------------------------------------------------------------------
+    def test_read_at_most(self):
+        self.tempdir = tempfile.mkdtemp()
+        try:
+            pathname = os.path.join(self.tempdir, 'memory_report.json.gz')
+            f = gzip.open(pathname, 'wb')
+            try:
+                f.write('x' * 100000)
+            finally:
+                f.close()
+            with patch.object(OutOfMemoryBinaryRule, '_report_chunk_size', 97):
+                f = gzip.open(pathname, 'rb')
+                try:
+                    head = OutOfMemoryBinaryRule._read_at_most(f, 1000)
+                finally:
+                    f.close()
+            ok_(1000 < len(head) <= 1097)
+            f = gzip.open(pathname, 'rb')
+            try:
+                head = OutOfMemoryBinaryRule._read_at_most(f, 100000)
+                eq_(len(head), 100000)
+            finally:
+                f.close()
+
+            # the size in the trailer is not trusted, it is modulo 4GB
+            f = gzip.open(pathname, 'wb')
+            try:
+                f.write(os.urandom(200000))
+            finally:
+                f.close()
+            with open(pathname, 'r+b') as f:
+                f.seek(-4, 2)
+                f.write('\x01\x00\x00\x00')
+            f = gzip.open(pathname, 'rb')
+            try:
+                ok_(len(OutOfMemoryBinaryRule._read_at_most(f, 1000)) > 1000)
+            finally:
+                f.close()
+        finally:
+            shutil.rmtree(self.tempdir)
+
 
 #==============================================================================
 class TestProductRewrite(TestCase):
@@ -1857,13 +2101,7 @@ class TestMissingSymbols(TestCase):
         return processor_meta
 
     #--------------------------------------------------------------------------
-    def test_everything_we_hoped_for(self):
-        config = self.get_basic_config()
-        config.database_class = Mock()
-        config.transaction_executor_class = Mock()
-
-        raw_crash = copy.copy(canonical_standard_raw_crash)
-        raw_dumps = {}
+    def get_processed_crash(self):
         processed_crash = DotDict()
         processed_crash.date_processed = '2014-12-31'
         processed_crash.json_dump = {
@@ -1885,45 +2123,79 @@ class TestMissingSymbols(TestCase):
                 },
             ]
         }
+        return processed_crash
+
+    #--------------------------------------------------------------------------
+    def test_everything_we_hoped_for(self):
+        config = self.get_basic_config()
+        config.database_class = Mock()
+        config.transaction_executor_class = Mock()
+        config.batch_size = 500
+        config.flush_interval = 60
+
+        raw_crash = copy.copy(canonical_standard_raw_crash)
+        raw_dumps = {}
+        processed_crash = self.get_processed_crash()
 
         processor_meta = self.get_basic_processor_meta()
 
         rule = MissingSymbolsRule(config)
 
-        expected_sql = rule.sql % '20141229'
-
         # the call to be tested
         rule.act(raw_crash, raw_dumps, processed_crash, processor_meta)
+        # nothing is written until the batch is full or the rule is closed
+        eq_(config.transaction_executor_class.return_value.call_count, 0)
+
+        # make sure it works a second time, the duplicates are dropped
+        rule.act(raw_crash, raw_dumps, processed_crash, processor_meta)
+        eq_(config.transaction_executor_class.return_value.call_count, 0)
+        eq_(rule.seen_count, 4)
+        eq_(rule.duplicate_count, 2)
+
+        rule.close()
 
         from socorro.external.postgresql.dbapi2_util import execute_no_results
-        eq_(config.transaction_executor_class.return_value.call_count, 2)
-        expected_execute_args = [
-            call(execute_no_results, expected_sql,
-                ('2014-12-31', 'some-file.pdb', 'ABCDEFG')),
-            call(execute_no_results, expected_sql,
-                ('2014-12-31', 'yet-another-file.pdb', 'CDEFGHI'))
-        ]
-        config.transaction_executor_class.return_value.assert_has_calls(
-                expected_execute_args
+        eq_(config.transaction_executor_class.return_value.call_count, 1)
+        expected_sql = rule.sql % ('20141229', '(%s, %s, %s), (%s, %s, %s)')
+        execute_args = \
+            config.transaction_executor_class.return_value.call_args[0]
+        eq_(execute_args[0], execute_no_results)
+        eq_(execute_args[1], expected_sql)
+        eq_(
+            sorted(zip(*[iter(execute_args[2])] * 3)),
+            [
+                ('2014-12-31', 'some-file.pdb', 'ABCDEFG'),
+                ('2014-12-31', 'yet-another-file.pdb', 'CDEFGHI'),
+            ]
         )
 
-        # make sure it works a second time
-        # the call to be tested
+        # closing again has nothing left to write
+        rule.close()
+        eq_(config.transaction_executor_class.return_value.call_count, 1)
+
+    #--------------------------------------------------------------------------
+    def test_batch_size_triggers_save(self):
+        config = self.get_basic_config()
+        config.database_class = Mock()
+        config.transaction_executor_class = Mock()
+        config.batch_size = 2
+        config.flush_interval = 60
+
+        raw_crash = copy.copy(canonical_standard_raw_crash)
+        raw_dumps = {}
+        processed_crash = self.get_processed_crash()
+        processor_meta = self.get_basic_processor_meta()
+
+        rule = MissingSymbolsRule(config)
         rule.act(raw_crash, raw_dumps, processed_crash, processor_meta)
-        eq_(config.transaction_executor_class.return_value.call_count, 4)
-        expected_execute_args = [
-            call(execute_no_results, expected_sql,
-                ('2014-12-31', 'some-file.pdb', 'ABCDEFG')),
-            call(execute_no_results, expected_sql,
-                ('2014-12-31', 'yet-another-file.pdb', 'CDEFGHI')),
-            call(execute_no_results, expected_sql,
-                ('2014-12-31', 'some-file.pdb', 'ABCDEFG')),
-            call(execute_no_results, expected_sql,
-                ('2014-12-31', 'yet-another-file.pdb', 'CDEFGHI')),
-        ]
-        config.transaction_executor_class.return_value.assert_has_calls(
-                expected_execute_args
-        )
+        eq_(config.transaction_executor_class.return_value.call_count, 1)
+
+        processed_crash.date_processed = '2015-01-07'
+        rule.act(raw_crash, raw_dumps, processed_crash, processor_meta)
+        eq_(config.transaction_executor_class.return_value.call_count, 2)
+        execute_args = \
+            config.transaction_executor_class.return_value.call_args[0]
+        ok_('missing_symbols_20150105' in execute_args[1])
 
 
 #==============================================================================
@@ -1959,11 +2231,13 @@ class TestBetaVersion(TestCase):
 
         transaction = Mock()
         config.transaction_executor_class.return_value = transaction
+        transaction.return_value = (
+            ('WaterWolf', '3.0', 'beta', 20001001101010, '3.0b1'),
+        )
 
         rule = BetaVersionRule(config)
 
         # A normal beta crash, with a know version.
-        transaction.return_value = (('3.0b1',),)
         processed_crash.version = '3.0'
         processed_crash.release_channel = 'beta'
         processed_crash.build = 20001001101010
@@ -1971,9 +2245,12 @@ class TestBetaVersion(TestCase):
         rule.act(raw_crash, raw_dumps, processed_crash, processor_meta)
         eq_(processed_crash['version'], '3.0b1')
         eq_(len(processor_meta.processor_notes), 0)
+        # the whole index was loaded once, from now on misses are looked up
+        # individually and are not found
+        eq_(transaction.call_count, 1)
+        transaction.return_value = ()
 
         # A release crash, version won't get changed.
-        transaction.return_value = tuple()
         processed_crash.version = '2.0'
         processed_crash.release_channel = 'release'
         processed_crash.build = 20000801101010
@@ -1983,7 +2260,6 @@ class TestBetaVersion(TestCase):
         eq_(len(processor_meta.processor_notes), 0)
 
         # An unkwown version.
-        transaction.return_value = tuple()
         processed_crash.version = '5.0a1'
         processed_crash.release_channel = 'nightly'
         processed_crash.build = 20000105101010
@@ -1993,7 +2269,6 @@ class TestBetaVersion(TestCase):
         eq_(len(processor_meta.processor_notes), 0)
 
         # An incorrect build id.
-        transaction.return_value = tuple()
         processed_crash.version = '5.0'
         processed_crash.release_channel = 'beta'
         processed_crash.build = '",381,,"'
@@ -2003,7 +2278,6 @@ class TestBetaVersion(TestCase):
         eq_(len(processor_meta.processor_notes), 1)
 
         # A beta crash with an unknown version, gets a special mark.
-        transaction.return_value = tuple()
         processed_crash.version = '3.0'
         processed_crash.release_channel = 'beta'
         processed_crash.build = 20000101101011
@@ -2011,3 +2285,10 @@ class TestBetaVersion(TestCase):
         rule.act(raw_crash, raw_dumps, processed_crash, processor_meta)
         eq_(processed_crash['version'], '3.0b0')
         eq_(len(processor_meta.processor_notes), 2)
+        eq_(transaction.call_count, 2)
+
+        # the miss is remembered
+        processed_crash.version = '3.0'
+        rule.act(raw_crash, raw_dumps, processed_crash, processor_meta)
+        eq_(processed_crash['version'], '3.0b0')
+        eq_(transaction.call_count, 2)
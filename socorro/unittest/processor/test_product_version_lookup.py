@@ -0,0 +1,203 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+from mock import Mock, patch
+from nose.tools import eq_, ok_
+
+from socorro.lib.util import DotDict
+from socorro.processor.product_version_lookup import (
+    ProductVersionLookup,
+    get_product_version_lookup,
+)
+from socorro.unittest.testbase import TestCase
+
+
+#==============================================================================
+class TestProductVersionLookup(TestCase):
+
+    #--------------------------------------------------------------------------
+    def get_basic_config(self):
+        config = DotDict()
+        config.logger = Mock()
+        config.database_class = Mock()
+        config.transaction_executor_class = Mock()
+        return config
+
+    #--------------------------------------------------------------------------
+    def test_get_version_string(self):
+        config = self.get_basic_config()
+        transaction = config.transaction_executor_class.return_value
+        transaction.return_value = (
+            ('WaterWolf', '3.0', 'Beta', 20001001101010, '3.0b1'),
+            ('WaterWolf', '3.0', 'beta', 20001002101010, '3.0b2'),
+        )
+        lookup = ProductVersionLookup(config)
+
+        eq_(
+            lookup.get_version_string('waterwolf', '3.0', 'beta',
+                                      20001001101010),
+            '3.0b1'
+        )
+        eq_(
+            lookup.get_version_string('WaterWolf', '3.0', 'BETA',
+                                      '20001002101010'),
+            '3.0b2'
+        )
+        eq_(
+            lookup.get_version_string('WaterWolf', '3.0', 'beta', None),
+            None
+        )
+        eq_(transaction.call_count, 1)
+        eq_(lookup.stats()['hits'], 2)
+
+    #--------------------------------------------------------------------------
+    @patch('socorro.processor.product_version_lookup.time')
+    def test_misses_and_refresh(self, mocked_time):
+        config = self.get_basic_config()
+        transaction = config.transaction_executor_class.return_value
+        transaction.return_value = (
+            ('WaterWolf', '3.0', 'beta', 20001001101010, '3.0b1'),
+        )
+        mocked_time.time.return_value = 1000
+        lookup = ProductVersionLookup(
+            config,
+            refresh_interval=600,
+            negative_cache_ttl=60
+        )
+
+        eq_(
+            lookup.get_version_string('WaterWolf', '3.0', 'beta',
+                                      20001001101010),
+            '3.0b1'
+        )
+        transaction.return_value = ()
+        eq_(lookup.get_version_string('WaterWolf', '3.0', 'beta', 2), None)
+        # the negative cache keeps repeated misses off the database
+        eq_(lookup.get_version_string('WaterWolf', '3.0', 'beta', 2), None)
+        eq_(transaction.call_count, 2)
+        eq_(lookup.stats()['misses'], 1)
+        eq_(lookup.stats()['negative_hits'], 1)
+
+        # once the ttl has passed, a miss looks for the build alone, which
+        # finds builds registered late with a lower build_id too
+        transaction.return_value = (('3.0b0',),)
+        mocked_time.time.return_value = 1100
+        eq_(lookup.get_version_string('WaterWolf', '3.0', 'beta', 2), '3.0b0')
+        eq_(transaction.call_count, 3)
+        eq_(
+            transaction.call_args[0][2],
+            {
+                'product': 'WaterWolf',
+                'version': '3.0',
+                'build_type': 'beta',
+                'build_id': 2,
+            }
+        )
+        eq_(lookup.get_version_string('WaterWolf', '3.0', 'beta', 2), '3.0b0')
+        eq_(transaction.call_count, 3)
+
+        # the regular refresh interval is incremental
+        transaction.return_value = (
+            ('WaterWolf', '4.0', 'beta', 20001101101010, '4.0b1'),
+        )
+        mocked_time.time.return_value = 1800
+        eq_(
+            lookup.get_version_string('WaterWolf', '4.0', 'beta',
+                                      20001101101010),
+            '4.0b1'
+        )
+        eq_(transaction.call_count, 4)
+        eq_(
+            transaction.call_args[0][2],
+            {'since_build_id': 20001001101010}
+        )
+        # earlier entries survive an incremental refresh
+        eq_(
+            lookup.get_version_string('WaterWolf', '3.0', 'beta',
+                                      20001001101010),
+            '3.0b1'
+        )
+        eq_(lookup.stats()['refreshes'], 2)
+
+    #--------------------------------------------------------------------------
+    def test_get_product_id_map(self):
+        config = self.get_basic_config()
+        transaction = config.transaction_executor_class.return_value
+        transaction.return_value = (
+            ('FennecAndroid', '{aa}', True),
+        )
+        lookup = ProductVersionLookup(config)
+
+        expected = {'{aa}': {'product_name': 'FennecAndroid', 'rewrite': True}}
+        eq_(lookup.get_product_id_map(), expected)
+        eq_(lookup.get_product_id_map(), expected)
+        eq_(transaction.call_count, 1)
+
+    #--------------------------------------------------------------------------
+    def test_get_product_version_lookup_is_shared(self):
+        config = self.get_basic_config()
+        other_config = self.get_basic_config()
+
+        lookup = get_product_version_lookup(config)
+        ok_(get_product_version_lookup(config) is lookup)
+        ok_(get_product_version_lookup(other_config) is not lookup)
+
+        # the same classes talking to another database get their own index
+        config.database_name = 'breakpad'
+        other_database_config = DotDict(config)
+        other_database_config.database_name = 'other'
+        lookup = get_product_version_lookup(config)
+        ok_(get_product_version_lookup(other_database_config) is not lookup)
+        ok_(get_product_version_lookup(DotDict(config)) is lookup)
+
+    #--------------------------------------------------------------------------
+    def test_queries_run_without_the_lock(self):
+        config = self.get_basic_config()
+        transaction = config.transaction_executor_class.return_value
+        lookup = ProductVersionLookup(config)
+
+        def query(function, sql, parameters=None):
+            # another thread could use the index during the query
+            ok_(lookup._lock.acquire(False))
+            lookup._lock.release()
+            if parameters and 'since_build_id' in parameters:
+                return (
+                    ('WaterWolf', '3.0', 'beta', 20001001101010, '3.0b1'),
+                )
+            return ()
+        transaction.side_effect = query
+
+        eq_(
+            lookup.get_version_string('WaterWolf', '3.0', 'beta',
+                                      20001001101010),
+            '3.0b1'
+        )
+        eq_(lookup.get_version_string('WaterWolf', '3.0', 'beta', 2), None)
+        eq_(lookup.get_product_id_map(), {})
+        eq_(transaction.call_count, 3)
+        ok_(not lookup._refreshing)
+
+    #--------------------------------------------------------------------------
+    def test_failed_refresh_is_retried(self):
+        config = self.get_basic_config()
+        transaction = config.transaction_executor_class.return_value
+        transaction.side_effect = Exception('database down')
+        lookup = ProductVersionLookup(config)
+
+        self.assertRaises(
+            Exception,
+            lookup.get_version_string,
+            'WaterWolf', '3.0', 'beta', 20001001101010
+        )
+        ok_(not lookup._refreshing)
+
+        transaction.side_effect = None
+        transaction.return_value = (
+            ('WaterWolf', '3.0', 'beta', 20001001101010, '3.0b1'),
+        )
+        eq_(
+            lookup.get_version_string('WaterWolf', '3.0', 'beta',
+                                      20001001101010),
+            '3.0b1'
+        )
@@ -3,6 +3,7 @@
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 import copy
+import mock
 
 from nose.tools import eq_, ok_
 
@@ -148,6 +149,33 @@ class TestSkunkClassificationRule(TestCase):
         )
         ok_('normalized' in stack[0])
 
+    def test_normalized_signature(self):
+        a_frame = DotDict({
+            "frame": 0,
+            "module": "lars_crash.dll",
+            "function": "ha_ha",
+            "file": "no source",
+            "line": 0,
+        })
+        signature_tool = mock.Mock()
+        signature_tool.normalize_signature.return_value = 'ha_ha'
+
+        skunk_rule = SkunkClassificationRule()
+        eq_(
+            skunk_rule._normalized_signature(
+                a_frame,
+                signature_tool,
+                cache_normalizations=False
+            ),
+            'ha_ha'
+        )
+        ok_('normalized' not in a_frame)
+        eq_(skunk_rule._normalized_signature(a_frame, signature_tool), 'ha_ha')
+        eq_(a_frame.normalized, 'ha_ha')
+        eq_(skunk_rule._normalized_signature(a_frame, signature_tool), 'ha_ha')
+        # once cached, the frame is not normalized again
+        eq_(signature_tool.normalize_signature.call_count, 2)
+
 
 class TestDontConsiderTheseFilter(TestCase):
 
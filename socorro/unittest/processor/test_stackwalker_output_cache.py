@@ -0,0 +1,102 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+from mock import Mock
+from nose.tools import eq_, ok_
+
+from socorro.processor.stackwalker_output_cache import (
+    StackwalkerOutputCache,
+    file_digest,
+)
+from socorro.unittest.testbase import TestCase
+
+
+#==============================================================================
+class TestStackwalkerOutputCache(TestCase):
+
+    def setUp(self):
+        super(TestStackwalkerOutputCache, self).setUp()
+        self.tempdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tempdir, 'cache')
+
+    def tearDown(self):
+        super(TestStackwalkerOutputCache, self).tearDown()
+        shutil.rmtree(self.tempdir)
+
+    def _key(self, i):
+        return hashlib.sha256(str(i)).hexdigest()
+
+    def test_file_digest(self):
+        pathname = os.path.join(self.tempdir, 'a.dump')
+        with open(pathname, 'wb') as f:
+            f.write('MDMP' * 1000)
+        eq_(
+            file_digest(pathname, block_size=7),
+            hashlib.sha256('MDMP' * 1000).hexdigest()
+        )
+
+    def test_get_and_put(self):
+        logger = Mock()
+        cache = StackwalkerOutputCache(self.path, 1000000, logger)
+        key = self._key(1)
+        eq_(cache.get(key), None)
+        cache.put(key, {'status': 'OK', 'threads': [1, 2]})
+        eq_(cache.get(key), {'status': 'OK', 'threads': [1, 2]})
+        ok_(os.path.isfile(os.path.join(self.path, key[:2], key + '.json')))
+
+        # another process sharing the directory sees the entry
+        other = StackwalkerOutputCache(self.path, 1000000, logger)
+        eq_(other.get(key), {'status': 'OK', 'threads': [1, 2]})
+        eq_(logger.warning.call_count, 0)
+
+    def test_corrupt_entry(self):
+        logger = Mock()
+        cache = StackwalkerOutputCache(self.path, 1000000, logger)
+        key = self._key(1)
+        cache.put(key, {'status': 'OK'})
+        with open(os.path.join(self.path, key[:2], key + '.json'), 'w') as f:
+            f.write('{"stat')
+        eq_(cache.get(key), None)
+        eq_(logger.warning.call_count, 1)
+
+    def test_least_recently_used_are_evicted(self):
+        cache = StackwalkerOutputCache(self.path, 1000, Mock())
+        output = {'frames': 'x' * 80}
+        now = time.time()
+        for i in range(10):
+            cache.put(self._key(i), output)
+            # give every entry its own distinct age
+            os.utime(
+                cache._pathname(self._key(i)),
+                (now - 100 + i, now - 100 + i)
+            )
+        # reading the oldest entry makes it the most recently used
+        ok_(cache.get(self._key(0)))
+
+        cache.put(self._key(10), output)
+        total_size, entries = cache._scan()
+        ok_(total_size <= 900)
+        ok_(cache.get(self._key(0)))
+        ok_(cache.get(self._key(10)))
+        eq_(cache.get(self._key(1)), None)
+        eq_(cache.get(self._key(2)), None)
+
+    def test_abandoned_temporary_files_are_removed(self):
+        cache = StackwalkerOutputCache(self.path, 1000, Mock())
+        os.makedirs(os.path.join(self.path, 'ab'))
+        stale = os.path.join(self.path, 'ab', 'ab.json.1.2.tmp')
+        fresh = os.path.join(self.path, 'ab', 'ab.json.3.4.tmp')
+        for pathname in (stale, fresh):
+            with open(pathname, 'w') as f:
+                f.write('{')
+        os.utime(stale, (0, 0))
+        eq_(cache._scan(), (0, []))
+        ok_(not os.path.exists(stale))
+        ok_(os.path.exists(fresh))
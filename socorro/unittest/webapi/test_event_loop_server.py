@@ -0,0 +1,284 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import socket
+import threading
+import time
+
+import mock
+import web
+from nose.tools import eq_, ok_
+
+from socorro.lib.util import DotDict
+from socorro.webapi.event_loop_server import (
+    BoundedExecutor,
+    EventLoopHTTPServer,
+)
+from socorro.webapi.servers import EventLoop
+from socorro.unittest.testbase import TestCase
+
+
+#==============================================================================
+class TestBoundedExecutor(TestCase):
+
+    def test_submit_refuses_beyond_max_pending(self):
+        executor = BoundedExecutor(mock.Mock(), 1, 2, mock.Mock())
+        # not started, so nothing is taken off the queue
+        ok_(executor.submit(1))
+        ok_(executor.submit(2))
+        ok_(not executor.submit(3))
+
+    def test_workers_apply_function(self):
+        results = []
+        logger = mock.Mock()
+
+        def function(item):
+            if item == 'bad':
+                raise ValueError(item)
+            results.append(item)
+
+        executor = BoundedExecutor(function, 2, 10, logger)
+        executor.start()
+        for item in ('a', 'bad', 'b'):
+            ok_(executor.submit(item))
+        executor.stop()
+        eq_(sorted(results), ['a', 'b'])
+        eq_(logger.error.call_count, 1)
+        eq_(executor.threads, [])
+
+
+#==============================================================================
+class TestEventLoopHTTPServer(TestCase):
+
+    def setUp(self):
+        super(TestEventLoopHTTPServer, self).setUp()
+        self.requests = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def _application(self, environ, start_response):
+        body = environ['wsgi.input'].read(
+            int(environ.get('CONTENT_LENGTH') or 0)
+        )
+        self.requests.append((
+            threading.current_thread().name,
+            environ['REQUEST_METHOD'],
+            environ['PATH_INFO'],
+            environ['QUERY_STRING'],
+            environ.get('HTTP_X_FANCY'),
+            body,
+        ))
+        self.release.wait()
+        if environ['PATH_INFO'] == '/broken':
+            raise ValueError('broken')
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return ['got ', str(len(body))]
+
+    def _start(self, **kwargs):
+        self.logger = mock.Mock()
+        server = EventLoopHTTPServer(
+            self._application,
+            ('127.0.0.1', 0),
+            self.logger,
+            **kwargs
+        )
+        thread = threading.Thread(
+            target=server.serve_forever,
+            kwargs={'poll_interval': 0.05}
+        )
+        thread.start()
+
+        def stop():
+            self.release.set()
+            server.stop()
+            thread.join()
+
+        self.addCleanup(stop)
+        return server
+
+    def _connect(self, server):
+        connection = socket.create_connection(server.server_address)
+        connection.settimeout(5)
+        self.addCleanup(connection.close)
+        return connection
+
+    def _response(self, connection):
+        chunks = []
+        while True:
+            chunk = connection.recv(8192)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        head, _, body = ''.join(chunks).partition('\r\n\r\n')
+        return head.split('\r\n')[0], body
+
+    def test_get(self):
+        server = self._start()
+        connection = self._connect(server)
+        connection.sendall(
+            'GET /some%20where?a=1 HTTP/1.1\r\n'
+            'Host: localhost\r\n'
+            'X-Fancy: yes\r\n'
+            '\r\n'
+        )
+        eq_(self._response(connection), ('HTTP/1.1 200 OK', 'got 0'))
+        eq_(self.requests[0][1:], ('GET', '/some where', 'a=1', 'yes', ''))
+        ok_(self.requests[0][0].startswith('EventLoopWorker'))
+
+    def test_slow_uploads_do_not_hold_workers(self):
+        server = self._start(worker_threads=1, spool_size=10)
+        body = 'x' * 1000
+        slow = []
+        for i in range(5):
+            connection = self._connect(server)
+            connection.sendall(
+                'POST /submit HTTP/1.1\r\n'
+                'Content-Length: %d\r\n'
+                '\r\n' % len(body)
+            )
+            connection.sendall(body[:100])
+            slow.append(connection)
+
+        # while five uploads are half done, the single worker is free
+        fast = self._connect(server)
+        fast.sendall('GET / HTTP/1.0\r\n\r\n')
+        eq_(self._response(fast), ('HTTP/1.1 200 OK', 'got 0'))
+        eq_(len(self.requests), 1)
+
+        for connection in slow:
+            connection.sendall(body[100:500])
+        for connection in slow:
+            connection.sendall(body[500:])
+            eq_(self._response(connection), ('HTTP/1.1 200 OK', 'got 1000'))
+        eq_([x[-1] for x in self.requests[1:]], [body] * 5)
+
+    def test_saturated_server_refuses(self):
+        self.release.clear()
+        server = self._start(worker_threads=1, max_pending_requests=1)
+        connections = []
+        for i in range(2):
+            connection = self._connect(server)
+            connection.sendall('GET / HTTP/1.0\r\n\r\n')
+            connections.append(connection)
+            # one request with the worker and one waiting for it
+            for j in range(100):
+                if self.requests and server.executor.queue.qsize() == i:
+                    break
+                time.sleep(0.01)
+        refused = self._connect(server)
+        refused.sendall('GET / HTTP/1.0\r\n\r\n')
+        eq_(self._response(refused)[0], 'HTTP/1.1 503 Service Unavailable')
+
+        self.release.set()
+        for connection in connections:
+            eq_(self._response(connection)[0], 'HTTP/1.1 200 OK')
+
+    def test_errors(self):
+        server = self._start(max_request_size=10)
+
+        connection = self._connect(server)
+        connection.sendall('POST / HTTP/1.1\r\nContent-Length: 11\r\n\r\n')
+        eq_(
+            self._response(connection)[0],
+            'HTTP/1.1 413 Request Entity Too Large'
+        )
+
+        connection = self._connect(server)
+        connection.sendall(
+            'POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n'
+        )
+        eq_(self._response(connection)[0], 'HTTP/1.1 411 Length Required')
+
+        connection = self._connect(server)
+        connection.sendall('nonsense\r\n\r\n')
+        eq_(self._response(connection)[0], 'HTTP/1.1 400 Bad Request')
+
+        connection = self._connect(server)
+        connection.sendall('GET /broken HTTP/1.0\r\n\r\n')
+        eq_(
+            self._response(connection),
+            ('HTTP/1.1 500 Internal Server Error', 'Internal Server Error')
+        )
+        eq_(self.logger.error.call_count, 1)
+
+    def test_expect_continue(self):
+        server = self._start()
+        connection = self._connect(server)
+        connection.sendall(
+            'POST / HTTP/1.1\r\n'
+            'Content-Length: 3\r\n'
+            'Expect: 100-continue\r\n'
+            '\r\n'
+        )
+        eq_(connection.recv(8192), 'HTTP/1.1 100 Continue\r\n\r\n')
+        connection.sendall('abc')
+        eq_(self._response(connection), ('HTTP/1.1 200 OK', 'got 3'))
+
+    def test_idle_connections_are_dropped(self):
+        server = self._start(request_timeout=0.1)
+        connection = self._connect(server)
+        connection.sendall('POST / HTTP/1.1\r\nContent-Length: 3\r\n\r\na')
+        eq_(connection.recv(8192), '')
+        eq_(self.requests, [])
+        for i in range(100):
+            if not server.connection_count:
+                break
+            time.sleep(0.01)
+        eq_(server.connection_count, 0)
+
+
+#==============================================================================
+class Echo(object):
+
+    def __init__(self, config):
+        self.config = config
+
+    def POST(self, *args):
+        return '%s %s' % (args[0], web.data())
+
+
+#==============================================================================
+class TestEventLoop(TestCase):
+
+    def test_run_web_py_services(self):
+        config = DotDict()
+        config.logger = mock.Mock()
+        config.web_server = DotDict()
+        config.web_server.ip_address = '127.0.0.1'
+        config.web_server.port = 0
+        config.web_server.worker_threads = 2
+        config.web_server.max_pending_requests = 4
+        config.web_server.max_connections = 10
+        config.web_server.request_timeout = 10
+        config.web_server.max_request_size = 0
+        config.web_server.spool_size = 1024
+
+        web_server = EventLoop(config, [('/echo/(.*)', Echo)])
+        with mock.patch.object(EventLoopHTTPServer, 'serve_forever'):
+            web_server.run()
+        server = web_server.server
+        eq_(server.executor.number_of_threads, 2)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            connection = socket.create_connection(server.server_address)
+            connection.settimeout(5)
+            connection.sendall(
+                'POST /echo/this HTTP/1.1\r\n'
+                'Content-Length: 5\r\n'
+                '\r\n'
+                'hello'
+            )
+            response = ''
+            while True:
+                chunk = connection.recv(8192)
+                if not chunk:
+                    break
+                response += chunk
+            connection.close()
+        finally:
+            server.stop()
+            thread.join()
+        ok_(response.startswith('HTTP/1.1 200 OK\r\n'), response)
+        ok_(response.endswith('\r\n\r\nthis hello'), response)
@@ -0,0 +1,101 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import json
+
+import web
+from mock import Mock
+from nose.tools import eq_, ok_, assert_raises
+
+from socorro.external import DatabaseError
+from socorro.unittest.testbase import TestCase
+
+from socorro.webapi.webapiService import (
+    JsonWebServiceBase,
+    is_streamed,
+    json_chunks,
+    start_streams,
+)
+
+
+def _failing_rows():
+    raise DatabaseError('relation "reports" does not exist')
+    yield
+
+
+#==============================================================================
+class TestJsonChunks(TestCase):
+
+    #--------------------------------------------------------------------------
+    def test_is_streamed(self):
+        ok_(not is_streamed({'hits': [1, 2], 'total': 2}))
+        ok_(not is_streamed('a string'))
+        ok_(is_streamed(iter([1, 2])))
+        ok_(is_streamed({'hits': (x for x in range(2)), 'total': 2}))
+        ok_(is_streamed({'a': {'b': iter([])}}))
+
+    #--------------------------------------------------------------------------
+    def test_json_chunks(self):
+        result = {
+            'hits': ({'id': x, 'name': 'crash %d' % x} for x in range(1000)),
+            'total': 1000,
+            'facets': {'empty': iter([]), 'plain': [1, 2]},
+        }
+        chunks = list(json_chunks(result, chunk_size=1024))
+        ok_(len(chunks) > 10)
+        ok_(all(len(x) < 1024 + 100 for x in chunks))
+        eq_(
+            json.loads(''.join(chunks)),
+            {
+                'hits': [
+                    {'id': x, 'name': 'crash %d' % x} for x in range(1000)
+                ],
+                'total': 1000,
+                'facets': {'empty': [], 'plain': [1, 2]},
+            }
+        )
+
+    #--------------------------------------------------------------------------
+    def test_json_chunks_of_a_plain_result(self):
+        eq_(list(json_chunks({'total': 0})), ['{"total": 0}'])
+
+    #--------------------------------------------------------------------------
+    def test_start_streams(self):
+        started = []
+
+        def rows():
+            started.append(True)
+            for x in range(3):
+                yield x
+
+        result = start_streams({
+            'hits': rows(),
+            'none': iter([]),
+            'plain': {'a': 1},
+            'total': 3,
+        })
+        eq_(started, [True])
+        eq_(list(result['hits']), [0, 1, 2])
+        eq_(list(result['none']), [])
+        eq_(result['plain'], {'a': 1})
+
+        assert_raises(
+            DatabaseError,
+            start_streams,
+            {'hits': _failing_rows(), 'total': 3}
+        )
+
+
+#==============================================================================
+class TestJsonWebServiceBase(TestCase):
+
+    #--------------------------------------------------------------------------
+    def test_streamed_query_errors_are_internal_errors(self):
+        service = JsonWebServiceBase(Mock())
+        service.get = lambda *args: {'hits': _failing_rows(), 'total': 3}
+        web.ctx.headers = []
+        # the error surfaces before the response is committed
+        web.ctx.status = '200 OK'
+        assert_raises(web.HTTPError, service.GET)
+        eq_(web.ctx.status, '500 Internal Server Error')
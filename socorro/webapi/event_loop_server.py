@@ -0,0 +1,499 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""a non-blocking HTTP front end for WSGI applications that receive large
+request bodies from slow clients.  A single event loop thread accepts
+connections and reads requests, spooling each body to a temporary file as it
+trickles in.  Only once a request has been received completely is it handed
+to the WSGI application, which runs in a fixed size pool of worker threads.
+The response is written back by the event loop.  A slow upload costs a
+socket and a spooled file, never a thread, so the number of concurrent
+uploads is bounded by file descriptors, not by the thread budget."""
+
+import asyncore
+import collections
+import errno
+import fcntl
+import httplib
+import os
+import Queue
+import socket
+import sys
+import tempfile
+import threading
+import time
+import urllib
+
+# a request whose headers do not fit in this is refused
+MAX_HEADER_SIZE = 64 * 1024
+
+
+#==============================================================================
+class BoundedExecutor(object):
+    """a fixed number of threads applying 'function' to submitted items.  At
+    most 'max_pending' items wait for a thread, beyond that 'submit' refuses
+    more work rather than letting the backlog grow without bound."""
+
+    #--------------------------------------------------------------------------
+    def __init__(self, function, number_of_threads, max_pending, logger):
+        self.function = function
+        self.number_of_threads = number_of_threads
+        self.logger = logger
+        self.queue = Queue.Queue(max_pending)
+        self.threads = []
+
+    #--------------------------------------------------------------------------
+    def start(self):
+        for i in range(self.number_of_threads):
+            a_thread = threading.Thread(
+                target=self._worker,
+                name='EventLoopWorker%02d' % i
+            )
+            a_thread.daemon = True
+            a_thread.start()
+            self.threads.append(a_thread)
+
+    #--------------------------------------------------------------------------
+    def submit(self, item):
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except Queue.Full:
+            return False
+
+    #--------------------------------------------------------------------------
+    def _worker(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            try:
+                self.function(item)
+            except Exception:
+                self.logger.error('event loop worker failed', exc_info=True)
+
+    #--------------------------------------------------------------------------
+    def stop(self):
+        for a_thread in self.threads:
+            self.queue.put(None)
+        for a_thread in self.threads:
+            a_thread.join()
+        self.threads = []
+
+
+#==============================================================================
+class _Trigger(asyncore.file_dispatcher):
+    """the read end of a pipe in the event loop.  Worker threads write a byte
+    to it to wake the loop up when they have finished a response."""
+
+    #--------------------------------------------------------------------------
+    def __init__(self, server):
+        self.server = server
+        self._read_fd, self._write_fd = os.pipe()
+        asyncore.file_dispatcher.__init__(
+            self,
+            self._read_fd,
+            map=server.socket_map
+        )
+        # file_dispatcher keeps its own duplicate of the read end
+        os.close(self._read_fd)
+        flags = fcntl.fcntl(self._write_fd, fcntl.F_GETFL)
+        fcntl.fcntl(self._write_fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+
+    #--------------------------------------------------------------------------
+    def pull(self):
+        try:
+            os.write(self._write_fd, 'x')
+        except OSError, x:
+            # a full pipe already guarantees a wake up
+            if x.errno != errno.EAGAIN:
+                raise
+
+    #--------------------------------------------------------------------------
+    def readable(self):
+        return True
+
+    #--------------------------------------------------------------------------
+    def writable(self):
+        return False
+
+    #--------------------------------------------------------------------------
+    def handle_read(self):
+        try:
+            self.recv(8192)
+        except (OSError, socket.error):
+            pass
+        self.server._deliver_responses()
+
+    #--------------------------------------------------------------------------
+    def close(self):
+        asyncore.file_dispatcher.close(self)
+        os.close(self._write_fd)
+
+
+#==============================================================================
+class RequestChannel(asyncore.dispatcher):
+    """one client connection.  It reads a single request, waits while the
+    application handles it and then writes the response and closes."""
+
+    #--------------------------------------------------------------------------
+    def __init__(self, server, sock, client_address):
+        asyncore.dispatcher.__init__(self, sock, map=server.socket_map)
+        self.server = server
+        self.client_address = client_address
+        self.header_buffer = ''
+        self.environ = None
+        self.body = None
+        self.remaining = 0
+        self.outgoing = ''
+        # set while the application owns the request
+        self.busy = False
+        # set once the response is queued, the connection closes after it
+        self.closing = False
+        self.last_activity = time.time()
+        server.connection_count += 1
+
+    #--------------------------------------------------------------------------
+    def readable(self):
+        return not self.busy and not self.closing
+
+    #--------------------------------------------------------------------------
+    def writable(self):
+        return bool(self.outgoing)
+
+    #--------------------------------------------------------------------------
+    def handle_read(self):
+        data = self.recv(self.server.read_size)
+        if not data:
+            return
+        self.last_activity = time.time()
+        if self.environ is None:
+            self.header_buffer += data
+            end = self.header_buffer.find('\r\n\r\n')
+            if end == -1:
+                if len(self.header_buffer) > MAX_HEADER_SIZE:
+                    self.respond_with_error(400)
+                return
+            head = self.header_buffer[:end]
+            data = self.header_buffer[end + 4:]
+            self.header_buffer = ''
+            if not self._start_request(head):
+                return
+        self._read_body(data)
+
+    #--------------------------------------------------------------------------
+    def _start_request(self, head):
+        lines = head.split('\r\n')
+        try:
+            method, uri, protocol = lines[0].split()
+        except ValueError:
+            self.respond_with_error(400)
+            return False
+        path, _, query_string = uri.partition('?')
+        host, port = self.server.server_address[:2]
+        environ = {
+            'REQUEST_METHOD': method,
+            'SCRIPT_NAME': '',
+            'PATH_INFO': urllib.unquote(path),
+            'QUERY_STRING': query_string,
+            'SERVER_NAME': host,
+            'SERVER_PORT': str(port),
+            'SERVER_PROTOCOL': protocol,
+            'REMOTE_ADDR': self.client_address[0],
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            name = name.strip().upper().replace('-', '_')
+            value = value.strip()
+            if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                environ[name] = value
+            else:
+                key = 'HTTP_' + name
+                if key in environ:
+                    value = '%s,%s' % (environ[key], value)
+                environ[key] = value
+
+        if environ.get('HTTP_TRANSFER_ENCODING', 'identity') != 'identity':
+            # crash submitters always send a length, chunked bodies would
+            # need decoding here
+            self.respond_with_error(411)
+            return False
+        try:
+            self.remaining = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            self.respond_with_error(400)
+            return False
+        if self.remaining < 0:
+            self.respond_with_error(400)
+            return False
+        max_request_size = self.server.max_request_size
+        if max_request_size and self.remaining > max_request_size:
+            self.respond_with_error(413)
+            return False
+        if environ.get('HTTP_EXPECT', '').lower() == '100-continue':
+            self.outgoing += '%s 100 Continue\r\n\r\n' % protocol
+
+        self.body = tempfile.SpooledTemporaryFile(self.server.spool_size)
+        environ['wsgi.input'] = self.body
+        self.environ = environ
+        return True
+
+    #--------------------------------------------------------------------------
+    def _read_body(self, data):
+        if data:
+            data = data[:self.remaining]
+            self.body.write(data)
+            self.remaining -= len(data)
+        if self.remaining:
+            return
+        self.body.seek(0)
+        self.busy = True
+        if not self.server.executor.submit(self):
+            self.busy = False
+            self.server.logger.warning(
+                'event loop server is saturated, refusing %s %s',
+                self.environ['REQUEST_METHOD'],
+                self.environ['PATH_INFO']
+            )
+            self.respond_with_error(503)
+
+    #--------------------------------------------------------------------------
+    def respond(self, response):
+        """queue the complete response and close once it has been sent"""
+        self.busy = False
+        self.closing = True
+        self.outgoing += response
+        self.last_activity = time.time()
+
+    #--------------------------------------------------------------------------
+    def respond_with_error(self, code):
+        message = httplib.responses.get(code, 'Error')
+        self.respond(render_response(
+            '%d %s' % (code, message),
+            [('Content-Type', 'text/plain')],
+            message
+        ))
+
+    #--------------------------------------------------------------------------
+    def handle_write(self):
+        sent = self.send(self.outgoing)
+        self.outgoing = self.outgoing[sent:]
+        self.last_activity = time.time()
+        if not self.outgoing and self.closing:
+            self.close()
+
+    #--------------------------------------------------------------------------
+    def handle_close(self):
+        self.close()
+
+    #--------------------------------------------------------------------------
+    def handle_error(self):
+        self.server.logger.warning(
+            'event loop connection from %s failed',
+            self.client_address[0],
+            exc_info=True
+        )
+        self.close()
+
+    #--------------------------------------------------------------------------
+    def close(self):
+        if self.socket is None:
+            return
+        asyncore.dispatcher.close(self)
+        self.socket = None
+        self.server.connection_count -= 1
+        # while busy, the worker owns the body and closes it when done
+        if self.body is not None and not self.busy:
+            self.body.close()
+
+
+#------------------------------------------------------------------------------
+def render_response(status, headers, body):
+    header_names = set(name.lower() for name, value in headers)
+    headers = list(headers)
+    if 'content-length' not in header_names:
+        headers.append(('Content-Length', str(len(body))))
+    headers.append(('Connection', 'close'))
+    lines = ['HTTP/1.1 %s' % status]
+    lines.extend('%s: %s' % (name, value) for name, value in headers)
+    return '\r\n'.join(lines) + '\r\n\r\n' + body
+
+
+#==============================================================================
+class EventLoopHTTPServer(asyncore.dispatcher):
+
+    #--------------------------------------------------------------------------
+    def __init__(
+        self,
+        application,
+        server_address,
+        logger,
+        worker_threads=8,
+        max_pending_requests=64,
+        max_connections=4000,
+        request_timeout=300,
+        max_request_size=0,
+        spool_size=1024 * 1024,
+        read_size=64 * 1024,
+    ):
+        """parameters:
+            application - the WSGI function
+            server_address - the (ip address, port) tuple to listen on
+            logger - where to report trouble
+            worker_threads - the number of threads running the application
+            max_pending_requests - complete requests that may wait for a
+                                   worker before new ones are refused with a
+                                   503
+            max_connections - connections beyond this wait in the listen
+                              backlog
+            request_timeout - seconds a connection may sit idle before it is
+                              dropped
+            max_request_size - larger bodies are refused with a 413, 0 means
+                               no limit
+            spool_size - bodies larger than this go to disk while they are
+                         received"""
+        self.socket_map = {}
+        asyncore.dispatcher.__init__(self, map=self.socket_map)
+        self.application = application
+        self.logger = logger
+        self.max_connections = max_connections
+        self.request_timeout = request_timeout
+        self.max_request_size = max_request_size
+        self.spool_size = spool_size
+        self.read_size = read_size
+        self.connection_count = 0
+
+        self.create_socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.set_reuse_addr()
+        self.bind(server_address)
+        self.listen(1024)
+        self.server_address = self.socket.getsockname()
+
+        self.executor = BoundedExecutor(
+            self._handle_request,
+            worker_threads,
+            max_pending_requests,
+            logger
+        )
+        self._trigger = _Trigger(self)
+        # responses finished by workers waiting for the event loop
+        self._completed = collections.deque()
+        self._stopping = False
+
+    #--------------------------------------------------------------------------
+    def readable(self):
+        return self.connection_count < self.max_connections
+
+    #--------------------------------------------------------------------------
+    def writable(self):
+        return False
+
+    #--------------------------------------------------------------------------
+    def handle_accept(self):
+        pair = self.accept()
+        if pair is None:
+            return
+        RequestChannel(self, *pair)
+
+    #--------------------------------------------------------------------------
+    def handle_error(self):
+        self.logger.error('event loop server error', exc_info=True)
+
+    #--------------------------------------------------------------------------
+    def serve_forever(self, poll_interval=1.0):
+        self.executor.start()
+        last_check = time.time()
+        try:
+            while not self._stopping:
+                asyncore.loop(
+                    timeout=poll_interval,
+                    use_poll=True,
+                    map=self.socket_map,
+                    count=1
+                )
+                now = time.time()
+                if now - last_check >= poll_interval:
+                    self._drop_idle_connections(now)
+                    last_check = now
+        finally:
+            self.executor.stop()
+            asyncore.close_all(self.socket_map)
+
+    #--------------------------------------------------------------------------
+    def stop(self):
+        """may be called from any thread"""
+        self._stopping = True
+        self._trigger.pull()
+
+    #--------------------------------------------------------------------------
+    def _drop_idle_connections(self, now):
+        for channel in self.socket_map.values():
+            if (
+                isinstance(channel, RequestChannel)
+                and not channel.busy
+                and now - channel.last_activity > self.request_timeout
+            ):
+                self.logger.info(
+                    'dropping idle connection from %s',
+                    channel.client_address[0]
+                )
+                channel.close()
+
+    #--------------------------------------------------------------------------
+    def _handle_request(self, channel):
+        """runs in a worker thread"""
+        try:
+            response = self._run_application(channel.environ)
+        finally:
+            channel.body.close()
+        self._completed.append((channel, response))
+        self._trigger.pull()
+
+    #--------------------------------------------------------------------------
+    def _run_application(self, environ):
+        status_and_headers = []
+        chunks = []
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and status_and_headers:
+                raise exc_info[0], exc_info[1], exc_info[2]
+            status_and_headers[:] = [status, headers]
+            return chunks.append
+
+        try:
+            result = self.application(environ, start_response)
+            try:
+                chunks.extend(result)
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+            status, headers = status_and_headers
+        except Exception:
+            self.logger.error(
+                'application failed handling %s %s',
+                environ['REQUEST_METHOD'],
+                environ['PATH_INFO'],
+                exc_info=True
+            )
+            status = '500 Internal Server Error'
+            headers = [('Content-Type', 'text/plain')]
+            chunks = ['Internal Server Error']
+        return render_response(status, headers, ''.join(chunks))
+
+    #--------------------------------------------------------------------------
+    def _deliver_responses(self):
+        """runs in the event loop, hands the responses finished by workers to
+        their connections"""
+        while self._completed:
+            channel, response = self._completed.popleft()
+            if channel.socket is None:
+                # the client went away while its request was handled
+                continue
+            channel.respond(response)
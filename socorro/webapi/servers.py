@@ -6,6 +6,7 @@ import web
 import os
 
 from socorro.webapi.class_partial import class_with_partial_init
+from socorro.webapi.event_loop_server import EventLoopHTTPServer
 
 from configman import Namespace, RequiredConfig
 
@@ -134,3 +135,78 @@ class CherryPy(StandAloneServer):
             self.config.web_server.ip_address,
             self.config.web_server.port
         )
+
+
+#==============================================================================
+class EventLoop(StandAloneServer):
+    """a standalone server for applications, like the collector, that receive
+    large request bodies from slow clients.  Requests are read without
+    blocking on a single event loop and handed to the application in a fixed
+    pool of threads only once they have been received completely, so a slow
+    upload ties up a socket rather than a thread.  See
+    socorro.webapi.event_loop_server for the details."""
+    required_config = Namespace()
+    required_config.add_option(
+        'ip_address',
+        doc='the IP address from which to accept submissions',
+        default='127.0.0.1'
+    )
+    required_config.add_option(
+        'worker_threads',
+        doc='the number of threads handling completely received requests',
+        default=8
+    )
+    required_config.add_option(
+        'max_pending_requests',
+        doc='the number of received requests that may wait for a worker '
+            'thread before more are refused with a 503',
+        default=64
+    )
+    required_config.add_option(
+        'max_connections',
+        doc='the number of simultaneous connections, further ones wait to be '
+            'accepted',
+        default=4000
+    )
+    required_config.add_option(
+        'request_timeout',
+        doc='the number of seconds a connection may be idle before it is '
+            'dropped',
+        default=300
+    )
+    required_config.add_option(
+        'max_request_size',
+        doc='requests with larger bodies are refused with a 413 (0 means no '
+            'limit)',
+        default=0
+    )
+    required_config.add_option(
+        'spool_size',
+        doc='request bodies larger than this are spooled to a temporary file '
+            'while they are received',
+        default=1024 * 1024
+    )
+
+    #--------------------------------------------------------------------------
+    def run(self):
+        self.server = EventLoopHTTPServer(
+            self._wsgi_func,
+            (self.config.web_server.ip_address, self.config.web_server.port),
+            self.config.logger,
+            worker_threads=self.config.web_server.worker_threads,
+            max_pending_requests=self.config.web_server.max_pending_requests,
+            max_connections=self.config.web_server.max_connections,
+            request_timeout=self.config.web_server.request_timeout,
+            max_request_size=self.config.web_server.max_request_size,
+            spool_size=self.config.web_server.spool_size,
+        )
+        self.server.serve_forever()
+
+    #--------------------------------------------------------------------------
+    def _identify(self):
+        self.config.logger.info(
+            'this is EventLoop running standalone at %s:%d with %d workers',
+            self.config.web_server.ip_address,
+            self.config.web_server.port,
+            self.config.web_server.worker_threads
+        )
@@ -5,6 +5,7 @@
 import json
 import web
 import cgi
+import itertools
 import re
 
 import socorro.lib.util as util
@@ -24,6 +25,75 @@ import raven
 from configman import RequiredConfig
 
 
+def is_streamed(value):
+    """return True if `value` is, or is a dict that somewhere has, an
+    iterator of results that should be encoded as it's consumed rather
+    than all at once"""
+    if isinstance(value, dict):
+        return any(is_streamed(x) for x in value.itervalues())
+    return hasattr(value, 'next')
+
+
+def start_streams(value):
+    """return `value` with every iterator in it advanced to its first item.
+    Whatever an iterator has to do before it yields, like running a
+    database query, happens now, while its errors can still be turned into
+    an error response rather than into a truncated 200 response."""
+    if isinstance(value, dict):
+        if not is_streamed(value):
+            return value
+        return dict((k, start_streams(v)) for k, v in value.iteritems())
+    if not hasattr(value, 'next'):
+        return value
+    try:
+        first = value.next()
+    except StopIteration:
+        return iter([])
+    return itertools.chain([first], value)
+
+
+def json_chunks(value, dumps=json.dumps, chunk_size=64 * 1024):
+    """yield the JSON encoding of `value` in chunks of about `chunk_size`
+    bytes.  Iterators are encoded as arrays one item at a time, as they
+    are consumed, so a response of any number of rows never has to be in
+    memory as a whole.  Anything that isn't streamed is encoded with
+    `dumps` in one go."""
+    pieces = []
+    size = 0
+    for piece in _json_pieces(value, dumps):
+        pieces.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield ''.join(pieces)
+            pieces = []
+            size = 0
+    if pieces:
+        yield ''.join(pieces)
+
+
+def _json_pieces(value, dumps):
+    if not is_streamed(value):
+        yield dumps(value)
+    elif isinstance(value, dict):
+        separator = '{'
+        for key, item in value.iteritems():
+            yield separator
+            yield dumps(key)
+            yield ':'
+            for piece in _json_pieces(item, dumps):
+                yield piece
+            separator = ','
+        yield '}'
+    else:
+        separator = '['
+        for item in value:
+            yield separator
+            for piece in _json_pieces(item, dumps):
+                yield piece
+            separator = ','
+        yield '[]' if separator == '[' else ']'
+
+
 def typeConversion(type_converters, values_to_convert):
     """
     Convert a list of values into new types and return the new list.
@@ -104,6 +174,9 @@ class JsonWebServiceBase(RequiredConfig):
                 web.header('Content-Type', result[1])
                 return result[0]
             web.header('Content-Type', 'application/json')
+            if is_streamed(result):
+                # without a Content-Length the server sends it chunked
+                return json_chunks(start_streams(result))
             return json.dumps(result)
         except web.webapi.HTTPError:
             raise
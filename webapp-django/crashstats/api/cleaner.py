@@ -69,9 +69,16 @@ class Cleaner(object):
                         self._scrub_list(data, whitelist)
 
     def _scrub_item(self, data, whitelist):
-        matcher = SmartWhitelistMatcher(whitelist)
-        for key in data.keys():
-            if key not in matcher:
+        self._scrub_items((data,), get_matcher(whitelist))
+
+    def _scrub_list(self, sequence, whitelist):
+        # the matcher is looked up once for the whole list and not once
+        # for every item in it
+        self._scrub_items(sequence, get_matcher(whitelist))
+
+    def _scrub_items(self, sequence, matcher):
+        for data in sequence:
+            for key in [x for x in data if x not in matcher]:
                 # warnings.warn() never redirects the same message to
                 # the logger more than once in the same python
                 # process. Doing this helps developers notice/remember
@@ -81,27 +88,63 @@ class Cleaner(object):
                     warnings.warn(msg)
                 del data[key]
 
-        if self.clean_scrub:
-            scrubber.scrub_dict(
-                data,
-                clean_fields=self.clean_scrub,
-            )
+            if self.clean_scrub:
+                scrubber.scrub_dict(
+                    data,
+                    clean_fields=self.clean_scrub,
+                )
+
+
+# whitelists are attributes of the models so there are only so many of
+# them, each one is compiled the first time it's used
+_matchers = {}
 
-    def _scrub_list(self, sequence, whitelist):
-        for i, data in enumerate(sequence):
-            self._scrub_item(data, whitelist)
-            sequence[i] = data
+
+def get_matcher(whitelist):
+    """return the, possibly already compiled, SmartWhitelistMatcher for
+    a whitelist"""
+    whitelist = tuple(whitelist)
+    try:
+        return _matchers[whitelist]
+    except KeyError:
+        matcher = _matchers[whitelist] = SmartWhitelistMatcher(whitelist)
+        return matcher
 
 
 class SmartWhitelistMatcher(object):
+    """A key is in the whitelist if it's equal to one of the items in it
+    or, for items that contain a `*`, if it matches it where `*` stands for
+    any number of word characters or dashes.
+
+    Keys that aren't plainly in the whitelist have their verdict
+    remembered so the wildcards are only ever matched once per key.
+    """
+
+    # a whitelist key can't be anything but a valid name, stop
+    # remembering verdicts about whatever keys the data happens to have
+    # after this many
+    MAX_VERDICTS = 10000
 
     def __init__(self, whitelist):
 
         def format(item):
             return '^' + item.replace('*', '[\w-]*') + '$'
 
-        items = [format(x) for x in whitelist]
-        self.regex = re.compile('|'.join(items))
+        self.keys = frozenset(x for x in whitelist if '*' not in x)
+        wildcards = [format(x) for x in whitelist if '*' in x]
+        if wildcards:
+            self.regex = re.compile('|'.join(wildcards))
+        else:
+            self.regex = None
+        self.verdicts = {}
 
     def __contains__(self, key):
-        return bool(self.regex.match(key))
+        if key in self.keys:
+            return True
+        try:
+            return self.verdicts[key]
+        except KeyError:
+            verdict = bool(self.regex and self.regex.match(key))
+            if len(self.verdicts) < self.MAX_VERDICTS:
+                self.verdicts[key] = verdict
+            return verdict
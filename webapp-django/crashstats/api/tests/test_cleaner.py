@@ -2,7 +2,11 @@ import mock
 from nose.tools import eq_, ok_
 
 from crashstats.base.tests.testbase import TestCase
-from crashstats.api.cleaner import Cleaner, SmartWhitelistMatcher
+from crashstats.api.cleaner import (
+    Cleaner,
+    SmartWhitelistMatcher,
+    get_matcher,
+)
 from crashstats import scrubber
 
 
@@ -254,3 +258,34 @@ class TestSmartWhitelistMatcher(TestCase):
         ok_('thing' in matcher)
         ok_('things' in matcher)
         ok_('nothing' not in matcher)
+
+    def test_wildcards_and_verdicts(self):
+        matcher = SmartWhitelistMatcher(('some', 'upload_file_*', 'x*y'))
+        eq_(matcher.keys, frozenset(['some']))
+        ok_('upload_file_minidump' in matcher)
+        ok_('xy' in matcher)
+        ok_('x-and-y' in matcher)
+        ok_('x.y' not in matcher)
+        ok_('upload_file_minidump' in matcher.verdicts)
+        ok_('some' not in matcher.verdicts)
+
+        # no wildcards, no regular expression
+        matcher = SmartWhitelistMatcher(('some', 'thing'))
+        ok_(matcher.regex is None)
+        ok_('something' not in matcher)
+
+    def test_verdicts_are_limited(self):
+        matcher = SmartWhitelistMatcher(('thing*',))
+        matcher.MAX_VERDICTS = 2
+        ok_('a' not in matcher)
+        ok_('things' in matcher)
+        ok_('b' not in matcher)
+        eq_(sorted(matcher.verdicts), ['a', 'things'])
+
+
+class TestGetMatcher(TestCase):
+
+    def test_compiled_once_per_whitelist(self):
+        matcher = get_matcher(('foo', 'bar*'))
+        ok_(get_matcher(['foo', 'bar*']) is matcher)
+        ok_(get_matcher(('foo',)) is not matcher)
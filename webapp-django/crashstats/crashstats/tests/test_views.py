@@ -1399,7 +1399,7 @@ class TestViews(BaseTestViews):
         ok_('WaterWolf' in response['Content-Disposition'])
         ok_('19.0' in response['Content-Disposition'])
         # we should be able unpack it
-        reader = csv.reader(StringIO(response.content))
+        reader = csv.reader(StringIO(''.join(response.streaming_content)))
         line1, line2 = reader
         eq_(line1[0], 'Rank')
         try:
@@ -1491,8 +1491,9 @@ class TestViews(BaseTestViews):
         ok_('19.0' in response['Content-Disposition'])
         #
         # no signatures, the CSV is empty apart from the header
-        eq_(len(response.content.splitlines()), 1)
-        reader = csv.reader(StringIO(response.content))
+        content = ''.join(response.streaming_content)
+        eq_(len(content.splitlines()), 1)
+        reader = csv.reader(StringIO(content))
         line1, = reader
         eq_(line1[0], 'Rank')
 
@@ -1754,10 +1755,9 @@ class TestViews(BaseTestViews):
         eq_(response['Content-Type'], 'text/csv')
 
         # also, I should be able to read it
-        reader = csv.reader(response)
-        # because response is an iterator that will return a blank line first
-        # we skip till the next time
-        rows = list(reader)[1:]
+        # the response is streamed, one row at a time
+        reader = csv.reader(response.streaming_content)
+        rows = list(reader)
         ok_(rows)
         head_row = rows[0]
         eq_(head_row[0], 'Date')
@@ -332,15 +332,26 @@ class UnicodeWriter:
         # ... and reencode it into the target encoding
         data = self.encoder.encode(data)
         # write to the target stream
-        self.stream.write(data)
+        written = self.stream.write(data)
         # empty queue
         self.queue.truncate(0)
+        return written
 
     def writerows(self, rows):
         for row in rows:
             self.writerow(row)
 
 
+class Echo(object):
+    """A file-like object whose `write` returns what it is given instead
+    of keeping it. A UnicodeWriter writing to one returns every encoded
+    row from `writerow`, which is how a CSV gets streamed, row by row, as
+    the content of a StreamingHttpResponse."""
+
+    def write(self, value):
+        return value
+
+
 def add_CORS_header(f):
     @functools.wraps(f)
     def wrapper(request, *args, **kw):
@@ -660,7 +660,38 @@ def topcrasher(request, product=None, versions=None, date_range_type=None,
 
 
 def _render_topcrasher_csv(request, context, product):
-    response = http.HttpResponse(content_type='text/csv')
+    writer = utils.UnicodeWriter(utils.Echo())
+
+    def rows():
+        yield writer.writerow(['Rank',
+                               'Change in Rank',
+                               'Percentage of All Crashes',
+                               'Previous Percentage',
+                               'Signature',
+                               'Total',
+                               'Win',
+                               'Mac',
+                               'Linux',
+                               'Is Garbage Collecting',
+                               'Version Count',
+                               'Versions'])
+        for crash in context['tcbs']['crashes']:
+
+            yield writer.writerow([crash.get('currentRank', '') + 1,
+                                   crash.get('changeInRank', ''),
+                                   crash.get('percentOfTotal', ''),
+                                   crash.get('previousPercentOfTotal', ''),
+                                   crash.get('signature', ''),
+                                   crash.get('count', ''),
+                                   crash.get('win_count', ''),
+                                   crash.get('mac_count', ''),
+                                   crash.get('linux_count', ''),
+                                   crash.get('is_gc_count', ''),
+                                   crash.get('versions_count', ''),
+                                   crash.get('versions', '')])
+
+    # the rows are encoded as the response is sent, not all up front
+    response = http.StreamingHttpResponse(rows(), content_type='text/csv')
     filedate = datetime.datetime.utcnow().strftime('%Y-%m-%d')
     response['Content-Disposition'] = (
         'attachment; filename="%s_%s_%s.csv"' % (
@@ -669,34 +700,6 @@ def _render_topcrasher_csv(request, context, product):
             filedate
         )
     )
-    writer = utils.UnicodeWriter(response)
-    writer.writerow(['Rank',
-                     'Change in Rank',
-                     'Percentage of All Crashes',
-                     'Previous Percentage',
-                     'Signature',
-                     'Total',
-                     'Win',
-                     'Mac',
-                     'Linux',
-                     'Is Garbage Collecting',
-                     'Version Count',
-                     'Versions'])
-    for crash in context['tcbs']['crashes']:
-
-        writer.writerow([crash.get('currentRank', '') + 1,
-                         crash.get('changeInRank', ''),
-                         crash.get('percentOfTotal', ''),
-                         crash.get('previousPercentOfTotal', ''),
-                         crash.get('signature', ''),
-                         crash.get('count', ''),
-                         crash.get('win_count', ''),
-                         crash.get('mac_count', ''),
-                         crash.get('linux_count', ''),
-                         crash.get('is_gc_count', ''),
-                         crash.get('versions_count', ''),
-                         crash.get('versions', '')])
-
     return response
 
 
@@ -868,12 +871,7 @@ def daily(request, default_context=None):
 
 
 def _render_daily_csv(request, data, product, versions, platforms, os_names):
-    response = http.HttpResponse('text/csv', content_type='text/csv')
-    title = 'ADI_' + product + '_' + '_'.join(versions)
-    response['Content-Disposition'] = (
-        'attachment; filename="%s.csv"' % title
-    )
-    writer = utils.UnicodeWriter(response)
+    writer = utils.UnicodeWriter(utils.Echo())
     head_row = ['Date']
     labels = (
         ('report_count', 'Crashes'),
@@ -884,9 +882,8 @@ def _render_daily_csv(request, data, product, versions, platforms, os_names):
     for version in versions:
         for __, label in labels:
             head_row.append('%s %s %s' % (product, version, label))
-    writer.writerow(head_row)
 
-    def append_row_blob(blob, labels):
+    def append_row_blob(row, blob, labels):
         for key, __ in labels:
             value = blob[key]
             if key == 'throttle':
@@ -897,34 +894,42 @@ def _render_daily_csv(request, data, product, versions, platforms, os_names):
                 value = str(value)
             row.append(value)
 
-    # reverse so that recent dates appear first
-    for date in sorted(data['dates'].keys(), reverse=True):
-        crash_info = data['dates'][date]
-        """
-         `crash_info` is a list that looks something like this:
-           [{'adu': 4500,
-             'crash_hadu': 43.0,
-             'date': u'2012-10-13',
-             'product': u'WaterWolf',
-             'report_count': 1935,
-             'throttle': 1.0,
-             'version': u'4.0a2'}]
-        """
-        row = [date]
-        info_by_version = dict((x['version'], x) for x in crash_info)
-
-        # Turn each of them into a dict where the keys is the version
-        for version in versions:
-            if version in info_by_version:
-                blob = info_by_version[version]
-                append_row_blob(blob, labels)
-            else:
-                for __ in labels:
-                    row.append('-')
+    def rows():
+        yield writer.writerow(head_row)
+        # reverse so that recent dates appear first
+        for date in sorted(data['dates'].keys(), reverse=True):
+            crash_info = data['dates'][date]
+            """
+             `crash_info` is a list that looks something like this:
+               [{'adu': 4500,
+                 'crash_hadu': 43.0,
+                 'date': u'2012-10-13',
+                 'product': u'WaterWolf',
+                 'report_count': 1935,
+                 'throttle': 1.0,
+                 'version': u'4.0a2'}]
+            """
+            row = [date]
+            info_by_version = dict((x['version'], x) for x in crash_info)
+
+            # Turn each of them into a dict where the keys is the version
+            for version in versions:
+                if version in info_by_version:
+                    blob = info_by_version[version]
+                    append_row_blob(row, blob, labels)
+                else:
+                    for __ in labels:
+                        row.append('-')
 
-        assert len(row) == len(head_row), (len(row), len(head_row))
-        writer.writerow(row)
+            assert len(row) == len(head_row), (len(row), len(head_row))
+            yield writer.writerow(row)
 
+    # the rows are encoded as the response is sent, not all up front
+    response = http.StreamingHttpResponse(rows(), content_type='text/csv')
+    title = 'ADI_' + product + '_' + '_'.join(versions)
+    response['Content-Disposition'] = (
+        'attachment; filename="%s.csv"' % title
+    )
     return response
 
 
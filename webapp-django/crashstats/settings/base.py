@@ -425,6 +425,40 @@ SYMBOLS_COMPRESS_EXTENSIONS = config(
     cast=Csv()
 )
 
+# How many archive members are compressed and uploaded at the same time
+# and how many parts of a multipart upload are sent at the same time.
+SYMBOLS_UPLOAD_CONCURRENCY = config(
+    'SYMBOLS_UPLOAD_CONCURRENCY',
+    8,
+    cast=int
+)
+# Extracted (and compressed) archive members bigger than this many bytes
+# are spooled to a temporary file on disk instead of kept in memory.
+SYMBOLS_UPLOAD_SPOOL_SIZE = config(
+    'SYMBOLS_UPLOAD_SPOOL_SIZE',
+    10 * 1024 * 1024,
+    cast=int
+)
+# Files this big or bigger are sent to S3 as a multipart upload in
+# chunks of SYMBOLS_MULTIPART_CHUNK_SIZE bytes. S3 doesn't accept parts
+# smaller than 5MB.
+SYMBOLS_MULTIPART_THRESHOLD = config(
+    'SYMBOLS_MULTIPART_THRESHOLD',
+    50 * 1024 * 1024,
+    cast=int
+)
+SYMBOLS_MULTIPART_CHUNK_SIZE = config(
+    'SYMBOLS_MULTIPART_CHUNK_SIZE',
+    16 * 1024 * 1024,
+    cast=int
+)
+# Number of seconds between saving the progress of an upload.
+SYMBOLS_UPLOAD_SAVE_INTERVAL = config(
+    'SYMBOLS_UPLOAD_SAVE_INTERVAL',
+    5,
+    cast=int
+)
+
 # ------------------------------------------------
 # Below are settings that can be overridden using
 # environment variables.
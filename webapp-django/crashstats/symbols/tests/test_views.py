@@ -1,6 +1,7 @@
 import os
 import shutil
 import tempfile
+import zipfile
 
 from nose.tools import eq_, ok_, assert_raises
 import mock
@@ -22,6 +23,7 @@ from .base import (
     TAR_FILE,
     ACTUALLY_NOT_ZIP_FILE,
 )
+from crashstats.symbols.utils import get_archive_members
 from crashstats.symbols.views import (
     unpack_and_upload,
     get_bucket_name_and_location,
@@ -52,6 +54,8 @@ class TestViews(BaseTestViews):
         self.known_bucket_keys = {}
         self.created_buckets = []
         self.created_keys = []
+        self.listed_prefixes = []
+        self.multipart_parts = {}
         mocked_connect_s3 = self.patcher.start()
 
         self.symbols_compress_extensions = settings.SYMBOLS_COMPRESS_EXTENSIONS
@@ -89,11 +93,41 @@ class TestViews(BaseTestViews):
                     return mocked_key
                 return None
 
+            def mocked_list(prefix=''):
+                self.listed_prefixes.append(prefix)
+                for key_name in sorted(self.known_bucket_keys):
+                    if key_name.startswith(prefix):
+                        yield mocked_get_key(key_name)
+
+            def mocked_initiate_multipart_upload(key_name, headers=None):
+                parts = {}
+                multipart = mock.Mock()
+
+                def mocked_upload_part(file, part_number):
+                    parts[part_number] = file.read()
+
+                def mocked_complete():
+                    self.uploaded_keys[key_name] = ''.join(
+                        parts[x] for x in sorted(parts)
+                    )
+                    self.uploaded_headers[key_name] = headers
+                    self.multipart_parts[key_name] = len(parts)
+
+                multipart.upload_part_from_file.side_effect = (
+                    mocked_upload_part
+                )
+                multipart.complete_upload.side_effect = mocked_complete
+                return multipart
+
             mocked_bucket = mock.Mock()
             mocked_bucket.name = name
             self.created_buckets.append((name, location))
             mocked_bucket.new_key.side_effect = mocked_new_key
             mocked_bucket.get_key.side_effect = mocked_get_key
+            mocked_bucket.list.side_effect = mocked_list
+            mocked_bucket.initiate_multipart_upload.side_effect = (
+                mocked_initiate_multipart_upload
+            )
             return mocked_bucket
 
         mocked_connect_s3().lookup = mocked_lookup
@@ -121,6 +155,97 @@ class TestViews(BaseTestViews):
                 None
             )
 
+    def _make_zip(self, members):
+        file_path = os.path.join(self.tmp_dir, 'symbols.zip')
+        with zipfile.ZipFile(file_path, 'w') as zf:
+            for name, content in members:
+                zf.writestr(name, content)
+        return file_path
+
+    def test_unpack_and_upload_lists_directories_once(self):
+        user = User.objects.create(username='user')
+        symbols_upload = models.SymbolsUpload.objects.create(
+            user=user,
+            content='',
+            size=1,
+            filename='symbols.zip',
+        )
+        file_path = self._make_zip([
+            ('xpcshell.pdb/ABC123/xpcshell.sym', 'MODULE windows'),
+            ('xpcshell.pdb/ABC123/xpcshell.pd_', 'x' * 100),
+            ('xul.pdb/DEF456/xul.sym', 'MODULE windows'),
+        ])
+        # already uploaded and the same size
+        self.known_bucket_keys[
+            '%s/xpcshell.pdb/ABC123/xpcshell.pd_' %
+            settings.SYMBOLS_FILE_PREFIX
+        ] = 100
+
+        with open(file_path, 'rb') as file_object:
+            unpack_and_upload(
+                get_archive_members(file_object, file_path),
+                symbols_upload,
+                'some-bucket',
+                None
+            )
+
+        # one listing per directory and no HEAD request per file
+        eq_(sorted(self.listed_prefixes), [
+            '%s/xpcshell.pdb/ABC123/' % settings.SYMBOLS_FILE_PREFIX,
+            '%s/xul.pdb/DEF456/' % settings.SYMBOLS_FILE_PREFIX,
+        ])
+        eq_(sorted(self.uploaded_keys), [
+            '%s/xpcshell.pdb/ABC123/xpcshell.sym' %
+            settings.SYMBOLS_FILE_PREFIX,
+            '%s/xul.pdb/DEF456/xul.sym' % settings.SYMBOLS_FILE_PREFIX,
+        ])
+        # the lines are in the order of the archive
+        symbols_upload = models.SymbolsUpload.objects.get(
+            pk=symbols_upload.pk
+        )
+        eq_(
+            [x[0] for x in symbols_upload.content.splitlines()],
+            ['+', '=', '+']
+        )
+
+    def test_unpack_and_upload_multipart(self):
+        user = User.objects.create(username='user')
+        symbols_upload = models.SymbolsUpload.objects.create(
+            user=user,
+            content='',
+            size=1,
+            filename='symbols.zip',
+        )
+        content = ''.join(chr(x % 256) for x in range(2500))
+        file_path = self._make_zip([
+            ('xul.pdb/DEF456/xul.dll', content),
+            ('xul.pdb/DEF456/small.dll', 'small'),
+        ])
+
+        with self.settings(
+            SYMBOLS_MULTIPART_THRESHOLD=1000,
+            SYMBOLS_MULTIPART_CHUNK_SIZE=1000,
+            SYMBOLS_UPLOAD_CONCURRENCY=2,
+        ):
+            with open(file_path, 'rb') as file_object:
+                total_uploaded = unpack_and_upload(
+                    get_archive_members(file_object, file_path),
+                    symbols_upload,
+                    'some-bucket',
+                    None
+                )
+
+        key_name = '%s/xul.pdb/DEF456/xul.dll' % settings.SYMBOLS_FILE_PREFIX
+        eq_(self.uploaded_keys[key_name], content)
+        eq_(self.multipart_parts[key_name], 3)
+        ok_('Content-Type' in self.uploaded_headers[key_name])
+        # the small one was uploaded in one go
+        ok_(
+            '%s/xul.pdb/DEF456/small.dll' % settings.SYMBOLS_FILE_PREFIX
+            not in self.multipart_parts
+        )
+        eq_(total_uploaded, 2500 + 5)
+
     def test_check_symbols_archive_content(self):
         content = """
         Line 1
@@ -1,9 +1,15 @@
+import collections
 import gzip
 import re
 import os
 import mimetypes
+import shutil
+import tempfile
+import threading
+import time
 from functools import wraps
 from cStringIO import StringIO
+from multiprocessing.pool import ThreadPool
 from zipfile import BadZipfile
 
 from django import http
@@ -28,6 +34,8 @@ from . import forms
 from . import utils
 
 
+_COPY_BUFFER_SIZE = 1024 * 1024
+
 def api_login_required(view_func):
     """similar to django.contrib.auth.decorators.login_required
     except instead of redirecting it returns a 403 message if not
@@ -95,63 +103,205 @@ def unpack_and_upload(iterator, symbols_upload, bucket_name, bucket_location):
                 )
             )
 
-    total_uploaded = 0
-    for member in iterator:
-        key_name = os.path.join(
-            settings.SYMBOLS_FILE_PREFIX, member.name
-        )
-        key = bucket.get_key(key_name)
-
-        # let's assume first that we need to add a new key
-        prefix = '+'
-        if key:
-            # key already exists, but is it the same size?
-            if key.size != member.size:
-                # file size in S3 is different, upload the new one
-                key = None
-            else:
+    # Reading the archive has to happen in order in this thread but
+    # compressing and uploading what was read is handed to a pool of
+    # threads. Only a limited number of members are in flight at any one
+    # time and each is spooled to disk once it gets big, so the memory
+    # used doesn't depend on the size of the archive.
+    members = list(iterator)
+    concurrency = max(settings.SYMBOLS_UPLOAD_CONCURRENCY, 1)
+    pool = ThreadPool(concurrency)
+    part_pool = ThreadPool(concurrency)
+    try:
+        existing_sizes = _get_existing_sizes(bucket, members, pool)
+
+        total_uploaded = 0
+        lines = []
+        last_save = [time.time()]
+        pending = collections.deque()
+
+        def finish(prefix, key_name, result):
+            uploaded = result.get() if result else 0
+            lines.append('%s%s,%s\n' % (
+                prefix,
+                bucket.name,
+                key_name
+            ))
+            now = time.time()
+            if now - last_save[0] >= settings.SYMBOLS_UPLOAD_SAVE_INTERVAL:
+                symbols_upload.content += ''.join(lines)
+                symbols_upload.save()
+                del lines[:]
+                last_save[0] = now
+            return uploaded
+
+        for member in members:
+            key_name = os.path.join(
+                settings.SYMBOLS_FILE_PREFIX, member.name
+            )
+            # let's assume first that we need to add a new key
+            prefix = '+'
+            if existing_sizes.get(key_name) == member.size:
+                # key already exists and is the same size
                 prefix = '='
+                result = None
+            else:
+                key = bucket.new_key(key_name)
+
+                content_type = mimetypes.guess_type(key_name)[0]
+                for ext in settings.SYMBOLS_MIME_OVERRIDES:
+                    if key_name.lower().endswith('.{0}'.format(ext)):
+                        content_type = settings.SYMBOLS_MIME_OVERRIDES[ext]
+                        key.content_type = content_type
+                        symbols_upload.content_type = key.content_type
+
+                compress = False
+                for ext in settings.SYMBOLS_COMPRESS_EXTENSIONS:
+                    if key_name.lower().endswith('.{0}'.format(ext)):
+                        compress = True
+                        break
+                headers = {
+                    'Content-Type': content_type,
+                }
+                if compress:
+                    headers['Content-Encoding'] = 'gzip'
+
+                file = _spool(member.extractor())
+                result = pool.apply_async(
+                    _upload,
+                    (bucket, key, file, headers, compress, part_pool)
+                )
+            pending.append((prefix, key_name, result))
+
+            # write down, in the order of the archive, whatever has been
+            # finished and wait for the oldest upload if too many are
+            # in flight
+            while pending and (
+                len(pending) > concurrency or
+                pending[0][2] is None or
+                pending[0][2].ready()
+            ):
+                total_uploaded += finish(*pending.popleft())
+
+        while pending:
+            total_uploaded += finish(*pending.popleft())
+        symbols_upload.content += ''.join(lines)
+        symbols_upload.save()
+    except Exception:
+        pool.terminate()
+        part_pool.terminate()
+        raise
+    else:
+        pool.close()
+        part_pool.close()
+    pool.join()
+    part_pool.join()
 
-        if not key:
-            key = bucket.new_key(key_name)
+    return total_uploaded
 
-            file = StringIO()
-            file.write(member.extractor().read())
 
-            content_type = mimetypes.guess_type(key_name)[0]  # default guess
-            for ext in settings.SYMBOLS_MIME_OVERRIDES:
-                if key_name.lower().endswith('.{0}'.format(ext)):
-                    content_type = settings.SYMBOLS_MIME_OVERRIDES[ext]
-                    key.content_type = content_type
-                    symbols_upload.content_type = key.content_type
+def _get_existing_sizes(bucket, members, pool):
+    """return a dict of key name to size for those of the members that
+    already exist in the bucket. Instead of asking about every member,
+    each directory in the archive is listed once, typically that's a
+    debug file name and debug ID with a handful of files in it."""
+    directories = set()
+    key_names = []
+    for member in members:
+        key_name = os.path.join(settings.SYMBOLS_FILE_PREFIX, member.name)
+        directory = os.path.dirname(member.name)
+        if directory:
+            directories.add(
+                os.path.join(settings.SYMBOLS_FILE_PREFIX, directory, '')
+            )
+        else:
+            # listing the root of the prefix would list every symbol
+            # there is
+            key_names.append(key_name)
 
-            compress = False
-            for ext in settings.SYMBOLS_COMPRESS_EXTENSIONS:
-                if key_name.lower().endswith('.{0}'.format(ext)):
-                    compress = True
-                    break
-            headers = {
-                'Content-Type': content_type,
-            }
-            if compress:
-                headers['Content-Encoding'] = 'gzip'
-                out = StringIO()
-                with gzip.GzipFile(fileobj=out, mode='w') as f:
-                    f.write(file.getvalue())
-                value = out.getvalue()
-            else:
-                value = file.getvalue()
-            uploaded = key.set_contents_from_string(value, headers)
-            total_uploaded += uploaded
-
-        symbols_upload.content += '%s%s,%s\n' % (
-            prefix,
-            key.bucket.name,
-            key.key
-        )
-        symbols_upload.save()
+    def list_directory(directory):
+        return [(key.name, key.size) for key in bucket.list(prefix=directory)]
 
-    return total_uploaded
+    def get_key(key_name):
+        key = bucket.get_key(key_name)
+        if key:
+            return [(key_name, key.size)]
+        return []
+
+    sizes = {}
+    for found in pool.map(list_directory, sorted(directories)):
+        sizes.update(found)
+    for found in pool.map(get_key, key_names):
+        sizes.update(found)
+    return sizes
+
+
+def _spool(file):
+    """copy a file object into a temporary file that is kept in memory
+    until it gets bigger than settings.SYMBOLS_UPLOAD_SPOOL_SIZE"""
+    spooled = tempfile.SpooledTemporaryFile(
+        max_size=settings.SYMBOLS_UPLOAD_SPOOL_SIZE
+    )
+    shutil.copyfileobj(file, spooled, _COPY_BUFFER_SIZE)
+    spooled.seek(0)
+    return spooled
+
+
+def _upload(bucket, key, file, headers, compress, part_pool):
+    """upload the content of the spooled file, gzipped if asked to, and
+    return the number of bytes uploaded"""
+    try:
+        if compress:
+            compressed = tempfile.SpooledTemporaryFile(
+                max_size=settings.SYMBOLS_UPLOAD_SPOOL_SIZE
+            )
+            with gzip.GzipFile(filename='', fileobj=compressed, mode='w') as f:
+                shutil.copyfileobj(file, f, _COPY_BUFFER_SIZE)
+            file.close()
+            file = compressed
+        size = _size(file)
+        file.seek(0)
+        if size < settings.SYMBOLS_MULTIPART_THRESHOLD:
+            return key.set_contents_from_string(file.read(), headers)
+        _multipart_upload(bucket, key.key, file, size, headers, part_pool)
+        return size
+    finally:
+        file.close()
+
+
+def _size(file):
+    file.seek(0, os.SEEK_END)
+    return file.tell()
+
+
+def _multipart_upload(bucket, key_name, file, size, headers, part_pool):
+    """upload the file in parts of settings.SYMBOLS_MULTIPART_CHUNK_SIZE,
+    several of them at a time. Each part is read by the thread that
+    uploads it, so however many files are uploaded at the same time,
+    there are never more parts in memory than threads in the part pool."""
+    multipart = bucket.initiate_multipart_upload(key_name, headers=headers)
+    chunk_size = settings.SYMBOLS_MULTIPART_CHUNK_SIZE
+    file_lock = threading.Lock()
+
+    def upload_part(part_number):
+        with file_lock:
+            file.seek((part_number - 1) * chunk_size)
+            chunk = file.read(chunk_size)
+        multipart.upload_part_from_file(StringIO(chunk), part_number)
+
+    try:
+        pending = collections.deque()
+        part_count = (size + chunk_size - 1) // chunk_size
+        for part_number in range(1, part_count + 1):
+            if len(pending) >= settings.SYMBOLS_UPLOAD_CONCURRENCY:
+                pending.popleft().get()
+            pending.append(part_pool.apply_async(upload_part, (part_number,)))
+        while pending:
+            pending.popleft().get()
+        multipart.complete_upload()
+    except Exception:
+        multipart.cancel_upload()
+        raise
 
 
 def get_bucket_name_and_location(user):